@@ -4,8 +4,11 @@ Privacy-Safe Cross-Company Analytics Platform
 """
 
 import streamlit as st
-import yaml
-from pathlib import Path
+from utils.startup_profiler import page_timer
+from utils.config import get_config
+
+startup = page_timer("Home")
+startup.mark('imports')
 
 # Page configuration - SAME AS OTHER PAGES
 st.set_page_config(
@@ -15,16 +18,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Load configuration
-def load_config():
-    config_path = Path(__file__).parent.parent / "config" / "config.yaml"
-    if config_path.exists():
-        with open(config_path, 'r', encoding='utf-8') as f:
-            result = yaml.safe_load(f)
-            return result if result is not None else {}
-    return {}
-
-config = load_config()
+# Load configuration (parsed once per process, reloaded when the file changes)
+config = get_config()
 
 # Minimal CSS - ONLY BACKGROUND
 st.markdown("""
@@ -68,7 +63,7 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Fetch live record count from Snowflake
+# Live record count from Snowflake, fetched once the rest of the page is drawn
 live_data_placeholder = st.empty()
 live_data_placeholder.markdown("""
 <div style="text-align: center; margin-top: -1rem; margin-bottom: 1rem;">
@@ -78,57 +73,9 @@ live_data_placeholder.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-try:
-    from utils.snowflake_connector import get_connection
-    conn = get_connection()
-    conn.connect()
-    
-    count_query = """
-    SELECT 
-        (SELECT COUNT(*) FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES) +
-        (SELECT COUNT(*) FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES) +
-        (SELECT COUNT(*) FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES) as total_count
-    """
-    count_df = conn.execute_query(count_query)
-    if not count_df.empty:
-        total_records = f"{int(count_df.iloc[0]['TOTAL_COUNT']):,}"
-        live_data_placeholder.markdown(f"""
-        <div style="text-align: center; margin-top: 1rem; margin-bottom: 2rem; animation: fadeIn 0.5s ease-in;">
-            <div style="
-                display: inline-block;
-                background: linear-gradient(135deg, #10B981 0%, #059669 100%);
-                color: white;
-                padding: 0.75rem 1.5rem;
-                border-radius: 30px;
-                font-weight: 700;
-                font-size: 1rem;
-                box-shadow: 0 4px 15px rgba(16, 185, 129, 0.4);
-                border: 2px solid rgba(255,255,255,0.2);
-            ">
-                <span style="font-size: 1.2rem;">●</span> Live Data: {total_records} records across 3 organizations
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-    else:
-        live_data_placeholder.empty()
-except Exception as e:
-    live_data_placeholder.markdown(f"""
-    <div style="text-align: center; margin-top: 1rem; margin-bottom: 2rem;">
-        <div style="
-            display: inline-block;
-            background: linear-gradient(135deg, #F59E0B 0%, #D97706 100%);
-            color: white;
-            padding: 0.75rem 1.5rem;
-            border-radius: 30px;
-            font-weight: 700;
-            font-size: 1rem;
-            box-shadow: 0 4px 15px rgba(245, 158, 11, 0.4);
-            border: 2px solid rgba(255,255,255,0.2);
-        ">
-            ⏳ Connecting to live data...
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+# Status of the background warm-up, filled in at the end of the script
+warm_placeholder = st.empty()
+prewarmer = None
 
 # Main value proposition - Vibrant gradient cards
 col1, col2, col3 = st.columns(3, gap="large")
@@ -251,16 +198,6 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Update record count with live data
-try:
-    st.markdown(f"""
-    <script>
-    document.getElementById('record-display').textContent = '{total_records}';
-    </script>
-    """, unsafe_allow_html=True)
-except:
-    pass
-
 st.markdown("<br>", unsafe_allow_html=True)
 
 
@@ -329,8 +266,7 @@ st.markdown("""
 with st.sidebar:
     st.markdown("<h3 style='color: #e2e8f0;'>🏢 Participating Organizations</h3>", unsafe_allow_html=True)
     
-    orgs = config.get('organizations', [])
-    for org in orgs:
+    for org in config.organizations:
         st.markdown(f"""
         <div style="
             padding: 1.25rem; 
@@ -342,9 +278,9 @@ with st.sidebar:
             border: 1px solid rgba(129, 140, 248, 0.2);
             transition: transform 0.2s ease;
         ">
-            <div style="font-size: 2rem; margin-bottom: 0.5rem; text-align: center;">{org.get('icon', '🏢')}</div>
-            <strong style="color: #e2e8f0; font-size: 1.1rem; display: block; text-align: center;">{org.get('name', 'Unknown')}</strong>
-            <small style="color: #94a3b8; text-transform: uppercase; letter-spacing: 1px; font-weight: 600; display: block; text-align: center; margin-top: 0.25rem;">{org.get('type', '').title()}</small>
+            <div style="font-size: 2rem; margin-bottom: 0.5rem; text-align: center;">{org.icon}</div>
+            <strong style="color: #e2e8f0; font-size: 1.1rem; display: block; text-align: center;">{org.name}</strong>
+            <small style="color: #94a3b8; text-transform: uppercase; letter-spacing: 1px; font-weight: 600; display: block; text-align: center; margin-top: 0.25rem;">{org.type.title()}</small>
         </div>
         """, unsafe_allow_html=True)
     
@@ -376,6 +312,76 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
 
+# Live data runs last: everything above renders without waiting for the
+# Snowflake connector to import or a session to open
+startup.mark('render')
 
+try:
+    from utils.snowflake_connector import get_connection
+    from utils.prewarm import get_prewarmer
+    from components.freshness import format_age
+    
+    # Resume the warehouse, open sessions and prefetch the Fraud page while
+    # the user reads this page, so the buttons above land on warm data. The
+    # record count is served from cache without waiting for a session.
+    prewarmer = get_prewarmer()
+    prewarmer.start()
+    
+    conn = get_connection()
+    
+    count_query = """
+    SELECT 
+        (SELECT COUNT(*) FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES) +
+        (SELECT COUNT(*) FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES) +
+        (SELECT COUNT(*) FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES) as total_count
+    """
+    # Served from cache instantly; refreshed in the background once older than 5 minutes
+    count_df, count_age = conn.execute_query_swr(count_query, max_age=300, feature='record_count')
+    if not count_df.empty:
+        total_records = f"{int(count_df.iloc[0]['TOTAL_COUNT']):,}"
+        live_data_placeholder.markdown(f"""
+        <div style="text-align: center; margin-top: 1rem; margin-bottom: 2rem; animation: fadeIn 0.5s ease-in;">
+            <div style="
+                display: inline-block;
+                background: linear-gradient(135deg, #10B981 0%, #059669 100%);
+                color: white;
+                padding: 0.75rem 1.5rem;
+                border-radius: 30px;
+                font-weight: 700;
+                font-size: 1rem;
+                box-shadow: 0 4px 15px rgba(16, 185, 129, 0.4);
+                border: 2px solid rgba(255,255,255,0.2);
+            ">
+                <span style="font-size: 1.2rem;">●</span> Live Data: {total_records} records across 3 organizations
+                <span style="font-weight: 500; opacity: 0.8;">· updated {format_age(count_age)}</span>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        live_data_placeholder.empty()
+except Exception as e:
+    live_data_placeholder.markdown(f"""
+    <div style="text-align: center; margin-top: 1rem; margin-bottom: 2rem;">
+        <div style="
+            display: inline-block;
+            background: linear-gradient(135deg, #F59E0B 0%, #D97706 100%);
+            color: white;
+            padding: 0.75rem 1.5rem;
+            border-radius: 30px;
+            font-weight: 700;
+            font-size: 1rem;
+            box-shadow: 0 4px 15px rgba(245, 158, 11, 0.4);
+            border: 2px solid rgba(255,255,255,0.2);
+        ">
+            ⏳ Connecting to live data...
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
 
+if prewarmer is not None:
+    from components.warmup import show_warm_status
+    with warm_placeholder.container():
+        show_warm_status(prewarmer.status())
 
+startup.mark('live_data')
+startup.finish()
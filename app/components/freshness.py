@@ -0,0 +1,37 @@
+"""
+Data Freshness Component
+Shows how old a cached dashboard value is
+"""
+
+import streamlit as st
+
+def format_age(age_seconds):
+    """
+    Formats a data age for display
+
+    Args:
+        age_seconds: Age of the data in seconds
+
+    Returns:
+        Short human-readable string, e.g. "just now", "5 min ago"
+    """
+    if age_seconds < 5:
+        return "just now"
+    if age_seconds < 60:
+        return f"{int(age_seconds)}s ago"
+    if age_seconds < 3600:
+        return f"{int(age_seconds // 60)} min ago"
+    if age_seconds < 86400:
+        return f"{int(age_seconds // 3600)} h ago"
+    return f"{int(age_seconds // 86400)} d ago"
+
+def show_data_age(age_seconds, refreshing=False):
+    """
+    Display a small caption with the age of the data shown above it
+
+    Args:
+        age_seconds: Age of the data in seconds
+        refreshing: Whether a background refresh is in progress
+    """
+    status = " · refreshing in background" if refreshing else ""
+    st.caption(f"🕒 Updated {format_age(age_seconds)}{status}")
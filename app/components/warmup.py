@@ -0,0 +1,30 @@
+"""
+Warm-up Status Component
+Shows whether the warehouse and dashboards are ready before the user navigates
+"""
+
+import streamlit as st
+
+def show_warm_status(status):
+    """
+    Display a small caption with the pre-warm state
+
+    Args:
+        status: Dictionary returned by Prewarmer.status()
+    """
+    if not status.get('enabled') or status['state'] == 'idle':
+        return
+
+    steps = status.get('steps', {})
+    breakdown = " · ".join(f"{name} {seconds:.1f}s" for name, seconds in steps.items())
+
+    if status['state'] == 'warming':
+        st.caption("⏳ Warming up the warehouse and dashboards in the background...", help=breakdown or None)
+    elif status['state'] == 'warm':
+        prefetched = status.get('prefetched', 0)
+        st.caption(
+            f"🔥 Warehouse warm · ready in {status['time_to_warm']:.1f}s · {prefetched} dashboard queries prefetched",
+            help=breakdown or None
+        )
+    else:
+        st.caption(f"⚠️ Warm-up did not finish: {status.get('error')}", help=breakdown or None)
@@ -4,20 +4,27 @@ Natural language query interface for privacy-safe analytics
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
 import sys
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
+from utils.startup_profiler import page_timer
+
+startup = page_timer("1_Cross_Company_Insights")
+
 from components.loader import show_loader
 
-from utils.snowflake_connector import get_connection
-from utils.ai_explainer import get_explainer
+# The Snowflake connector (and pandas with it) and plotly are imported where a
+# query runs or a chart is drawn, so the question form renders without them
+from utils.config import get_config
 from utils.query_builder import get_query_builder
+from utils.query_limits import QueryLimits
+
+startup.mark('imports')
+
+# Budget for natural language queries
+NL_QUERY_LIMITS = QueryLimits(timeout=60, max_rows=10_000, max_bytes=10 * 1024 ** 3)
 
 st.set_page_config(
     page_title="Cross-Company Insights",
@@ -76,16 +83,7 @@ with st.sidebar:
     st.markdown("### 🏢 Your Organization")
     
     # Load organizations from config
-    import yaml
-    from pathlib import Path
-    config_path = Path(__file__).parent.parent.parent / "config" / "config.yaml"
-    if config_path.exists():
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-            orgs = config.get('organizations', [])
-            org_names = [f"{org['icon']} {org['name']}" for org in orgs]
-    else:
-        org_names = ["🏦 Metro Bank", "🛡️ SafeGuard Insurance", "🛒 RetailCorp"]
+    org_names = [org.label for org in get_config().organizations]
     
     org_name = st.selectbox(
         "Select your organization",
@@ -375,7 +373,16 @@ if query_mode == "Natural Language":
         
         try:
             # Get connection to Snowflake
+            from utils.intent_router import get_intent_router
+            from utils.nl_sql import NL_PROMPT_VERSION, build_translation_query, prepare_generated_sql
+            from utils.semantic_cache import get_semantic_cache
+            from utils.snowflake_connector import get_connection
+            from utils.speculative_query import SpeculativeQuery
+            from utils.translation_cache import get_translation_cache
             conn = get_connection()
+            translations = get_translation_cache()
+            similar_questions = get_semantic_cache()
+            router = get_intent_router()
             
             if not conn.connect():
                 loading_placeholder.empty()
@@ -384,306 +391,94 @@ if query_mode == "Natural Language":
             
             # Keep loader visible during query generation and execution
             
-            # Use Cortex AI to generate SQL from natural language
-            ai_prompt = f"""You are a SQL expert for Snowflake data warehouses. Generate a privacy-safe SQL query for the following question.
-
-CRITICAL DATA TYPE RULES:
-- ALL flag columns (default_flag, fraud_indicator, high_value_returns_flag) are INTEGER (0 or 1), NOT strings
-- Use: WHERE default_flag = 1 (NOT WHERE default_flag = 'Y')
-- zip_code is INTEGER - use CAST(zip_code AS VARCHAR) before SUBSTR operations
-- All numeric columns should be aggregated with SUM(), AVG(), COUNT()
-
-PRIVACY RULES:
-1. Always use UNION ALL to combine data from multiple tables into a CTE first, then aggregate
-2. Use HAVING COUNT(*) >= 50 ONLY when you have GROUP BY in the same SELECT
-3. NEVER put HAVING after the final UNION ALL - put it in the final aggregating SELECT if needed
-4. Never return individual records - only aggregated results
-5. Round decimal values to 1 or 2 decimal places
-
-CORRECT PATTERN:
-WITH combined AS (SELECT ... FROM table1 UNION ALL SELECT ... FROM table2)
-SELECT col, COUNT(*), SUM(flag) FROM combined GROUP BY col HAVING COUNT(*) >= 50;
-
-WRONG PATTERN (DO NOT USE):
-SELECT ... FROM cte1 UNION ALL SELECT ... FROM cte2 HAVING COUNT(*) >= 50;
-
-Available tables and schemas:
-- BANK_DB.RISK.CUSTOMER_RISK_SCORES
-  Columns: customer_id (INT), age (INT), zip_code (INT), credit_score (INT), default_flag (INT 0/1), 
-  transaction_count (INT), avg_transaction_amount (DECIMAL), account_open_date (DATE), last_activity_date (DATE)
-  FRAUD FLAG: default_flag (use this column for fraud detection in BANK database)
-
-- INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-  Columns: policy_holder_id (INT), age (INT), zip_code (INT), claim_frequency (INT), total_claim_amount (DECIMAL),
-  fraud_indicator (INT 0/1), policy_start_date (DATE), last_claim_date (DATE)
-  FRAUD FLAG: fraud_indicator (use this column for fraud detection in INSURANCE database)
-
-- RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-  Columns: customer_id (INT), age (INT), zip_code (INT), return_rate (DECIMAL), total_purchase_amount (DECIMAL),
-  high_value_returns_flag (INT 0/1), first_purchase_date (DATE), last_purchase_date (DATE)
-  FRAUD FLAG: high_value_returns_flag (use this column for fraud detection in RETAIL database)
-
-IMPORTANT: Each table has a DIFFERENT fraud flag column name. When combining tables, you must:
-- Select default_flag from BANK_DB (NOT fraud_indicator)
-- Select fraud_indicator from INSURANCE_DB
-- Select high_value_returns_flag from RETAIL_DB (NOT fraud_indicator)
-- Use column aliases to standardize names in UNION ALL queries
-
-User question: {user_question}
-
-Generate ONLY the SQL query, no explanations. The query should return results that answer the question."""
-
-            # Try to use Cortex AI with improved prompt
-            try:
-                cortex_query = f"""
-                SELECT SNOWFLAKE.CORTEX.COMPLETE(
-                    'mistral-large',
-                    '{ai_prompt.replace("'", "''")}'
-                ) as generated_sql
-                """
-                
-                ai_result = conn.execute_query(cortex_query)
-                if not ai_result.empty:
-                    generated_sql = ai_result.iloc[0]['GENERATED_SQL']
-                    
-                    # Extract SQL from markdown code blocks if present
-                    if '```sql' in generated_sql.lower():
-                        # Find the sql code block (case insensitive)
-                        parts = generated_sql.split('```')
-                        for i, part in enumerate(parts):
-                            if part.lower().startswith('sql'):
-                                generated_sql = part[3:].strip()  # Remove 'sql' and whitespace
-                                break
-                    elif '```' in generated_sql:
-                        generated_sql = generated_sql.split('```')[1].split('```')[0].strip()
-                    
-                    # Remove any leading "SQL" word that might remain (case insensitive)
-                    if generated_sql.upper().startswith('SQL'):
-                        generated_sql = generated_sql[3:].strip()
-                    
-                    # Clean up any extra whitespace
-                    generated_sql = generated_sql.strip()
-                    
-                    # Fix common AI errors
-                    # Replace string comparisons with numeric comparisons
-                    generated_sql = generated_sql.replace("= 'Y'", "= 1")
-                    generated_sql = generated_sql.replace("= 'N'", "= 0")
-                    generated_sql = generated_sql.replace('= "Y"', "= 1")
-                    generated_sql = generated_sql.replace('= "N"', "= 0")
-                    
-                    # Fix column name case sensitivity issues (Snowflake is case-sensitive with quoted identifiers)
-                    # The AI sometimes uses wrong casing - normalize to lowercase which works unquoted
-                    import re
-                    # Replace FRAUD_INDICATOR with fraud_indicator (case insensitive pattern)
-                    generated_sql = re.sub(r'\bFRAUD_INDICATOR\b', 'fraud_indicator', generated_sql, flags=re.IGNORECASE)
-                    generated_sql = re.sub(r'\bDEFAULT_FLAG\b', 'default_flag', generated_sql, flags=re.IGNORECASE)
-                    generated_sql = re.sub(r'\bHIGH_VALUE_RETURNS_FLAG\b', 'high_value_returns_flag', generated_sql, flags=re.IGNORECASE)
-                    generated_sql = re.sub(r'\bCREDIT_SCORE\b', 'credit_score', generated_sql, flags=re.IGNORECASE)
-                    generated_sql = re.sub(r'\bZIP_CODE\b', 'zip_code', generated_sql, flags=re.IGNORECASE)
-                    generated_sql = re.sub(r'\bCUSTOMER_ID\b', 'customer_id', generated_sql, flags=re.IGNORECASE)
-                    generated_sql = re.sub(r'\bPOLICY_HOLDER_ID\b', 'policy_holder_id', generated_sql, flags=re.IGNORECASE)
-                    
-                    # Fix wrong column selection from wrong tables
-                    # BANK_DB doesn't have fraud_indicator, it has default_flag
-                    # Pattern: Look for fraud_indicator being selected from BANK_DB and replace with default_flag
-                    generated_sql = re.sub(
-                        r'(SELECT\s+(?:[\w\s,()]+,\s*)?)(fraud_indicator)(\s+(?:AS\s+\w+)?\s*)(\s*FROM\s+BANK_DB\.RISK\.CUSTOMER_RISK_SCORES)',
-                        r'\1default_flag\3\4',
-                        generated_sql,
-                        flags=re.IGNORECASE
-                    )
-                    
-                    # RETAIL_DB doesn't have fraud_indicator, it has high_value_returns_flag
-                    generated_sql = re.sub(
-                        r'(SELECT\s+(?:[\w\s,()]+,\s*)?)(fraud_indicator)(\s+(?:AS\s+\w+)?\s*)(\s*FROM\s+RETAIL_DB\.RISK\.CUSTOMER_RISK_SCORES)',
-                        r'\1high_value_returns_flag\3\4',
-                        generated_sql,
-                        flags=re.IGNORECASE
-                    )
-                    
-                    # Ensure ZIP_CODE is cast to VARCHAR for SUBSTR operations (check both cases)
-                    generated_sql = generated_sql.replace("SUBSTR(zip_code", "SUBSTR(CAST(zip_code AS VARCHAR)")
-                    
-                    # Fix invalid HAVING after UNION ALL (remove trailing HAVING without GROUP BY)
-                    if "UNION ALL" in generated_sql.upper() and generated_sql.upper().strip().endswith("HAVING"):
-                        # Remove trailing HAVING clause after UNION ALL
-                        lines = generated_sql.split('\n')
-                        cleaned_lines = []
-                        skip_next = False
-                        for i, line in enumerate(lines):
-                            if skip_next:
-                                skip_next = False
-                                continue
-                            if i == len(lines) - 1 or (i < len(lines) - 1 and "HAVING" in lines[i+1].upper() and "GROUP BY" not in generated_sql.split("UNION ALL")[-1].upper()):
-                                if "HAVING" not in line.upper():
-                                    cleaned_lines.append(line)
-                            else:
-                                cleaned_lines.append(line)
-                        generated_sql = '\n'.join(cleaned_lines).rstrip(';').rstrip() + ';'
-                    
-                    # Remove invalid HAVING COUNT(*) >= 50 after final UNION ALL select
-                    generated_sql = re.sub(r'\)\s+HAVING\s+COUNT\s*\(\s*\*\s*\)\s*>=\s*\d+\s*;?\s*$', ');', generated_sql, flags=re.IGNORECASE)
-                    
-                    st.info(f"🤖 AI Generated Query")
-                    with st.expander("View Generated SQL"):
-                        st.code(generated_sql, language='sql')
-                    
-                    # Validate the SQL before using it
-                    if 'FRAUD_INDICATOR' in generated_sql or 'DEFAULT_FLAG' in generated_sql or 'HIGH_VALUE_RETURNS_FLAG' in generated_sql:
-                        st.warning("⚠️ Detected uppercase column names in AI query - these may cause errors. Using fallback query.")
-                        raise Exception("AI generated query with incorrect column casing")
-                    
-                    query = generated_sql
+            # Known question types are answered from a query template. Otherwise
+            # SQL that already answered this exact question (under the current
+            # prompt), or a close paraphrase of it, is reused. Only questions
+            # none of these recognize are sent to Cortex
+            routed = router.route(user_question)
+            result_df = None
+            query = routed.query if routed else translations.get(user_question, NL_PROMPT_VERSION)
+            query_source = 'intent' if routed else 'cache' if query else 'template'
+            match = None
+            if not query:
+                match = similar_questions.lookup(user_question, NL_PROMPT_VERSION)
+                if match:
+                    query, query_source = match.sql, 'semantic'
+            if query:
+                if routed:
+                    st.info(f"⚡ Answered with the {routed.intent.label} template in {routed.elapsed * 1000:.1f} ms, no AI call needed")
+                elif match:
+                    st.info(f"⚡ Reusing the SQL generated for a similar question: \"{match.question}\" ({match.score:.0%} match)")
                 else:
-                    raise Exception("Cortex AI returned empty result")
-                    
-            except Exception as cortex_error:
-                # Fallback to keyword-based queries if Cortex fails
-                st.warning(f"⚠️ AI generation unavailable, using optimized query templates")
+                    st.info("⚡ Reusing the SQL generated earlier for this question")
+                with st.expander("View Generated SQL"):
+                    st.code(routed.query.sql if routed else query, language='sql')
+            else:
+                # Cortex writes SQL for the exact question while the closest
+                # template runs; the template answer is shown in the meantime
+                # and kept if the AI query turns out unusable
+                speculation = SpeculativeQuery(
+                    conn,
+                    router.fallback(user_question).query,
+                    build_translation_query(user_question),
+                    limits=NL_QUERY_LIMITS,
+                    patience=NL_QUERY_LIMITS.timeout,
+                )
+                provisional_area = st.empty()
                 
-                if "age" in user_question.lower() or "demographic" in user_question.lower():
-                    # Age group analysis from real data
-                    query = """
-                WITH combined_data AS (
-                        SELECT 
-                            CASE 
-                                WHEN age BETWEEN 18 AND 24 THEN '18-24'
-                                WHEN age BETWEEN 25 AND 34 THEN '25-34'
-                                WHEN age BETWEEN 35 AND 44 THEN '35-44'
-                                WHEN age BETWEEN 45 AND 54 THEN '45-54'
-                                WHEN age BETWEEN 55 AND 64 THEN '55-64'
-                                ELSE '65+'
-                            END AS AGE_GROUP,
-                            credit_score,
-                            default_flag,
-                            'BANK' as SOURCE
-                        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-                        
-                        UNION ALL
-                        
-                        SELECT 
-                            CASE 
-                                WHEN age BETWEEN 18 AND 24 THEN '18-24'
-                                WHEN age BETWEEN 25 AND 34 THEN '25-34'
-                                WHEN age BETWEEN 35 AND 44 THEN '35-44'
-                                WHEN age BETWEEN 45 AND 54 THEN '45-54'
-                                WHEN age BETWEEN 55 AND 64 THEN '55-64'
-                                ELSE '65+'
-                            END AS AGE_GROUP,
-                            NULL as credit_score,
-                            fraud_indicator as default_flag,
-                            'INSURANCE' as SOURCE
-                        FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-                        
-                        UNION ALL
-                        
-                        SELECT 
-                            CASE 
-                                WHEN age BETWEEN 18 AND 24 THEN '18-24'
-                                WHEN age BETWEEN 25 AND 34 THEN '25-34'
-                                WHEN age BETWEEN 35 AND 44 THEN '35-44'
-                                WHEN age BETWEEN 45 AND 54 THEN '45-54'
-                                WHEN age BETWEEN 55 AND 64 THEN '55-64'
-                                ELSE '65+'
-                            END AS AGE_GROUP,
-                            NULL as credit_score,
-                            high_value_returns_flag as default_flag,
-                            'RETAIL' as SOURCE
-                        FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-                    )
-                    SELECT 
-                        AGE_GROUP,
-                        COUNT(*) as RECORD_COUNT,
-                        ROUND(AVG(COALESCE(credit_score, 50)), 1) as AVG_RISK_SCORE,
-                        SUM(default_flag) as FRAUD_CASES,
-                        ROUND(SUM(default_flag) * 100.0 / COUNT(*), 1) as FRAUD_RATE_PCT
-                    FROM combined_data
-                    GROUP BY AGE_GROUP
-                    HAVING COUNT(*) >= 50
-                    ORDER BY AVG_RISK_SCORE DESC
-                    """
+                def show_provisional(frame):
+                    loading_placeholder.empty()
+                    with provisional_area.container():
+                        st.info("⏳ Showing the closest template answer while AI writes a query for your exact question...")
+                        st.dataframe(
+                            frame.rename(columns=lambda col: col.replace('_', ' ').title()),
+                            use_container_width=True,
+                            hide_index=True
+                        )
                 
-                elif "geographic" in user_question.lower() or "location" in user_question.lower() or "zip" in user_question.lower():
-                    # Geographic analysis
-                    query = """
-                WITH combined_data AS (
-                        SELECT 
-                            SUBSTR(CAST(ZIP_CODE AS VARCHAR), 1, 3) AS ZIP_PREFIX,
-                            credit_score,
-                            default_flag
-                        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-                        
-                        UNION ALL
-                        
-                        SELECT 
-                            SUBSTR(CAST(ZIP_CODE AS VARCHAR), 1, 3) AS ZIP_PREFIX,
-                            NULL as credit_score,
-                            fraud_indicator as default_flag
-                        FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-                        
-                        UNION ALL
-                        
-                        SELECT 
-                            SUBSTR(CAST(ZIP_CODE AS VARCHAR), 1, 3) AS ZIP_PREFIX,
-                            NULL as credit_score,
-                            high_value_returns_flag as default_flag
-                        FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-                    )
-                    SELECT 
-                        ZIP_PREFIX as ZIP_CODE_PREFIX,
-                        COUNT(*) as CUSTOMER_COUNT,
-                        ROUND(AVG(COALESCE(credit_score, 600)), 1) as AVG_RISK_SCORE,
-                        SUM(default_flag) as FRAUD_CASES,
-                        ROUND(SUM(default_flag) * 100.0 / COUNT(*), 2) as FRAUD_RATE_PCT
-                    FROM combined_data
-                    GROUP BY ZIP_PREFIX
-                    HAVING COUNT(*) >= 50
-                    ORDER BY FRAUD_CASES DESC
-                    LIMIT 20
-                    """
+                outcome = speculation.run(prepare_generated_sql, on_provisional=show_provisional)
+                provisional_area.empty()
+                if outcome.generation_time is not None:
+                    router.record_llm_call(outcome.generation_time)
                 
+                if outcome.generated_sql:
+                    st.info(f"🤖 AI Generated Query")
+                    with st.expander("View Generated SQL"):
+                        st.code(outcome.generated_sql, language='sql')
+                if outcome.source == 'ai':
+                    query, query_source = outcome.generated_sql, 'ai'
                 else:
-                    # Default summary query - fraud overview by organization
-                    query = """
-                SELECT 
-                    'Bank' as ORGANIZATION,
-                    COUNT(*) as TOTAL_RECORDS,
-                    SUM(DEFAULT_FLAG) as FRAUD_CASES,
-                    ROUND(AVG(CREDIT_SCORE), 1) as AVG_CREDIT_SCORE,
-                    ROUND(SUM(DEFAULT_FLAG) * 100.0 / COUNT(*), 2) as FRAUD_RATE_PCT
-                FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-                
-                UNION ALL
-                
-                SELECT 
-                    'Insurance' as ORGANIZATION,
-                    COUNT(*) as TOTAL_RECORDS,
-                    SUM(FRAUD_INDICATOR) as FRAUD_CASES,
-                    ROUND(AVG(CLAIM_FREQUENCY * 100), 1) as AVG_CREDIT_SCORE,
-                    ROUND(SUM(FRAUD_INDICATOR) * 100.0 / COUNT(*), 2) as FRAUD_RATE_PCT
-                FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-                
-                UNION ALL
-                
-                SELECT 
-                    'Retail' as ORGANIZATION,
-                    COUNT(*) as TOTAL_RECORDS,
-                    SUM(HIGH_VALUE_RETURNS_FLAG) as FRAUD_CASES,
-                    ROUND(AVG(RETURN_RATE * 1000), 1) as AVG_CREDIT_SCORE,
-                    ROUND(SUM(HIGH_VALUE_RETURNS_FLAG) * 100.0 / COUNT(*), 2) as FRAUD_RATE_PCT
-                FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-                
-                ORDER BY FRAUD_RATE_PCT DESC
-                    """
+                    # Fallback to the closest query template if Cortex fails
+                    st.warning(f"⚠️ AI generation unavailable, using optimized query templates")
+                    if outcome.ai_error:
+                        st.caption(f"Reason: {outcome.ai_error}")
+                    query = outcome.query
+                result_df = outcome.data
             
-            # Execute the query (whether AI-generated or fallback)
-            result_df = conn.execute_query(query)
+            # Execute the query unless the speculative run already did; generated
+            # SQL is untrusted, so it runs under a tight time, row and scan budget
+            if result_df is None:
+                result_df = conn.execute_query(query, feature='nl_query_results', limits=NL_QUERY_LIMITS)
             
             if result_df.empty:
+                # The remembered SQL no longer works here; ask Cortex next time.
+                # Nothing is stored for this question, since only SQL that
+                # returned rows is put below
+                if query_source == 'cache':
+                    translations.invalidate(user_question, NL_PROMPT_VERSION)
+                elif query_source == 'semantic':
+                    similar_questions.invalidate(match.question, NL_PROMPT_VERSION)
                 loading_placeholder.empty()
                 st.warning("No data returned from query. Try rephrasing your question.")
                 st.stop()
             
+            if query_source in ('ai', 'semantic'):
+                # Only SQL that ran and returned rows is remembered
+                translations.put(user_question, NL_PROMPT_VERSION, query)
+            if query_source == 'ai':
+                # Paraphrases of this question can reuse its SQL from now on
+                similar_questions.add(user_question, NL_PROMPT_VERSION)
+            
             # Smart column renaming - make names readable
             readable_columns = {}
             for col in result_df.columns:
@@ -697,6 +492,12 @@ Generate ONLY the SQL query, no explanations. The query should return results th
             loading_placeholder.empty()
             
             st.success("✅ Query executed successfully!")
+            if routed:
+                routing = router.stats()
+                st.caption(
+                    f"🧭 {routing['hit_rate']:.0%} of questions answered without an AI call · "
+                    f"about {routing['latency_saved']:.0f}s of AI latency saved"
+                )
             st.session_state.current_results = demo_data
                 
             # Display results
@@ -715,6 +516,8 @@ Generate ONLY the SQL query, no explanations. The query should return results th
             
             # Smart visualization based on data structure
             if len(demo_data.columns) >= 2:
+                import plotly.express as px
+                
                 # Get first text/category column and first numeric column
                 cat_col = next((col for col in demo_data.columns if demo_data[col].dtype == 'object'), demo_data.columns[0])
                 num_cols = [col for col in demo_data.columns if col != cat_col and demo_data[col].dtype in ['int64', 'float64']]
@@ -927,3 +730,5 @@ st.markdown("""
     <small>🔒 All queries are logged for audit purposes | Privacy guaranteed by Snowflake Data Clean Rooms</small>
 </div>
 """, unsafe_allow_html=True)
+
+startup.finish()
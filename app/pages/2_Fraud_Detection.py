@@ -4,15 +4,29 @@ Real-time fraud pattern detection and alerts
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
+from utils.startup_profiler import page_timer
+
+startup = page_timer("2_Fraud_Detection")
+
+import pandas as pd
 from components.loader import show_loader
+from components.freshness import show_data_age
+from utils.config import get_config
+from utils.query_builder import TIME_WINDOWS
+from utils.fraud_queries import (
+    ALERT_SUMMARY_MAX_AGE,
+    ALERT_SUMMARY_QUERY,
+    DEFAULT_RISK_LEVELS,
+    DEFAULT_TIME_PERIOD,
+    build_alert_queries,
+    build_analysis_queries,
+)
+
+startup.mark('imports')
 
 st.set_page_config(
     page_title="Fraud Detection",
@@ -78,65 +92,11 @@ try:
     
     data_placeholder.empty()
     
-    # Query live fraud data
-    alert_query = """
-    WITH fraud_summary AS (
-        SELECT 
-            SUM(default_flag) as high_risk_count
-        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-        WHERE credit_score >= 700
-        
-        UNION ALL
-        
-        SELECT 
-            SUM(fraud_indicator) as high_risk_count
-        FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-        WHERE claim_frequency >= 5
-        
-        UNION ALL
-        
-        SELECT 
-            SUM(high_value_returns_flag) as high_risk_count
-        FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-        WHERE return_rate >= 0.3
-    ),
-    medium_risk AS (
-        SELECT 
-            SUM(default_flag) as medium_risk_count
-        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-        WHERE credit_score BETWEEN 600 AND 699
-        
-        UNION ALL
-        
-        SELECT 
-            SUM(fraud_indicator) as medium_risk_count
-        FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-        WHERE claim_frequency BETWEEN 2 AND 4
-        
-        UNION ALL
-        
-        SELECT 
-            SUM(high_value_returns_flag) as medium_risk_count
-        FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-        WHERE return_rate BETWEEN 0.15 AND 0.29
-    ),
-    low_risk AS (
-        SELECT COUNT(*) as total_records
-        FROM (
-            SELECT customer_id FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-            UNION ALL
-            SELECT policy_holder_id FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-            UNION ALL
-            SELECT customer_id FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-        )
-    )
-    SELECT 
-        (SELECT SUM(high_risk_count) FROM fraud_summary) as high_risk,
-        (SELECT SUM(medium_risk_count) FROM medium_risk) as medium_risk,
-        (SELECT total_records FROM low_risk) as total_records
-    """
+    alert_query = ALERT_SUMMARY_QUERY
     
-    alert_df = conn.execute_query(alert_query)
+    # Served from cache instantly; refreshed in the background once older than 2 minutes
+    alert_df, alert_age = conn.execute_query_swr(alert_query, max_age=ALERT_SUMMARY_MAX_AGE, feature='alert_tiles')
+    alert_refreshing = conn.is_refreshing(alert_query)
     
     if not alert_df.empty:
         high_risk = int(alert_df.iloc[0]['HIGH_RISK']) if alert_df.iloc[0]['HIGH_RISK'] else 0
@@ -151,6 +111,7 @@ except Exception as e:
     st.error(f"Error fetching live data: {str(e)}")
     # Fallback to sample data only if error
     high_risk, medium_risk, low_risk, total_records = 0, 0, 0, 0
+    alert_age, alert_refreshing = None, False
 
 col1, col2, col3, col4 = st.columns(4)
 
@@ -186,8 +147,15 @@ with col4:
     </div>
     """, unsafe_allow_html=True)
 
+if alert_age is not None:
+    show_data_age(alert_age, alert_refreshing)
+
 st.markdown("---")
 
+# Pattern Analysis and Statistics queries. They do not depend on the alert
+# filters, so they run in the same parallel batch as the Active Alerts queries.
+analysis_queries = build_analysis_queries()
+
 # Tabs for different views
 tab1, tab2, tab3, tab4 = st.tabs(["🔥 Active Alerts", "📈 Pattern Analysis", "📊 Statistics", "⚙️ Configuration"])
 
@@ -200,20 +168,11 @@ with tab1:
         risk_filter = st.multiselect(
             "Risk Level",
             ["High", "Medium", "Low"],
-            default=["High", "Medium"]
+            default=DEFAULT_RISK_LEVELS
         )
     with col2:
         # Load organizations from config
-        import yaml
-        from pathlib import Path
-        config_path = Path(__file__).parent.parent.parent / "config" / "config.yaml"
-        if config_path.exists():
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-                orgs = config.get('organizations', [])
-                org_options = ["All"] + [org['name'] for org in orgs]
-        else:
-            org_options = ["All", "Metro Bank", "SafeGuard Insurance", "RetailCorp"]
+        org_options = ["All"] + get_config().organization_names()
         
         org_filter = st.multiselect(
             "Organizations",
@@ -221,10 +180,11 @@ with tab1:
             default=["All"]
         )
     with col3:
+        time_periods = list(TIME_WINDOWS)
         time_filter = st.selectbox(
             "Time Period",
-            ["Last 24 Hours", "Last 7 Days", "Last 30 Days", "All Time"],
-            index=1
+            time_periods,
+            index=time_periods.index(DEFAULT_TIME_PERIOD)
         )
     
     # Fetch REAL fraud alerts from Snowflake with filters applied
@@ -232,107 +192,32 @@ with tab1:
     with loader_placeholder.container():
         show_loader("Analyzing fraud patterns across organizations")
     
-    # Build time filter condition
-    time_conditions = {
-        "Last 24 Hours": "AND b.LAST_ACTIVITY_DATE >= DATEADD('hour', -24, CURRENT_TIMESTAMP())",
-        "Last 7 Days": "AND b.LAST_ACTIVITY_DATE >= DATEADD('day', -7, CURRENT_TIMESTAMP())",
-        "Last 30 Days": "AND b.LAST_ACTIVITY_DATE >= DATEADD('day', -30, CURRENT_TIMESTAMP())",
-        "All Time": ""
-    }
-    time_condition = time_conditions.get(time_filter, "")
+    time_window = TIME_WINDOWS.get(time_filter, TIME_WINDOWS["All Time"])
     
+    page_results = {}
     try:
+        alert_queries = build_alert_queries(risk_filter, time_window)
+        
+        # Run the alert queries together with the analysis tab queries so the
+        # page waits for the slowest query instead of the sum of all of them
+        page_results = conn.execute_many({**alert_queries, **analysis_queries}, cache=True)
+        
+        detected_labels = {
+            'multi_fraud': "2 hours ago",
+            'rapid_pattern': "5 hours ago",
+            'geo_anomaly': "1 day ago",
+            'return_fraud': "2 days ago",
+            'velocity': "2 days ago",
+        }
+
         alerts = []
-        
-        # Query 1: Multiple Claims + Defaults Pattern (High Risk)
-        if "High" in risk_filter or not risk_filter:
-            multi_fraud_query = f"""
-            SELECT 
-                'ALT-' || TO_CHAR(CURRENT_DATE(), 'YYYY') || '-001' as alert_id,
-                'Multiple Claims + Defaults' as pattern,
-                'High' as risk_level,
-                COUNT(DISTINCT b.CUSTOMER_ID) as affected_count,
-                2 as org_count,
-                ROUND(AVG(b.CREDIT_SCORE * 0.1 + i.TOTAL_CLAIM_AMOUNT / 10000), 0) as risk_score,
-                2 as hours_ago
-            FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES b
-            JOIN INSURANCE_DB.RISK.CLAIM_RISK_SCORES i
-                ON b.ZIP_CODE = i.ZIP_CODE AND b.AGE = i.AGE
-            WHERE b.DEFAULT_FLAG = 1 
-                AND i.FRAUD_INDICATOR = 1
-                {time_condition}
-            """
-            result = conn.execute_query(multi_fraud_query)
-            if not result.empty and result.iloc[0]['AFFECTED_COUNT'] > 0:
-                alert_data = result.iloc[0]
-                alerts.append({
-                    "id": alert_data['ALERT_ID'],
-                    "pattern": alert_data['PATTERN'],
-                    "risk": alert_data['RISK_LEVEL'],
-                    "affected": int(alert_data['AFFECTED_COUNT']),
-                    "orgs": int(alert_data['ORG_COUNT']),
-                    "detected": "2 hours ago",
-                    "score": int(alert_data['RISK_SCORE']) if alert_data['RISK_SCORE'] else 50
-                })
-        
-        # Query 2: High Value Returns + Low Credit Score (High Risk)
-        if "High" in risk_filter or not risk_filter:
-            rapid_pattern_query = f"""
-            SELECT 
-                'ALT-' || TO_CHAR(CURRENT_DATE(), 'YYYY') || '-002' as alert_id,
-                'High Value Returns + Low Credit Score' as pattern,
-                'High' as risk_level,
-                COUNT(DISTINCT r.CUSTOMER_ID) as affected_count,
-                2 as org_count,
-                ROUND(AVG(r.RETURN_RATE * 100 + (850 - b.CREDIT_SCORE) / 10), 0) as risk_score,
-                5 as hours_ago
-            FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES r
-            JOIN BANK_DB.RISK.CUSTOMER_RISK_SCORES b
-                ON r.ZIP_CODE = b.ZIP_CODE AND r.AGE = b.AGE
-            WHERE r.HIGH_VALUE_RETURNS_FLAG = 1 
-                AND b.CREDIT_SCORE < 600
-                {time_condition}
-            """
-            result = conn.execute_query(rapid_pattern_query)
-            if not result.empty and result.iloc[0]['AFFECTED_COUNT'] > 0:
-                alert_data = result.iloc[0]
-                alerts.append({
-                    "id": alert_data['ALERT_ID'],
-                    "pattern": alert_data['PATTERN'],
-                    "risk": alert_data['RISK_LEVEL'],
-                    "affected": int(alert_data['AFFECTED_COUNT']),
-                    "orgs": int(alert_data['ORG_COUNT']),
-                    "detected": "5 hours ago",
-                    "score": int(alert_data['RISK_SCORE']) if alert_data['RISK_SCORE'] else 50
-                })
-        
-        # Query 3: Geographic Anomalies (Medium Risk)
-        if "Medium" in risk_filter or not risk_filter:
-            # Build time filter for UNION queries (RETAIL_DB has no date columns)
-            bank_time = time_condition if time_condition else ""
-            insurance_time = time_condition.replace('b.LAST_ACTIVITY_DATE', 'LAST_CLAIM_DATE') if time_condition else ""
-            retail_time = ""  # No date column in RETAIL_DB
+        for name in alert_queries:
+            query_result = page_results[name]
+            if not query_result.ok:
+                st.error(f"Error fetching {name.replace('_', ' ')} alerts: {str(query_result.error)}")
+                continue
             
-            geo_anomaly_query = f"""
-            SELECT 
-                'ALT-' || TO_CHAR(CURRENT_DATE(), 'YYYY') || '-003' as alert_id,
-                'Geographic Anomalies (High-Risk ZIP Codes)' as pattern,
-                'Medium' as risk_level,
-                COUNT(DISTINCT ZIP_CODE) as affected_count,
-                3 as org_count,
-                65 as risk_score,
-                24 as hours_ago
-            FROM (
-                SELECT ZIP_CODE FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES b WHERE DEFAULT_FLAG = 1 {bank_time}
-                UNION ALL
-                SELECT ZIP_CODE FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES WHERE FRAUD_INDICATOR = 1 {insurance_time}
-                UNION ALL
-                SELECT ZIP_CODE FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES WHERE HIGH_VALUE_RETURNS_FLAG = 1 {retail_time}
-            )
-            GROUP BY ZIP_CODE
-            HAVING COUNT(*) >= 5
-            """
-            result = conn.execute_query(geo_anomaly_query)
+            result = query_result.data
             if not result.empty and result.iloc[0]['AFFECTED_COUNT'] > 0:
                 alert_data = result.iloc[0]
                 alerts.append({
@@ -341,64 +226,7 @@ with tab1:
                     "risk": alert_data['RISK_LEVEL'],
                     "affected": int(alert_data['AFFECTED_COUNT']),
                     "orgs": int(alert_data['ORG_COUNT']),
-                    "detected": "1 day ago",
-                    "score": int(alert_data['RISK_SCORE']) if alert_data['RISK_SCORE'] else 50
-                })
-        
-        # Query 4: Return Fraud Pattern (Medium Risk)
-        if "Medium" in risk_filter or not risk_filter:
-            return_fraud_query = f"""
-            SELECT 
-                'ALT-' || TO_CHAR(CURRENT_DATE(), 'YYYY') || '-004' as alert_id,
-                'Suspicious Return Patterns' as pattern,
-                'Medium' as risk_level,
-                COUNT(DISTINCT CUSTOMER_ID) as affected_count,
-                1 as org_count,
-                ROUND(AVG(RETURN_RATE * 100), 0) as risk_score,
-                36 as hours_ago
-            FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-            WHERE HIGH_VALUE_RETURNS_FLAG = 1
-                AND RETURN_RATE >= 0.3
-            """
-            result = conn.execute_query(return_fraud_query)
-            if not result.empty and result.iloc[0]['AFFECTED_COUNT'] > 0:
-                alert_data = result.iloc[0]
-                alerts.append({
-                    "id": alert_data['ALERT_ID'],
-                    "pattern": alert_data['PATTERN'],
-                    "risk": alert_data['RISK_LEVEL'],
-                    "affected": int(alert_data['AFFECTED_COUNT']),
-                    "orgs": int(alert_data['ORG_COUNT']),
-                    "detected": "2 days ago",
-                    "score": int(alert_data['RISK_SCORE']) if alert_data['RISK_SCORE'] else 50
-                })
-        
-        # Query 5: High Frequency Claims (Low Risk)
-        if "Low" in risk_filter or not risk_filter:
-            velocity_query = f"""
-            SELECT 
-                'ALT-' || TO_CHAR(CURRENT_DATE(), 'YYYY') || '-005' as alert_id,
-                'High Frequency Insurance Claims' as pattern,
-                'Low' as risk_level,
-                COUNT(DISTINCT POLICY_HOLDER_ID) as affected_count,
-                1 as org_count,
-                ROUND(AVG(CLAIM_FREQUENCY * 10), 0) as risk_score,
-                48 as hours_ago
-            FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-            WHERE CLAIM_FREQUENCY >= 4
-                AND FRAUD_INDICATOR = 0
-                {time_condition.replace('b.LAST_ACTIVITY_DATE', 'LAST_CLAIM_DATE')}
-            """
-            result = conn.execute_query(velocity_query)
-            if not result.empty and result.iloc[0]['AFFECTED_COUNT'] > 0:
-                alert_data = result.iloc[0]
-                alerts.append({
-                    "id": alert_data['ALERT_ID'],
-                    "pattern": alert_data['PATTERN'],
-                    "risk": alert_data['RISK_LEVEL'],
-                    "affected": int(alert_data['AFFECTED_COUNT']),
-                    "orgs": int(alert_data['ORG_COUNT']),
-                    "detected": "2 days ago",
+                    "detected": detected_labels[name],
                     "score": int(alert_data['RISK_SCORE']) if alert_data['RISK_SCORE'] else 50
                 })
         
@@ -479,41 +307,16 @@ with tab1:
         
         st.markdown("<br>", unsafe_allow_html=True)
 
+# plotly is first needed here, after the alert tiles and alerts have rendered
+import plotly.express as px
+import plotly.graph_objects as go
+
 with tab2:
     st.markdown("### 📈 Fraud Pattern Analysis")
     
     try:
         # Real-time trend analysis from Snowflake
-        trend_query = """
-        WITH daily_fraud AS (
-            SELECT 
-                DATE_TRUNC('day', LAST_ACTIVITY_DATE) as date,
-                SUM(CASE WHEN DEFAULT_FLAG = 1 THEN 1 ELSE 0 END) as high_risk_count,
-                SUM(CASE WHEN CREDIT_SCORE BETWEEN 600 AND 699 THEN 1 ELSE 0 END) as medium_risk_count
-            FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-            WHERE LAST_ACTIVITY_DATE >= DATEADD('day', -30, CURRENT_DATE())
-            GROUP BY DATE_TRUNC('day', LAST_ACTIVITY_DATE)
-            
-            UNION ALL
-            
-            SELECT 
-                DATE_TRUNC('day', LAST_CLAIM_DATE) as date,
-                SUM(CASE WHEN FRAUD_INDICATOR = 1 THEN 1 ELSE 0 END) as high_risk_count,
-                SUM(CASE WHEN CLAIM_FREQUENCY BETWEEN 2 AND 4 THEN 1 ELSE 0 END) as medium_risk_count
-            FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-            WHERE LAST_CLAIM_DATE >= DATEADD('day', -30, CURRENT_DATE())
-            GROUP BY DATE_TRUNC('day', LAST_CLAIM_DATE)
-        )
-        SELECT 
-            date,
-            SUM(high_risk_count) as high_risk,
-            SUM(medium_risk_count) as medium_risk
-        FROM daily_fraud
-        GROUP BY date
-        ORDER BY date
-        """
-        
-        fraud_data = conn.execute_query(trend_query)
+        fraud_data = page_results['trend'].unwrap()
         
         if not fraud_data.empty:
             fraud_data['DATE'] = pd.to_datetime(fraud_data['DATE'])
@@ -552,53 +355,7 @@ with tab2:
     
     with col1:
         try:
-            pattern_query = """
-            SELECT 
-                'Multiple Claims + Defaults' as pattern_type,
-                COUNT(DISTINCT b.CUSTOMER_ID) as count
-            FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES b
-            JOIN INSURANCE_DB.RISK.CLAIM_RISK_SCORES i ON b.ZIP_CODE = i.ZIP_CODE AND b.AGE = i.AGE
-            WHERE b.DEFAULT_FLAG = 1 AND i.FRAUD_INDICATOR = 1
-            
-            UNION ALL
-            
-            SELECT 
-                'Low Credit Score' as pattern_type,
-                COUNT(DISTINCT CUSTOMER_ID) as count
-            FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-            WHERE CREDIT_SCORE < 600
-            
-            UNION ALL
-            
-            SELECT 
-                'High Value Returns' as pattern_type,
-                COUNT(DISTINCT CUSTOMER_ID) as count
-            FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-            WHERE HIGH_VALUE_RETURNS_FLAG = 1
-            
-            UNION ALL
-            
-            SELECT 
-                'High Frequency Claims' as pattern_type,
-                COUNT(DISTINCT POLICY_HOLDER_ID) as count
-            FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-            WHERE CLAIM_FREQUENCY >= 4
-            
-            UNION ALL
-            
-            SELECT 
-                'High-Risk ZIP Codes' as pattern_type,
-                COUNT(DISTINCT ZIP_CODE) as count
-            FROM (
-                SELECT ZIP_CODE FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES WHERE DEFAULT_FLAG = 1
-                UNION ALL SELECT ZIP_CODE FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES WHERE FRAUD_INDICATOR = 1
-                UNION ALL SELECT ZIP_CODE FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES WHERE HIGH_VALUE_RETURNS_FLAG = 1
-            )
-            GROUP BY ZIP_CODE
-            HAVING COUNT(*) >= 3
-            """
-            
-            pattern_dist = conn.execute_query(pattern_query)
+            pattern_dist = page_results['pattern_distribution'].unwrap()
             
             if not pattern_dist.empty:
                 pattern_dist.columns = ['Pattern Type', 'Count']
@@ -625,47 +382,7 @@ with tab2:
     with col2:
         # Cross-org involvement calculated from real data
         try:
-            org_query = """
-            WITH zip_age_orgs AS (
-                SELECT 
-                    ZIP_CODE || '-' || AGE as customer_key,
-                    'BANK' as org_name
-                FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-                WHERE DEFAULT_FLAG = 1 OR CREDIT_SCORE < 600
-                
-                UNION ALL
-                
-                SELECT 
-                    ZIP_CODE || '-' || AGE as customer_key,
-                    'INSURANCE' as org_name
-                FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-                WHERE FRAUD_INDICATOR = 1 OR CLAIM_FREQUENCY >= 4
-                
-                UNION ALL
-                
-                SELECT 
-                    ZIP_CODE || '-' || AGE as customer_key,
-                    'RETAIL' as org_name
-                FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-                WHERE HIGH_VALUE_RETURNS_FLAG = 1
-            )
-            SELECT 
-                CASE 
-                    WHEN org_count = 1 THEN '1 Org'
-                    WHEN org_count = 2 THEN '2 Orgs'
-                    WHEN org_count = 3 THEN '3 Orgs'
-                    ELSE '4+ Orgs'
-                END as organizations,
-                COUNT(*) as alerts
-            FROM (
-                SELECT customer_key, COUNT(DISTINCT org_name) as org_count
-                FROM zip_age_orgs
-                GROUP BY customer_key
-            )
-            GROUP BY org_count
-            """
-            
-            org_involvement = conn.execute_query(org_query)
+            org_involvement = page_results['org_involvement'].unwrap()
             
             if not org_involvement.empty:
                 org_involvement.columns = ['Organizations', 'Alerts']
@@ -696,29 +413,8 @@ with tab3:
         st.markdown("#### Performance Metrics (Real-Time)")
         
         try:
-            # Calculate real detection metrics
-            metrics_query = """
-            WITH fraud_stats AS (
-                SELECT 
-                    COUNT(*) as total_records,
-                    SUM(CASE WHEN default_flag = 1 OR fraud_indicator = 1 OR high_value_returns_flag = 1 THEN 1 ELSE 0 END) as detected_fraud
-                FROM (
-                    SELECT default_flag, 0 as fraud_indicator, 0 as high_value_returns_flag FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-                    UNION ALL
-                    SELECT 0, fraud_indicator, 0 FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-                    UNION ALL
-                    SELECT 0, 0, high_value_returns_flag FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-                )
-            )
-            SELECT 
-                ROUND((detected_fraud::FLOAT / NULLIF(total_records, 0)) * 100, 1) as detection_rate,
-                ROUND(100 - (detected_fraud::FLOAT / NULLIF(total_records, 0)) * 100, 1) as false_positive_rate,
-                total_records,
-                detected_fraud
-            FROM fraud_stats
-            """
-            
-            metrics_result = conn.execute_query(metrics_query)
+            # Real detection metrics
+            metrics_result = page_results['detection_metrics'].unwrap()
             
             if not metrics_result.empty:
                 detection_rate = float(metrics_result.iloc[0]['DETECTION_RATE'])
@@ -750,45 +446,7 @@ with tab3:
         st.markdown("#### Top Risk Factors (From Real Data)")
         
         try:
-            risk_factor_query = """
-            SELECT 
-                'Low Credit Score' as factor,
-                ROUND(AVG(CASE WHEN DEFAULT_FLAG = 1 THEN 1 ELSE 0 END), 2) as correlation
-            FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-            WHERE CREDIT_SCORE < 650
-            
-            UNION ALL
-            
-            SELECT 
-                'Multiple Claims Filed' as factor,
-                ROUND(AVG(CASE WHEN FRAUD_INDICATOR = 1 THEN 1 ELSE 0 END), 2) as correlation
-            FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
-            WHERE CLAIM_FREQUENCY >= 3
-            
-            UNION ALL
-            
-            SELECT 
-                'High Return Rate' as factor,
-                ROUND(AVG(CASE WHEN HIGH_VALUE_RETURNS_FLAG = 1 THEN 1 ELSE 0 END), 2) as correlation
-            FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
-            WHERE RETURN_RATE >= 0.2
-            
-            UNION ALL
-            
-            SELECT 
-                'High Transaction Amount' as factor,
-                ROUND(AVG(CASE WHEN DEFAULT_FLAG = 1 THEN 1 ELSE 0 END), 2) as correlation
-            FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
-            WHERE AVG_TRANSACTION_AMOUNT >= 3000
-            
-            UNION ALL
-            
-            SELECT 
-                'Cross-Organization Activity' as factor,
-                0.78 as correlation
-            """
-            
-            risk_factors = conn.execute_query(risk_factor_query)
+            risk_factors = page_results['risk_factors'].unwrap()
             
             if not risk_factors.empty:
                 risk_factors.columns = ['Factor', 'Correlation']
@@ -883,3 +541,5 @@ st.markdown("""
     <small>🔄 Last updated: Just now | 🔒 Privacy-safe aggregated patterns only</small>
 </div>
 """, unsafe_allow_html=True)
+
+startup.finish()
@@ -4,15 +4,20 @@ Export and reporting functionality
 """
 
 import streamlit as st
-import pandas as pd
-from datetime import datetime, timedelta
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
-from utils.snowflake_connector import get_connection
+from utils.startup_profiler import page_timer
+
+startup = page_timer("3_Reports")
+
+from datetime import datetime, timedelta
+from utils.query_limits import QueryLimits
 from components.loader import show_loader
 
+startup.mark('imports')
+
 st.set_page_config(
     page_title="Reports",
     page_icon="📄",
@@ -85,6 +90,9 @@ with col3:
         ["PDF", "Excel (XLSX)", "CSV", "JSON"]
     )
 
+# Budget for the report queries; breaches surface as the error below
+REPORT_LIMITS = QueryLimits(timeout=120, max_rows=10_000)
+
 # Generate Report Button
 if st.button("📄 Generate Report", type="primary", use_container_width=True):
     # Show loader
@@ -93,23 +101,22 @@ if st.button("📄 Generate Report", type="primary", use_container_width=True):
         show_loader("Generating report from live data")
     
     try:
-        # Get live data from Snowflake
+        # Get live data from Snowflake (the connector loads on the first report)
+        from utils.snowflake_connector import get_connection
         conn = get_connection()
         conn.connect()
         
         # Query fraud statistics
         fraud_stats_query = """
         SELECT 
-            COUNT(DISTINCT CASE WHEN b.DEFAULT_FLAG = 1 THEN b.CUSTOMER_ID END) as high_risk_bank,
-            COUNT(DISTINCT CASE WHEN i.FRAUD_INDICATOR = 1 THEN i.POLICY_HOLDER_ID END) as high_risk_insurance,
-            COUNT(DISTINCT CASE WHEN r.HIGH_VALUE_RETURNS_FLAG = 1 THEN r.CUSTOMER_ID END) as high_risk_retail
-        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES b
-        CROSS JOIN INSURANCE_DB.RISK.CLAIM_RISK_SCORES i
-        CROSS JOIN RETAIL_DB.RISK.CUSTOMER_RISK_SCORES r
+            (SELECT COUNT(DISTINCT CUSTOMER_ID) FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
+             WHERE DEFAULT_FLAG = 1) as high_risk_bank,
+            (SELECT COUNT(DISTINCT POLICY_HOLDER_ID) FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
+             WHERE FRAUD_INDICATOR = 1) as high_risk_insurance,
+            (SELECT COUNT(DISTINCT CUSTOMER_ID) FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
+             WHERE HIGH_VALUE_RETURNS_FLAG = 1) as high_risk_retail
         """
         
-        fraud_stats = conn.execute_query(fraud_stats_query)
-        
         # Query top risk ZIP codes
         zip_risk_query = """
         WITH zip_risks AS (
@@ -130,8 +137,6 @@ if st.button("📄 Generate Report", type="primary", use_container_width=True):
         LIMIT 1
         """
         
-        top_zip = conn.execute_query(zip_risk_query)
-        
         # Query age group analysis
         age_fraud_query = """
         SELECT 
@@ -154,7 +159,15 @@ if st.button("📄 Generate Report", type="primary", use_container_width=True):
         LIMIT 1
         """
         
-        top_age_group = conn.execute_query(age_fraud_query)
+        # Report queries are small aggregates: cap them well below the app-wide defaults
+        report_results = conn.execute_many({
+            'fraud_stats': fraud_stats_query,
+            'top_zip': zip_risk_query,
+            'top_age_group': age_fraud_query,
+        }, cache=True, limits=REPORT_LIMITS)
+        fraud_stats = report_results['fraud_stats'].unwrap()
+        top_zip = report_results['top_zip'].unwrap()
+        top_age_group = report_results['top_age_group'].unwrap()
         
         # Calculate totals
         total_high_risk = (fraud_stats.iloc[0]['HIGH_RISK_BANK'] + 
@@ -219,6 +232,7 @@ if st.button("📄 Generate Report", type="primary", use_container_width=True):
         st.info("Unable to fetch live data. Please check your Snowflake connection.")
         
         # Download buttons
+        import pandas as pd
         st.markdown("### 📥 Download Options")
         
         col1, col2, col3, col4 = st.columns(4)
@@ -351,3 +365,5 @@ st.markdown("""
     <small>🔒 All reports maintain privacy compliance | No individual PII included</small>
 </div>
 """, unsafe_allow_html=True)
+
+startup.finish()
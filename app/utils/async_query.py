@@ -0,0 +1,174 @@
+"""
+Async Query Utility
+Handles for queries submitted to Snowflake without waiting for the result
+"""
+
+import asyncio
+import time
+from typing import Any, MutableMapping, Optional
+
+import pandas as pd
+
+# Snowflake QueryStatus names that mean the query has not finished yet
+RUNNING_STATES = {
+    'RUNNING',
+    'QUEUED',
+    'RESUMING_WAREHOUSE',
+    'QUEUED_REPARING_WAREHOUSE',
+    'RESTARTED',
+    'BLOCKED',
+    'ABORTING',
+    'NO_DATA',
+}
+
+FAILED_STATES = {
+    'FAILED_WITH_ERROR',
+    'FAILED_WITH_INCIDENT',
+    'ABORTED',
+    'DISCONNECTED',
+}
+
+
+class AsyncQueryHandle:
+    """
+    Tracks one asynchronously submitted query by its Snowflake query id
+
+    The handle holds no connection: every poll, fetch or cancel borrows a
+    pooled connection for the duration of that call, so thousands of
+    outstanding handles cost nothing on the client.
+    """
+
+    def __init__(self, conn: Any, query_id: str, query: str, max_rows: Optional[int] = None):
+        """
+        Args:
+            conn: SnowflakeConnection that submitted the query
+            query_id: Snowflake query id (sfqid)
+            query: SQL text, kept for display and logging
+            max_rows: Row limit applied when the result is fetched
+        """
+        self._conn = conn
+        self.query_id = query_id
+        self.query = query
+        self.max_rows = max_rows
+        self.submitted_at = time.monotonic()
+        self.cancelled = False
+        self._status: Optional[str] = None
+        self._result: Optional[pd.DataFrame] = None
+
+    def __repr__(self) -> str:
+        return f"AsyncQueryHandle(query_id={self.query_id!r}, status={self._status!r})"
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the query was submitted"""
+        return time.monotonic() - self.submitted_at
+
+    def poll(self) -> str:
+        """
+        Fetches the current server-side status
+
+        Returns:
+            Snowflake QueryStatus name, e.g. RUNNING, SUCCESS, FAILED_WITH_ERROR
+        """
+        if self._status is None or self._status in RUNNING_STATES:
+            self._status = self._conn.query_status(self.query_id)
+        return self._status
+
+    def done(self) -> bool:
+        """Returns True once the query has succeeded, failed or been cancelled"""
+        return self.poll() not in RUNNING_STATES
+
+    def result(self, timeout: Optional[float] = None, poll_interval: float = 0.25) -> pd.DataFrame:
+        """
+        Blocks until the query finishes and returns its result
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+            poll_interval: Initial delay between status polls; backs off to 2s
+
+        Returns:
+            DataFrame with query results
+
+        Raises:
+            TimeoutError: If the query is still running after timeout seconds
+            RowLimitError: If the result has more than max_rows rows
+        """
+        if self._result is not None:
+            return self._result
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = poll_interval
+        while not self.done():
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise TimeoutError(f"Query {self.query_id} still running after {timeout:g}s")
+            time.sleep(delay)
+            delay = min(delay * 1.5, 2.0)
+
+        self._result = self._conn.fetch_query_result(self.query_id, self.max_rows)
+        return self._result
+
+    async def wait(self, timeout: Optional[float] = None, poll_interval: float = 0.25) -> pd.DataFrame:
+        """
+        Awaitable version of result() for use inside an asyncio event loop
+
+        Status polls and the final fetch run in worker threads so the event
+        loop is never blocked on network I/O.
+        """
+        if self._result is not None:
+            return self._result
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = poll_interval
+        while not await asyncio.to_thread(self.done):
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise TimeoutError(f"Query {self.query_id} still running after {timeout:g}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, 2.0)
+
+        self._result = await asyncio.to_thread(self._conn.fetch_query_result, self.query_id, self.max_rows)
+        return self._result
+
+    def cancel(self) -> bool:
+        """
+        Asks Snowflake to abort the query if it is still running
+
+        Returns:
+            True if a cancel request was sent, False if the query had already finished
+        """
+        if self.cancelled:
+            return False
+        if self._status is not None and self._status not in RUNNING_STATES:
+            return False
+        self._conn.cancel_query(self.query_id)
+        self.cancelled = True
+        self._status = 'ABORTING'
+        return True
+
+
+def replace_session_query(
+    session_state: MutableMapping[str, Any],
+    key: str,
+    handle: Optional[AsyncQueryHandle]
+) -> Optional[AsyncQueryHandle]:
+    """
+    Stores a handle in Streamlit session state, cancelling the one it replaces
+
+    Call this when a rerun (e.g. a filter change) submits a new query for a
+    slot, so the now-obsolete query stops consuming warehouse time.
+
+    Args:
+        session_state: st.session_state or any mutable mapping
+        key: Slot name, e.g. "fraud_alerts"
+        handle: New handle, or None to just cancel the current one
+
+    Returns:
+        The previous handle, if any
+    """
+    previous = session_state.get(key)
+    if isinstance(previous, AsyncQueryHandle) and previous is not handle:
+        try:
+            previous.cancel()
+        except Exception as e:
+            print(f"Failed to cancel query {previous.query_id}: {str(e)}")
+    session_state[key] = handle
+    return previous
@@ -0,0 +1,252 @@
+"""
+Audit Logger Utility
+Write-behind audit trail: entries are spooled locally and loaded in batches
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_SPOOL_PATH = Path(__file__).parent.parent.parent / ".cache" / "audit" / "audit_spool.jsonl"
+
+
+class AuditLogger:
+    """
+    Durable, batched audit log writer
+
+    log() appends one JSON line to a local spool file and returns; nothing
+    touches Snowflake on the caller's thread. A background thread reads the
+    spool from the last checkpoint, hands batches of up to ``batch_size``
+    entries to ``write_batch`` and advances the checkpoint only after the
+    batch was written. Entries spooled before a crash are replayed on the
+    next start, and a failing warehouse just makes the spool grow until it
+    recovers. The spool is truncated whenever the writer has caught up.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Dict[str, Any]]], None],
+        spool_path: Path = DEFAULT_SPOOL_PATH,
+        batch_size: int = 500,
+        flush_interval: float = 2.0,
+        max_spool_bytes: int = 256 * 1024 * 1024
+    ):
+        """
+        Args:
+            write_batch: Callable that persists a list of entries, raising on failure
+            spool_path: Local append-only spool file
+            batch_size: Maximum entries per write_batch call
+            flush_interval: Seconds between flushes when the spool is not full
+            max_spool_bytes: Spool size beyond which new entries are dropped
+        """
+        self._write_batch = write_batch
+        self.spool_path = Path(spool_path)
+        self.checkpoint_path = self.spool_path.with_suffix('.offset')
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_spool_bytes = max_spool_bytes
+
+        self._lock = threading.Lock()          # guards the spool file and counters
+        self._flush_lock = threading.Lock()    # one reader of the spool at a time
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        self._offset = self._recover()
+        self._spool = open(self.spool_path, 'ab')
+        self._pending = self._count_pending()
+
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+        self.corrupt = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_batch_seconds = 0.0
+        self.last_error: Optional[str] = None
+        self._oldest_pending: Optional[float] = time.time() if self._pending else None
+
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+
+    def log(self, entry: Dict[str, Any]) -> bool:
+        """
+        Queues one audit entry
+
+        Args:
+            entry: JSON-serialisable mapping of column name to value
+
+        Returns:
+            False if the entry was dropped because the spool is full
+        """
+        line = (json.dumps(entry, default=str) + '\n').encode('utf-8')
+        with self._lock:
+            if self._spool.tell() - self._offset >= self.max_spool_bytes:
+                self.dropped += 1
+                return False
+            # flush() hands the line to the OS, so it survives a process crash
+            self._spool.write(line)
+            self._spool.flush()
+            self.logged += 1
+            self._pending += 1
+            if self._oldest_pending is None:
+                self._oldest_pending = time.time()
+            wake = self._pending >= self.batch_size
+        if wake:
+            self._wakeup.set()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Writes everything spooled so far
+
+        Args:
+            timeout: Maximum seconds to spend (None waits until done or a batch fails)
+
+        Returns:
+            True if the spool was fully drained
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            written = self._drain_once()
+            with self._lock:
+                if self._pending == 0:
+                    return True
+            if written == 0 or (deadline is not None and time.monotonic() >= deadline):
+                return False
+
+    def close(self, timeout: float = 5.0):
+        """Stops the writer thread after a final best-effort flush"""
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self.flush(timeout)
+        with self._lock:
+            self._spool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns throughput and backpressure counters"""
+        with self._lock:
+            spool_bytes = self._spool.tell() if not self._spool.closed else 0
+            return {
+                'logged': self.logged,
+                'written': self.written,
+                'pending': self._pending,
+                'pending_bytes': max(spool_bytes - self._offset, 0),
+                'oldest_pending_age': time.time() - self._oldest_pending if self._oldest_pending else 0.0,
+                'dropped': self.dropped,
+                'corrupt': self.corrupt,
+                'batches': self.batches,
+                'failed_batches': self.failed_batches,
+                'last_batch_seconds': self.last_batch_seconds,
+                'last_error': self.last_error,
+            }
+
+    def _run(self):
+        """Writer loop: drains on a timer or as soon as a full batch is waiting"""
+        backoff = self.flush_interval
+        while not self._stopped.is_set():
+            self._wakeup.wait(backoff)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                drained = self.flush(timeout=self.flush_interval * 5)
+            except Exception as e:
+                drained = False
+                print(f"Audit writer error: {str(e)}")
+            # Back off while Snowflake is failing; the spool keeps everything
+            backoff = self.flush_interval if drained else min(backoff * 2, 60.0)
+
+    def _drain_once(self) -> int:
+        """Writes one batch from the checkpoint onwards; returns entries written"""
+        with self._flush_lock:
+            entries, end_offset, skipped = self._read_batch()
+            if not entries:
+                if skipped:
+                    self._advance(end_offset, 0, skipped)
+                return 0
+
+            start = time.perf_counter()
+            try:
+                self._write_batch(entries)
+            except Exception as e:
+                with self._lock:
+                    self.failed_batches += 1
+                    self.last_error = str(e)
+                print(f"Audit logging failed: {str(e)}")
+                return 0
+
+            with self._lock:
+                self.batches += 1
+                self.last_batch_seconds = time.perf_counter() - start
+                self.last_error = None
+            self._advance(end_offset, len(entries), skipped)
+            return len(entries)
+
+    def _read_batch(self):
+        """Reads up to batch_size complete lines after the checkpoint"""
+        entries: List[Dict[str, Any]] = []
+        skipped = 0
+        with open(self.spool_path, 'rb') as spool:
+            spool.seek(self._offset)
+            offset = self._offset
+            while len(entries) < self.batch_size:
+                line = spool.readline()
+                if not line.endswith(b'\n'):
+                    break  # end of file, or a line still being written
+                offset += len(line)
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    skipped += 1
+        return entries, offset, skipped
+
+    def _advance(self, offset: int, written: int, skipped: int):
+        """Moves the checkpoint forward and truncates the spool once caught up"""
+        with self._lock:
+            self._offset = offset
+            self.written += written
+            self.corrupt += skipped
+            self._pending = max(self._pending - written - skipped, 0)
+            if self._spool.tell() == self._offset:
+                # Caught up: start a fresh spool so it never grows unbounded
+                self._spool.truncate(0)
+                self._spool.seek(0)
+                self._offset = 0
+                self._pending = 0
+                self._oldest_pending = None
+            elif written:
+                self._oldest_pending = time.time()
+            self._write_checkpoint()
+
+    def _write_checkpoint(self):
+        tmp_path = self.checkpoint_path.with_suffix('.tmp')
+        tmp_path.write_text(str(self._offset), encoding='utf-8')
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _recover(self) -> int:
+        """Restores the checkpoint and repairs a line torn by a crash"""
+        size = self.spool_path.stat().st_size if self.spool_path.exists() else 0
+        try:
+            offset = int(self.checkpoint_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            offset = 0
+        if offset > size:
+            offset = 0  # spool was truncated before the checkpoint was updated
+
+        if size:
+            with open(self.spool_path, 'rb+') as spool:
+                spool.seek(-1, os.SEEK_END)
+                if spool.read(1) != b'\n':
+                    spool.write(b'\n')  # the torn line is skipped as corrupt
+        return offset
+
+    def _count_pending(self) -> int:
+        """Counts spooled lines not yet written (entries replayed after a restart)"""
+        with open(self.spool_path, 'rb') as spool:
+            spool.seek(self._offset)
+            return sum(1 for _ in spool)
@@ -0,0 +1,215 @@
+"""
+Cache Invalidation Utility
+Tracks the source tables behind cached results and detects when they change
+"""
+
+import re
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+from .result_cache import SQL_TOKEN_PATTERN
+
+# Fully qualified DATABASE.SCHEMA.OBJECT references in unquoted SQL
+TABLE_REFERENCE_PATTERN = re.compile(
+    r'\b([A-Z_][A-Z0-9_$]*)\.([A-Z_][A-Z0-9_$]*)\.([A-Z_][A-Z0-9_$]*)\b',
+    re.IGNORECASE
+)
+
+# Clean room views and the base tables they read (see snowflake/setup/02_create_clean_room.sql).
+# View metadata only changes on DDL, so results built on a view are tied to its tables too.
+_RISK_TABLES = frozenset({
+    'BANK_DB.RISK.CUSTOMER_RISK_SCORES',
+    'INSURANCE_DB.RISK.CLAIM_RISK_SCORES',
+    'RETAIL_DB.RISK.CUSTOMER_RISK_SCORES',
+})
+
+VIEW_DEPENDENCIES: Dict[str, FrozenSet[str]] = {
+    'CLEANROOM_DB.AGGREGATED_VIEWS.CROSS_ORG_RISK': _RISK_TABLES,
+    'CLEANROOM_DB.AGGREGATED_VIEWS.GEOGRAPHIC_RISK': _RISK_TABLES,
+    'CLEANROOM_DB.AGGREGATED_VIEWS.SEGMENT_ANALYSIS': _RISK_TABLES,
+}
+
+# Functions whose value changes with the clock or per call; such results must
+# keep a short TTL even when their source tables are unchanged
+_VOLATILE_PATTERN = re.compile(
+    r'\b(CURRENT_TIMESTAMP|CURRENT_DATE|CURRENT_TIME|LOCALTIMESTAMP|SYSDATE|GETDATE|'
+    r'RANDOM|UNIFORM|UUID_STRING|SNOWFLAKE\.CORTEX)\b',
+    re.IGNORECASE
+)
+
+
+def _code_only(query: str) -> str:
+    """Returns the query with string literals, quoted identifiers and comments blanked out"""
+    return SQL_TOKEN_PATTERN.sub(' ', query)
+
+
+def extract_source_tables(query: str) -> FrozenSet[str]:
+    """
+    Finds the base tables a query reads from
+
+    Only fully qualified names are recognised (every query in the app uses
+    them). Known clean room views are expanded to their underlying tables.
+
+    Args:
+        query: SQL query string
+
+    Returns:
+        Upper-cased DATABASE.SCHEMA.TABLE names
+    """
+    tables = set()
+    for match in TABLE_REFERENCE_PATTERN.finditer(_code_only(query)):
+        name = '.'.join(part.upper() for part in match.groups())
+        if name.startswith('SNOWFLAKE.'):
+            continue  # SNOWFLAKE.CORTEX.COMPLETE etc. are functions, not tables
+        tables.add(name)
+        tables.update(VIEW_DEPENDENCIES.get(name, ()))
+    return frozenset(tables)
+
+
+def is_time_dependent(query: str) -> bool:
+    """True if the query's result can change without any source table changing"""
+    return bool(_VOLATILE_PATTERN.search(_code_only(query)))
+
+
+def build_last_altered_query(tables: Iterable[str]) -> str:
+    """
+    Builds one metadata query returning LAST_ALTERED for every given table
+
+    INFORMATION_SCHEMA is per database, so each database contributes one
+    branch of a UNION ALL; the whole batch is a single round trip served by
+    the cloud services layer.
+
+    Args:
+        tables: Fully qualified, upper-cased table names
+
+    Returns:
+        SQL returning TABLE_NAME (fully qualified) and VERSION (epoch ms) columns
+    """
+    by_database: Dict[str, List[tuple]] = {}
+    for table in sorted(set(tables)):
+        database, schema, name = table.split('.')
+        by_database.setdefault(database, []).append((schema, name))
+
+    branches = []
+    for database, names in by_database.items():
+        predicates = ' OR '.join(
+            f"(TABLE_SCHEMA = '{schema}' AND TABLE_NAME = '{name}')" for schema, name in names
+        )
+        branches.append(f"""
+        SELECT
+            TABLE_CATALOG || '.' || TABLE_SCHEMA || '.' || TABLE_NAME AS TABLE_NAME,
+            DATE_PART(EPOCH_MILLISECOND, LAST_ALTERED) AS VERSION
+        FROM {database}.INFORMATION_SCHEMA.TABLES
+        WHERE {predicates}
+        """)
+    return '\nUNION ALL\n'.join(branches)
+
+
+class SourceChangeMonitor:
+    """
+    Keeps the LAST_ALTERED version of every table behind a cached result
+
+    Versions are refreshed lazily: a lookup polls Snowflake at most once per
+    ``poll_interval`` (or immediately for a table never seen before), and
+    every poll covers all tracked tables in one batched metadata query. When
+    a table's version moves forward, ``on_change`` receives the full version
+    map so the cache can drop exactly the entries built on the old data.
+    """
+
+    def __init__(
+        self,
+        fetch_versions: Callable[[List[str]], Dict[str, int]],
+        on_change: Optional[Callable[[Dict[str, int]], None]] = None,
+        poll_interval: float = 15.0
+    ):
+        """
+        Args:
+            fetch_versions: Callable returning {table: version} for a list of tables
+            on_change: Called with the current versions after a change is seen
+            poll_interval: Minimum seconds between metadata polls
+        """
+        self._fetch_versions = fetch_versions
+        self._on_change = on_change
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._tracked: set = set()
+        self._last_poll = 0.0
+
+        self.polls = 0
+        self.changes = 0
+        self.poll_errors = 0
+
+    def versions(self, tables: Iterable[str]) -> Dict[str, int]:
+        """
+        Returns current versions for the given tables, polling if due
+
+        Args:
+            tables: Fully qualified table names
+
+        Returns:
+            {table: version}; tables Snowflake did not report are omitted
+        """
+        tables = set(tables)
+        with self._lock:
+            unseen = tables - self._tracked
+            self._tracked |= tables
+            due = unseen or time.monotonic() - self._last_poll >= self.poll_interval
+        if due:
+            self.poll(block=bool(unseen))
+        with self._lock:
+            return {table: self._versions[table] for table in tables if table in self._versions}
+
+    def poll(self, block: bool = True):
+        """
+        Refreshes versions for all tracked tables
+
+        Args:
+            block: Wait for a poll already in progress instead of skipping
+        """
+        if not self._poll_lock.acquire(blocking=block):
+            return
+        try:
+            with self._lock:
+                tables = sorted(self._tracked)
+            if not tables:
+                return
+            try:
+                latest = self._fetch_versions(tables)
+            except Exception as e:
+                # Keep serving; entries still expire on their TTL
+                print(f"Source version poll failed: {str(e)}")
+                with self._lock:
+                    self.poll_errors += 1
+                    self._last_poll = time.monotonic()
+                return
+
+            with self._lock:
+                self.polls += 1
+                self._last_poll = time.monotonic()
+                changed = {
+                    table for table, version in latest.items()
+                    if version > self._versions.get(table, -1)
+                }
+                self._versions.update(latest)
+                current = dict(self._versions)
+                if changed:
+                    self.changes += 1
+
+            if changed and self._on_change is not None:
+                self._on_change(current)
+        finally:
+            self._poll_lock.release()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns poll counters and the number of tracked tables"""
+        with self._lock:
+            return {
+                'tracked_tables': len(self._tracked),
+                'polls': self.polls,
+                'changes': self.changes,
+                'poll_errors': self.poll_errors,
+            }
@@ -0,0 +1,205 @@
+"""
+Config Utility
+Parses config/config.yaml once per process and reloads it only when the file changes
+"""
+
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+APP_DIR = Path(__file__).parent.parent
+DEFAULT_CONFIG_PATH = APP_DIR.parent / "config" / "config.yaml"
+
+
+class ConfigError(ValueError):
+    """Raised when config.yaml cannot be parsed or fails validation"""
+
+
+@dataclass(frozen=True)
+class Organization:
+    """One participating organization from the registry"""
+    id: str
+    name: str
+    type: str
+    icon: str = "🏢"
+
+    @property
+    def label(self) -> str:
+        """Display name with icon, e.g. '🏦 Metro Bank'"""
+        return f"{self.icon} {self.name}"
+
+
+# Used when config.yaml is missing, so pages always have a registry to show
+DEFAULT_ORGANIZATIONS = (
+    Organization("bank_001", "Metro Bank", "bank", "🏦"),
+    Organization("insurance_001", "SafeGuard Insurance", "insurance", "🛡️"),
+    Organization("retail_001", "RetailCorp", "retail", "🛒"),
+)
+
+
+@dataclass(frozen=True)
+class AppConfig:
+    """
+    Parsed and validated application configuration
+
+    Attributes:
+        application: The ``application`` section (name, version, description)
+        organizations: Organization registry, in file order
+        raw: The whole parsed document, for sections without a typed view
+        source: File it was read from, or None for the built-in defaults
+    """
+    application: Dict[str, Any] = field(default_factory=dict)
+    organizations: Tuple[Organization, ...] = DEFAULT_ORGANIZATIONS
+    raw: Dict[str, Any] = field(default_factory=dict)
+    source: Optional[Path] = None
+
+    def organization_names(self) -> List[str]:
+        return [org.name for org in self.organizations]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Reads a top-level section of the raw document"""
+        return self.raw.get(key, default)
+
+
+def parse_organizations(entries: Any) -> Tuple[Organization, ...]:
+    """
+    Validates the ``organizations`` section
+
+    Every entry needs a non-empty id, name and type; ids and names must be
+    unique, since pages key widgets and filters on them.
+
+    Raises:
+        ConfigError: Describing the first invalid entry
+    """
+    if not isinstance(entries, list) or not entries:
+        raise ConfigError("'organizations' must be a non-empty list")
+
+    organizations = []
+    seen_ids, seen_names = set(), set()
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ConfigError(f"organizations[{index}] must be a mapping")
+        values = {}
+        for key in ('id', 'name', 'type'):
+            value = entry.get(key)
+            if not isinstance(value, str) or not value.strip():
+                raise ConfigError(f"organizations[{index}] is missing '{key}'")
+            values[key] = value.strip()
+        if values['id'] in seen_ids:
+            raise ConfigError(f"Duplicate organization id '{values['id']}'")
+        if values['name'] in seen_names:
+            raise ConfigError(f"Duplicate organization name '{values['name']}'")
+        seen_ids.add(values['id'])
+        seen_names.add(values['name'])
+        organizations.append(Organization(
+            id=values['id'],
+            name=values['name'],
+            type=values['type'].lower(),
+            icon=str(entry.get('icon') or "🏢"),
+        ))
+    return tuple(organizations)
+
+def parse_config(text: str, source: Optional[Path] = None) -> AppConfig:
+    """
+    Parses and validates a config document
+
+    Raises:
+        ConfigError: If the YAML is malformed or a section is invalid
+    """
+    import yaml
+
+    try:
+        document = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise ConfigError(f"Malformed YAML: {str(e)}") from e
+    if document is None:
+        document = {}
+    if not isinstance(document, dict):
+        raise ConfigError("The config file must contain a mapping")
+
+    application = document.get('application') or {}
+    if not isinstance(application, dict):
+        raise ConfigError("'application' must be a mapping")
+
+    organizations = DEFAULT_ORGANIZATIONS
+    if 'organizations' in document:
+        organizations = parse_organizations(document['organizations'])
+
+    return AppConfig(application=application, organizations=organizations, raw=document, source=source)
+
+
+class ConfigService:
+    """
+    Serves the parsed config, re-reading the file only when it changes
+
+    Each get() costs one stat() call. The file is parsed again when its
+    modification time or size differs from the last read. A file that
+    fails validation is reported and the last valid config keeps being
+    served, so a bad edit cannot take the pages down.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CONFIG_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._config = AppConfig()
+        self._signature: Optional[Tuple[int, int]] = None
+        self.loads = 0
+        self.last_error: Optional[str] = None
+
+    def get(self) -> AppConfig:
+        """Returns the current config, reloading it if the file changed"""
+        try:
+            stat = self.path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+
+        with self._lock:
+            if signature == self._signature:
+                return self._config
+            if signature is None:
+                # File removed (or never there): fall back to the defaults
+                self._config = AppConfig()
+                self._signature = None
+                return self._config
+            try:
+                config = parse_config(self.path.read_text(encoding='utf-8'), self.path)
+            except (OSError, ConfigError) as e:
+                self.last_error = str(e)
+                print(f"Ignoring invalid config {self.path}: {self.last_error}")
+            else:
+                self._config = config
+                self.last_error = None
+                self.loads += 1
+            # Remember the signature either way, so a bad file is not re-parsed on every rerun
+            self._signature = signature
+            return self._config
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns how often the file was parsed and the last validation error"""
+        with self._lock:
+            return {
+                'path': str(self.path),
+                'loads': self.loads,
+                'last_error': self.last_error,
+            }
+
+
+# Shared instance - one parse per process until the file changes
+_service = None
+_service_lock = threading.Lock()
+
+def get_config_service() -> ConfigService:
+    """Returns the process-wide ConfigService (path from SECURE_INSIGHTS_CONFIG)"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ConfigService(Path(os.getenv('SECURE_INSIGHTS_CONFIG', str(DEFAULT_CONFIG_PATH))))
+    return _service
+
+def get_config() -> AppConfig:
+    """Returns the current application config"""
+    return get_config_service().get()
@@ -0,0 +1,348 @@
+"""
+Connection Pool Utility
+Bounded, thread-safe pool of Snowflake connections shared by all sessions
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when no pooled connection becomes available before the timeout"""
+
+
+class PooledConnection:
+    """A raw connection plus the bookkeeping the pool needs"""
+
+    def __init__(self, raw: Any):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.checkouts = 0
+
+    @property
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_used
+
+    @property
+    def age_seconds(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class ConnectionPool:
+    """
+    Hands out connections one checkout at a time
+
+    Connections are created lazily up to ``max_size``. Callers beyond that
+    block until a connection is released or ``checkout_timeout`` expires.
+    Idle connections are health-checked on checkout and closed once they
+    have been idle for longer than ``max_idle_seconds``. Connections older
+    than ``max_age_seconds`` are recycled on checkout, and a connection
+    whose error matches ``is_broken`` is discarded instead of reused.
+    """
+
+    def __init__(
+        self,
+        connect_fn: Callable[[], Any],
+        max_size: int = 8,
+        max_idle_seconds: float = 300.0,
+        health_check_after: float = 60.0,
+        checkout_timeout: float = 30.0,
+        max_age_seconds: Optional[float] = None,
+        is_broken: Optional[Callable[[Exception], bool]] = None
+    ):
+        """
+        Args:
+            connect_fn: Zero-argument callable that opens a new raw connection
+            max_size: Maximum number of open connections
+            max_idle_seconds: Idle time after which a connection is closed
+            health_check_after: Idle time after which a checkout runs a probe query
+            checkout_timeout: Seconds to wait for a free connection
+            max_age_seconds: Lifetime after which a connection is recycled (None = unlimited)
+            is_broken: Predicate marking an error as fatal for the connection it occurred on
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self._connect_fn = connect_fn
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+        self.max_age_seconds = max_age_seconds
+        self._is_broken = is_broken
+
+        # LIFO stack so the most recently used (warmest) connection is reused first
+        self._idle: List[PooledConnection] = []
+        self._open: List[PooledConnection] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._created = 0
+        self._evicted = 0
+        self._unhealthy = 0
+        self._recycled = 0
+        self._broken = 0
+        self._waits = 0
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """
+        Checks out a healthy connection, opening a new one if allowed
+
+        Args:
+            timeout: Seconds to wait for a free connection (defaults to checkout_timeout)
+
+        Returns:
+            PooledConnection that must be handed back with release()
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            pooled = None
+            stale: List[PooledConnection] = []
+
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+
+                    stale.extend(self._pop_expired_locked())
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        # Reserve a slot; the connection is opened outside the lock
+                        self._size += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolExhaustedError(
+                            f"No Snowflake connection available after {timeout:g}s "
+                            f"(pool size {self.max_size})"
+                        )
+                    self._waits += 1
+                    self._cond.wait(remaining)
+
+            for expired in stale:
+                self._close_raw(expired.raw)
+
+            if pooled is None:
+                try:
+                    pooled = PooledConnection(self._connect_fn())
+                except Exception:
+                    self._release_slot()
+                    raise
+                with self._cond:
+                    self._created += 1
+                    self._open.append(pooled)
+            elif self._is_too_old(pooled):
+                with self._cond:
+                    self._recycled += 1
+                self._discard(pooled)
+                continue
+            elif not self._is_healthy(pooled):
+                with self._cond:
+                    self._unhealthy += 1
+                self._discard(pooled)
+                continue
+
+            pooled.checkouts += 1
+            return pooled
+
+    def release(self, pooled: PooledConnection, discard: bool = False):
+        """
+        Returns a connection to the pool
+
+        Args:
+            pooled: Connection previously returned by acquire()
+            discard: Close the connection instead of keeping it for reuse
+        """
+        pooled.last_used = time.monotonic()
+
+        if discard or self._closed or self._raw_is_closed(pooled.raw):
+            self._discard(pooled)
+            return
+
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Context manager yielding a raw connection for the duration of the block
+
+        Args:
+            timeout: Seconds to wait for a free connection
+        """
+        pooled = self.acquire(timeout)
+        discard = False
+        try:
+            yield pooled.raw
+        except Exception as e:
+            if self._is_broken is not None and self._is_broken(e):
+                with self._cond:
+                    self._broken += 1
+                discard = True
+            else:
+                discard = self._raw_is_closed(pooled.raw)
+            raise
+        finally:
+            self.release(pooled, discard=discard)
+
+    def prefill(self, count: int) -> int:
+        """
+        Opens connections ahead of demand so later checkouts skip authentication
+
+        Connections are opened in parallel, so the handshakes overlap, and
+        handed back to the idle stack. Already idle connections count
+        towards ``count``.
+
+        Args:
+            count: Number of connections to have open (capped at max_size)
+
+        Returns:
+            Number of connections newly opened
+
+        Raises:
+            Exception: The first connection error, after the others are released
+        """
+        count = min(count, self.max_size)
+        if count < 1:
+            return 0
+        with self._cond:
+            created = self._created
+
+        # Holding every checkout until all are done forces distinct connections
+        with ThreadPoolExecutor(max_workers=count, thread_name_prefix='pool-prefill') as executor:
+            futures = [executor.submit(self.acquire) for _ in range(count)]
+        error = None
+        for future in futures:
+            try:
+                self.release(future.result())
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+        with self._cond:
+            return self._created - created
+
+    def evict_idle(self) -> int:
+        """
+        Closes connections that have been idle longer than max_idle_seconds
+
+        Returns:
+            Number of connections closed
+        """
+        with self._cond:
+            stale = self._pop_expired_locked()
+        for pooled in stale:
+            self._close_raw(pooled.raw)
+        return len(stale)
+
+    def close(self):
+        """Closes every idle connection and refuses further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._forget_locked(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close_raw(pooled.raw)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns a snapshot of pool counters"""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'open': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'created': self._created,
+                'evicted': self._evicted,
+                'unhealthy': self._unhealthy,
+                'recycled': self._recycled,
+                'broken': self._broken,
+                'waits': self._waits,
+            }
+
+    def connection_ages(self) -> List[float]:
+        """Returns the age in seconds of every open connection, oldest first"""
+        with self._cond:
+            return sorted((pooled.age_seconds for pooled in self._open), reverse=True)
+
+    def _pop_expired_locked(self) -> List[PooledConnection]:
+        """Removes idle-expired connections; caller holds the lock and closes them"""
+        if not self._idle:
+            return []
+        keep, stale = [], []
+        for pooled in self._idle:
+            if pooled.idle_seconds > self.max_idle_seconds:
+                stale.append(pooled)
+            else:
+                keep.append(pooled)
+        if stale:
+            self._idle = keep
+            self._size -= len(stale)
+            self._forget_locked(stale)
+            self._evicted += len(stale)
+            self._cond.notify(len(stale))
+        return stale
+
+    def _forget_locked(self, closed: List[PooledConnection]):
+        """Drops closed connections from the open-connection registry"""
+        gone = {id(pooled) for pooled in closed}
+        self._open = [pooled for pooled in self._open if id(pooled) not in gone]
+
+    def _is_too_old(self, pooled: PooledConnection) -> bool:
+        return self.max_age_seconds is not None and pooled.age_seconds > self.max_age_seconds
+
+    def _is_healthy(self, pooled: PooledConnection) -> bool:
+        """Cheap liveness check, with a probe query after long idle periods"""
+        if self._raw_is_closed(pooled.raw):
+            return False
+        if pooled.idle_seconds < self.health_check_after:
+            return True
+        try:
+            cursor = pooled.raw.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, pooled: PooledConnection):
+        self._close_raw(pooled.raw)
+        with self._cond:
+            self._forget_locked([pooled])
+        self._release_slot()
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _raw_is_closed(raw: Any) -> bool:
+        try:
+            return bool(raw.is_closed())
+        except Exception:
+            return True
+
+    @staticmethod
+    def _close_raw(raw: Any):
+        try:
+            raw.close()
+        except Exception:
+            pass
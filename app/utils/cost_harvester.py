@@ -0,0 +1,453 @@
+"""
+Cost Harvester Utility
+Pulls QUERY_HISTORY for the app's tagged statements into a local store and ranks features by cost
+"""
+
+import argparse
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from .query_metrics import fingerprint_sql
+from .query_tags import APP_NAME, parse_query_tag
+
+DEFAULT_COST_DB_PATH = Path(__file__).parent.parent.parent / ".cache" / "costs" / "query_costs.sqlite"
+
+# Credits per hour of a standard warehouse, used when Snowflake has not
+# (yet) attributed compute credits to a query
+WAREHOUSE_CREDITS_PER_HOUR = {
+    'X-SMALL': 1, 'SMALL': 2, 'MEDIUM': 4, 'LARGE': 8, 'X-LARGE': 16,
+    '2X-LARGE': 32, '3X-LARGE': 64, '4X-LARGE': 128, '5X-LARGE': 256, '6X-LARGE': 512,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_costs (
+    query_id TEXT PRIMARY KEY,
+    start_time REAL NOT NULL,
+    page TEXT,
+    feature TEXT,
+    session TEXT,
+    kind TEXT,
+    fingerprint TEXT,
+    query_text TEXT,
+    warehouse TEXT,
+    warehouse_size TEXT,
+    status TEXT,
+    elapsed_ms REAL,
+    execution_ms REAL,
+    compilation_ms REAL,
+    queued_ms REAL,
+    bytes_scanned INTEGER,
+    cache_fraction REAL,
+    partitions_scanned INTEGER,
+    partitions_total INTEGER,
+    bytes_spilled INTEGER,
+    rows_produced INTEGER,
+    credits_compute REAL,
+    credits_estimated REAL,
+    credits_cloud_services REAL,
+    query_type TEXT,
+    result_reused INTEGER
+);
+CREATE INDEX IF NOT EXISTS query_costs_start ON query_costs (start_time);
+CREATE TABLE IF NOT EXISTS harvest_state (key TEXT PRIMARY KEY, value REAL);
+"""
+
+_COLUMNS = [
+    'query_id', 'start_time', 'page', 'feature', 'session', 'kind', 'fingerprint', 'query_text',
+    'warehouse', 'warehouse_size', 'status', 'elapsed_ms', 'execution_ms', 'compilation_ms',
+    'queued_ms', 'bytes_scanned', 'cache_fraction', 'partitions_scanned', 'partitions_total',
+    'bytes_spilled', 'rows_produced', 'credits_compute', 'credits_estimated', 'credits_cloud_services',
+    'query_type', 'result_reused',
+]
+
+# Columns added after the first release; created on stores that predate them
+_ADDED_COLUMNS = {'query_type': 'TEXT', 'result_reused': 'INTEGER'}
+
+
+def build_history_query(since: float, use_attribution: bool = True) -> str:
+    """
+    Builds the ACCOUNT_USAGE query for app statements started after a point in time
+
+    Args:
+        since: Epoch seconds
+        use_attribution: Join QUERY_ATTRIBUTION_HISTORY for per-query compute credits
+
+    Returns:
+        SQL string
+    """
+    credits = "a.CREDITS_ATTRIBUTED_COMPUTE" if use_attribution else "NULL"
+    attribution_join = (
+        "LEFT JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY a ON a.QUERY_ID = q.QUERY_ID"
+        if use_attribution else ""
+    )
+    return f"""
+    SELECT
+        q.QUERY_ID,
+        q.QUERY_TAG,
+        q.QUERY_TEXT,
+        q.QUERY_TYPE,
+        DATE_PART(EPOCH_MILLISECOND, q.START_TIME) / 1000 AS START_EPOCH,
+        q.WAREHOUSE_NAME,
+        q.WAREHOUSE_SIZE,
+        q.EXECUTION_STATUS,
+        q.TOTAL_ELAPSED_TIME,
+        q.EXECUTION_TIME,
+        q.COMPILATION_TIME,
+        q.QUEUED_PROVISIONING_TIME + q.QUEUED_REPAIR_TIME + q.QUEUED_OVERLOAD_TIME AS QUEUED_TIME,
+        q.BYTES_SCANNED,
+        q.PERCENTAGE_SCANNED_FROM_CACHE,
+        q.PARTITIONS_SCANNED,
+        q.PARTITIONS_TOTAL,
+        q.BYTES_SPILLED_TO_LOCAL_STORAGE + q.BYTES_SPILLED_TO_REMOTE_STORAGE AS BYTES_SPILLED,
+        q.ROWS_PRODUCED,
+        q.CREDITS_USED_CLOUD_SERVICES,
+        {credits} AS CREDITS_COMPUTE
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY q
+    {attribution_join}
+    WHERE q.START_TIME >= TO_TIMESTAMP_LTZ({int(since)})
+      AND q.QUERY_TAG LIKE '{{"app":"{APP_NAME}",%'
+    ORDER BY q.START_TIME
+    """
+
+
+def estimate_credits(execution_ms: Optional[float], warehouse_size: Optional[str]) -> Optional[float]:
+    """Approximates compute credits from execution time and warehouse size"""
+    if execution_ms is None or not warehouse_size:
+        return None
+    rate = WAREHOUSE_CREDITS_PER_HOUR.get(str(warehouse_size).upper().replace('XSMALL', 'X-SMALL'))
+    if rate is None:
+        return None
+    return float(execution_ms) / 3_600_000 * rate
+
+
+def is_result_reuse(record: Dict[str, Any]) -> bool:
+    """
+    Tells whether a QUERY_HISTORY row was answered from Snowflake's result cache
+
+    QUERY_HISTORY has no reuse flag, but a SELECT served from the persisted
+    result set runs on no warehouse and scans no bytes. (A query answered
+    from table metadata alone, such as a bare COUNT(*), looks the same and
+    is equally free.)
+    """
+    return (
+        record.get('EXECUTION_STATUS') == 'SUCCESS'
+        and record.get('QUERY_TYPE') == 'SELECT'
+        and not record.get('WAREHOUSE_SIZE')
+        and not _number(record.get('BYTES_SCANNED'))
+    )
+
+
+def _number(value: Any) -> Optional[float]:
+    """Converts a QUERY_HISTORY cell to float, mapping NULL/NaN to None"""
+    if value is None or pd.isna(value):
+        return None
+    return float(value)
+
+
+class CostHarvester:
+    """
+    Periodically copies per-query cost data for the app into SQLite
+
+    ACCOUNT_USAGE views lag by up to 45 minutes and per-query credit
+    attribution by several hours, so every harvest re-reads a trailing
+    ``refresh_window`` before its watermark and upserts by query id; late
+    rows and late credits both land on a later run. Statements are
+    attributed to a page and feature through the QUERY_TAG the connector
+    sets, and queries whose credits are not attributed yet fall back to an
+    estimate from execution time and warehouse size.
+    """
+
+    def __init__(
+        self,
+        fetch_fn: Callable[[str], pd.DataFrame],
+        db_path: Path = DEFAULT_COST_DB_PATH,
+        interval: float = 3600.0,
+        initial_days: float = 7.0,
+        refresh_window: float = 8 * 3600.0,
+        use_attribution: bool = True
+    ):
+        """
+        Args:
+            fetch_fn: Runs a SQL string against Snowflake and returns a DataFrame
+            db_path: Local SQLite store
+            interval: Seconds between harvests when running in the background
+            initial_days: History to load on the first harvest
+            refresh_window: Seconds before the watermark that are re-read each time
+            use_attribution: Read credits from QUERY_ATTRIBUTION_HISTORY
+        """
+        self._fetch_fn = fetch_fn
+        self.db_path = Path(db_path)
+        self.interval = interval
+        self.initial_days = initial_days
+        self.refresh_window = refresh_window
+        self.use_attribution = use_attribution
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.harvests = 0
+        self.last_harvest_at: Optional[float] = None
+        self.last_rows = 0
+        self.last_error: Optional[str] = None
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.executescript(_SCHEMA)
+            existing = {row[1] for row in db.execute("PRAGMA table_info(query_costs)")}
+            for column, column_type in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    db.execute(f"ALTER TABLE query_costs ADD COLUMN {column} {column_type}")
+
+    def harvest(self) -> int:
+        """
+        Loads new and updated history rows into the store
+
+        Returns:
+            Number of rows upserted
+        """
+        with self._lock:
+            watermark = self._get_state('watermark')
+            since = (
+                watermark - self.refresh_window
+                if watermark is not None
+                else time.time() - self.initial_days * 86400
+            )
+            try:
+                history = self._fetch_fn(build_history_query(since, self.use_attribution))
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+
+            rows = self._to_rows(history)
+            if rows:
+                with closing(self._connect()) as db, db:
+                    db.executemany(
+                        f"INSERT OR REPLACE INTO query_costs ({', '.join(_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                        [tuple(row[column] for column in _COLUMNS) for row in rows],
+                    )
+                newest = max(row['start_time'] for row in rows)
+                self._set_state('watermark', max(newest, watermark or 0.0))
+
+            self.harvests += 1
+            self.last_harvest_at = time.time()
+            self.last_rows = len(rows)
+            self.last_error = None
+            return len(rows)
+
+    def report(self, days: float = 7.0, limit: int = 20) -> pd.DataFrame:
+        """
+        Ranks app features by credits spent
+
+        Args:
+            days: Look-back period
+            limit: Maximum number of features returned
+
+        Returns:
+            DataFrame with one row per (page, feature), most expensive first
+        """
+        query = """
+        SELECT
+            page,
+            feature,
+            COUNT(*) AS queries,
+            SUM(COALESCE(credits_compute, credits_estimated, 0) + COALESCE(credits_cloud_services, 0)) AS credits,
+            SUM(credits_compute IS NULL) AS estimated_queries,
+            SUM(bytes_scanned) AS bytes_scanned,
+            SUM(partitions_scanned) AS partitions_scanned,
+            SUM(partitions_total) AS partitions_total,
+            SUM(queued_ms) / 1000.0 AS queued_seconds,
+            SUM(elapsed_ms) / 1000.0 AS elapsed_seconds,
+            MAX(elapsed_ms) / 1000.0 AS max_elapsed_seconds,
+            SUM(bytes_spilled) AS bytes_spilled,
+            SUM(status != 'SUCCESS') AS failed_queries,
+            SUM(query_type = 'SELECT') AS selects,
+            SUM(result_reused) AS result_reused
+        FROM query_costs
+        WHERE start_time >= ?
+        GROUP BY page, feature
+        ORDER BY credits DESC, elapsed_seconds DESC
+        LIMIT ?
+        """
+        with closing(self._connect()) as db:
+            report = pd.read_sql_query(query, db, params=(time.time() - days * 86400, limit))
+        if report.empty:
+            return report
+
+        total = report['credits'].sum()
+        report['credit_share'] = report['credits'] / total if total else 0.0
+        # Fraction of micro-partitions read: close to 1 means pruning did not help
+        report['partitions_scanned_ratio'] = (
+            report['partitions_scanned'] / report['partitions_total'].where(report['partitions_total'] > 0)
+        )
+        report['result_reuse_rate'] = report['result_reused'] / report['selects'].where(report['selects'] > 0)
+        return report
+
+    def reuse_summary(self, days: float = 7.0) -> Dict[str, Any]:
+        """
+        Reports how often Snowflake served app SELECTs from its result cache
+
+        Args:
+            days: Look-back period
+
+        Returns:
+            Dictionary with selects, reused and reuse_rate
+        """
+        query = """
+        SELECT COUNT(*), COALESCE(SUM(result_reused), 0)
+        FROM query_costs
+        WHERE start_time >= ? AND query_type = 'SELECT'
+        """
+        with closing(self._connect()) as db:
+            selects, reused = db.execute(query, (time.time() - days * 86400,)).fetchone()
+        return {
+            'selects': selects,
+            'reused': reused,
+            'reuse_rate': reused / selects if selects else 0.0,
+        }
+
+    def top_queries(self, page: str, feature: str, days: float = 7.0, limit: int = 5) -> pd.DataFrame:
+        """Returns the most expensive query shapes behind one feature"""
+        query = """
+        SELECT
+            fingerprint,
+            COUNT(*) AS queries,
+            SUM(COALESCE(credits_compute, credits_estimated, 0) + COALESCE(credits_cloud_services, 0)) AS credits,
+            SUM(bytes_scanned) AS bytes_scanned,
+            AVG(elapsed_ms) / 1000.0 AS mean_elapsed_seconds,
+            MAX(query_text) AS sample_query
+        FROM query_costs
+        WHERE start_time >= ? AND page = ? AND feature = ?
+        GROUP BY fingerprint
+        ORDER BY credits DESC
+        LIMIT ?
+        """
+        with closing(self._connect()) as db:
+            return pd.read_sql_query(query, db, params=(time.time() - days * 86400, page, feature, limit))
+
+    def start(self):
+        """Starts harvesting every ``interval`` seconds on a daemon thread"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='cost-harvester', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stops the background thread"""
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns harvest counters and the size of the store"""
+        with closing(self._connect()) as db:
+            stored = db.execute("SELECT COUNT(*) FROM query_costs").fetchone()[0]
+        return {
+            'harvests': self.harvests,
+            'last_harvest_at': self.last_harvest_at,
+            'last_rows': self.last_rows,
+            'last_error': self.last_error,
+            'stored_queries': stored,
+        }
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.harvest()
+            except Exception as e:
+                print(f"Cost harvest failed: {str(e)}")
+            self._stopped.wait(self.interval)
+
+    def _to_rows(self, history: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Maps QUERY_HISTORY columns to store rows, skipping statements with foreign tags"""
+        rows = []
+        for record in history.to_dict('records'):
+            tag = parse_query_tag(record.get('QUERY_TAG'))
+            if tag is None:
+                continue
+            execution_ms = _number(record.get('EXECUTION_TIME'))
+            text = record.get('QUERY_TEXT') or ''
+            rows.append({
+                'query_id': record['QUERY_ID'],
+                'start_time': float(record['START_EPOCH']),
+                'page': tag.get('page'),
+                'feature': tag.get('feature'),
+                'session': tag.get('session'),
+                'kind': tag.get('kind'),
+                'fingerprint': fingerprint_sql(text),
+                'query_text': text[:4000],
+                'warehouse': record.get('WAREHOUSE_NAME'),
+                'warehouse_size': record.get('WAREHOUSE_SIZE'),
+                'status': record.get('EXECUTION_STATUS'),
+                'elapsed_ms': _number(record.get('TOTAL_ELAPSED_TIME')),
+                'execution_ms': execution_ms,
+                'compilation_ms': _number(record.get('COMPILATION_TIME')),
+                'queued_ms': _number(record.get('QUEUED_TIME')),
+                'bytes_scanned': _number(record.get('BYTES_SCANNED')),
+                'cache_fraction': _number(record.get('PERCENTAGE_SCANNED_FROM_CACHE')),
+                'partitions_scanned': _number(record.get('PARTITIONS_SCANNED')),
+                'partitions_total': _number(record.get('PARTITIONS_TOTAL')),
+                'bytes_spilled': _number(record.get('BYTES_SPILLED')),
+                'rows_produced': _number(record.get('ROWS_PRODUCED')),
+                'credits_compute': _number(record.get('CREDITS_COMPUTE')),
+                'credits_estimated': estimate_credits(execution_ms, record.get('WAREHOUSE_SIZE')),
+                'credits_cloud_services': _number(record.get('CREDITS_USED_CLOUD_SERVICES')),
+                'query_type': record.get('QUERY_TYPE'),
+                'result_reused': int(is_result_reuse(record)),
+            })
+        return rows
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call: the store is touched from the harvester thread and page threads
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _get_state(self, key: str) -> Optional[float]:
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT value FROM harvest_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: float):
+        with closing(self._connect()) as db, db:
+            db.execute("INSERT OR REPLACE INTO harvest_state (key, value) VALUES (?, ?)", (key, value))
+
+
+def main():
+    """Runs one harvest and prints the feature cost ranking (python -m utils.cost_harvester)"""
+    from .snowflake_connector import get_connection
+
+    parser = argparse.ArgumentParser(description="Rank SecureInsights features by warehouse cost")
+    parser.add_argument('--days', type=float, default=7.0, help="Look-back period for the report")
+    parser.add_argument('--limit', type=int, default=20, help="Number of features to show")
+    parser.add_argument('--no-harvest', action='store_true', help="Report from the local store only")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    harvester = conn.cost_harvester()
+    try:
+        if not args.no_harvest:
+            print(f"Harvested {harvester.harvest()} query history rows")
+        report = harvester.report(days=args.days, limit=args.limit)
+        if report.empty:
+            print("No tagged queries in the store yet")
+        else:
+            print(report.to_string(index=False))
+            reuse = harvester.reuse_summary(days=args.days)
+            print(
+                f"Server result cache: {reuse['reused']} of {reuse['selects']} SELECTs reused "
+                f"({reuse['reuse_rate']:.1%})"
+            )
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,417 @@
+"""
+Fraud Queries Utility
+SQL behind the Fraud Detection dashboard, shared with the Home page pre-warm
+"""
+
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from .query_builder import TIME_WINDOWS, TimeWindow, utc_today
+
+# Filter defaults of the Active Alerts tab; the pre-warm fetches exactly this view
+DEFAULT_RISK_LEVELS = ["High", "Medium"]
+DEFAULT_TIME_PERIOD = "Last 7 Days"
+
+# Freshness budget of the alert overview tiles, in seconds
+ALERT_SUMMARY_MAX_AGE = 120
+
+# Window of the Pattern Analysis trend chart
+TREND_WINDOW = TIME_WINDOWS["Last 30 Days"]
+
+ALERT_SUMMARY_QUERY = """
+    WITH fraud_summary AS (
+        SELECT 
+            SUM(default_flag) as high_risk_count
+        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
+        WHERE credit_score >= 700
+
+        UNION ALL
+
+        SELECT 
+            SUM(fraud_indicator) as high_risk_count
+        FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
+        WHERE claim_frequency >= 5
+
+        UNION ALL
+
+        SELECT 
+            SUM(high_value_returns_flag) as high_risk_count
+        FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
+        WHERE return_rate >= 0.3
+    ),
+    medium_risk AS (
+        SELECT 
+            SUM(default_flag) as medium_risk_count
+        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
+        WHERE credit_score BETWEEN 600 AND 699
+
+        UNION ALL
+
+        SELECT 
+            SUM(fraud_indicator) as medium_risk_count
+        FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
+        WHERE claim_frequency BETWEEN 2 AND 4
+
+        UNION ALL
+
+        SELECT 
+            SUM(high_value_returns_flag) as medium_risk_count
+        FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
+        WHERE return_rate BETWEEN 0.15 AND 0.29
+    ),
+    low_risk AS (
+        SELECT COUNT(*) as total_records
+        FROM (
+            SELECT customer_id FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
+            UNION ALL
+            SELECT policy_holder_id FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
+            UNION ALL
+            SELECT customer_id FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
+        )
+    )
+    SELECT 
+        (SELECT SUM(high_risk_count) FROM fraud_summary) as high_risk,
+        (SELECT SUM(medium_risk_count) FROM medium_risk) as medium_risk,
+        (SELECT total_records FROM low_risk) as total_records
+"""
+
+def build_analysis_queries(today: Optional[date] = None) -> Dict[str, str]:
+    """
+    Builds the Pattern Analysis and Statistics tab queries
+    
+    They do not depend on the alert filters, so the page runs them in the
+    same parallel batch as the Active Alerts queries. Dates are resolved
+    here rather than with CURRENT_DATE() so the SQL text only changes once
+    a day and Snowflake can reuse the previous result.
+    
+    Args:
+        today: Reference day (defaults to the current UTC date)
+        
+    Returns:
+        Mapping of query name to SQL
+    """
+    trend_query = f"""
+        WITH daily_fraud AS (
+            SELECT 
+                DATE_TRUNC('day', LAST_ACTIVITY_DATE) as date,
+                SUM(CASE WHEN DEFAULT_FLAG = 1 THEN 1 ELSE 0 END) as high_risk_count,
+                SUM(CASE WHEN CREDIT_SCORE BETWEEN 600 AND 699 THEN 1 ELSE 0 END) as medium_risk_count
+            FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
+            {TREND_WINDOW.condition('LAST_ACTIVITY_DATE', keyword='WHERE', today=today)}
+            GROUP BY DATE_TRUNC('day', LAST_ACTIVITY_DATE)
+
+            UNION ALL
+
+            SELECT 
+                DATE_TRUNC('day', LAST_CLAIM_DATE) as date,
+                SUM(CASE WHEN FRAUD_INDICATOR = 1 THEN 1 ELSE 0 END) as high_risk_count,
+                SUM(CASE WHEN CLAIM_FREQUENCY BETWEEN 2 AND 4 THEN 1 ELSE 0 END) as medium_risk_count
+            FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
+            {TREND_WINDOW.condition('LAST_CLAIM_DATE', keyword='WHERE', today=today)}
+            GROUP BY DATE_TRUNC('day', LAST_CLAIM_DATE)
+        )
+        SELECT 
+            date,
+            SUM(high_risk_count) as high_risk,
+            SUM(medium_risk_count) as medium_risk
+        FROM daily_fraud
+        GROUP BY date
+        ORDER BY date
+    """
+
+    pattern_query = """
+        SELECT 
+            'Multiple Claims + Defaults' as pattern_type,
+            COUNT(DISTINCT b.CUSTOMER_ID) as count
+        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES b
+        JOIN INSURANCE_DB.RISK.CLAIM_RISK_SCORES i ON b.ZIP_CODE = i.ZIP_CODE AND b.AGE = i.AGE
+        WHERE b.DEFAULT_FLAG = 1 AND i.FRAUD_INDICATOR = 1
+
+        UNION ALL
+
+        SELECT 
+            'Low Credit Score' as pattern_type,
+            COUNT(DISTINCT CUSTOMER_ID) as count
+        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
+        WHERE CREDIT_SCORE < 600
+
+        UNION ALL
+
+        SELECT 
+            'High Value Returns' as pattern_type,
+            COUNT(DISTINCT CUSTOMER_ID) as count
+        FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
+        WHERE HIGH_VALUE_RETURNS_FLAG = 1
+
+        UNION ALL
+
+        SELECT 
+            'High Frequency Claims' as pattern_type,
+            COUNT(DISTINCT POLICY_HOLDER_ID) as count
+        FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
+        WHERE CLAIM_FREQUENCY >= 4
+
+        UNION ALL
+
+        SELECT 
+            'High-Risk ZIP Codes' as pattern_type,
+            COUNT(DISTINCT ZIP_CODE) as count
+        FROM (
+            SELECT ZIP_CODE FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES WHERE DEFAULT_FLAG = 1
+            UNION ALL SELECT ZIP_CODE FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES WHERE FRAUD_INDICATOR = 1
+            UNION ALL SELECT ZIP_CODE FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES WHERE HIGH_VALUE_RETURNS_FLAG = 1
+        )
+        GROUP BY ZIP_CODE
+        HAVING COUNT(*) >= 3
+    """
+
+    org_query = """
+        WITH zip_age_orgs AS (
+            SELECT 
+                ZIP_CODE || '-' || AGE as customer_key,
+                'BANK' as org_name
+            FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
+            WHERE DEFAULT_FLAG = 1 OR CREDIT_SCORE < 600
+
+            UNION ALL
+
+            SELECT 
+                ZIP_CODE || '-' || AGE as customer_key,
+                'INSURANCE' as org_name
+            FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
+            WHERE FRAUD_INDICATOR = 1 OR CLAIM_FREQUENCY >= 4
+
+            UNION ALL
+
+            SELECT 
+                ZIP_CODE || '-' || AGE as customer_key,
+                'RETAIL' as org_name
+            FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
+            WHERE HIGH_VALUE_RETURNS_FLAG = 1
+        )
+        SELECT 
+            CASE 
+                WHEN org_count = 1 THEN '1 Org'
+                WHEN org_count = 2 THEN '2 Orgs'
+                WHEN org_count = 3 THEN '3 Orgs'
+                ELSE '4+ Orgs'
+            END as organizations,
+            COUNT(*) as alerts
+        FROM (
+            SELECT customer_key, COUNT(DISTINCT org_name) as org_count
+            FROM zip_age_orgs
+            GROUP BY customer_key
+        )
+        GROUP BY org_count
+    """
+
+    metrics_query = """
+        WITH fraud_stats AS (
+            SELECT 
+                COUNT(*) as total_records,
+                SUM(CASE WHEN default_flag = 1 OR fraud_indicator = 1 OR high_value_returns_flag = 1 THEN 1 ELSE 0 END) as detected_fraud
+            FROM (
+                SELECT default_flag, 0 as fraud_indicator, 0 as high_value_returns_flag FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
+                UNION ALL
+                SELECT 0, fraud_indicator, 0 FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
+                UNION ALL
+                SELECT 0, 0, high_value_returns_flag FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
+            )
+        )
+        SELECT 
+            ROUND((detected_fraud::FLOAT / NULLIF(total_records, 0)) * 100, 1) as detection_rate,
+            ROUND(100 - (detected_fraud::FLOAT / NULLIF(total_records, 0)) * 100, 1) as false_positive_rate,
+            total_records,
+            detected_fraud
+        FROM fraud_stats
+    """
+
+    risk_factor_query = """
+        SELECT 
+            'Low Credit Score' as factor,
+            ROUND(AVG(CASE WHEN DEFAULT_FLAG = 1 THEN 1 ELSE 0 END), 2) as correlation
+        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
+        WHERE CREDIT_SCORE < 650
+
+        UNION ALL
+
+        SELECT 
+            'Multiple Claims Filed' as factor,
+            ROUND(AVG(CASE WHEN FRAUD_INDICATOR = 1 THEN 1 ELSE 0 END), 2) as correlation
+        FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
+        WHERE CLAIM_FREQUENCY >= 3
+
+        UNION ALL
+
+        SELECT 
+            'High Return Rate' as factor,
+            ROUND(AVG(CASE WHEN HIGH_VALUE_RETURNS_FLAG = 1 THEN 1 ELSE 0 END), 2) as correlation
+        FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
+        WHERE RETURN_RATE >= 0.2
+
+        UNION ALL
+
+        SELECT 
+            'High Transaction Amount' as factor,
+            ROUND(AVG(CASE WHEN DEFAULT_FLAG = 1 THEN 1 ELSE 0 END), 2) as correlation
+        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES
+        WHERE AVG_TRANSACTION_AMOUNT >= 3000
+
+        UNION ALL
+
+        SELECT 
+            'Cross-Organization Activity' as factor,
+            0.78 as correlation
+    """
+
+    return {
+        'trend': trend_query,
+        'pattern_distribution': pattern_query,
+        'org_involvement': org_query,
+        'detection_metrics': metrics_query,
+        'risk_factors': risk_factor_query,
+    }
+
+def build_alert_queries(
+    risk_levels: Iterable[str],
+    time_window: TimeWindow,
+    today: Optional[date] = None
+) -> Dict[str, str]:
+    """
+    Builds the Active Alerts queries for the selected filters
+    
+    Args:
+        risk_levels: Selected risk levels ("High", "Medium", "Low"); empty selects all
+        time_window: Selected time period
+        today: Reference day (defaults to the current UTC date)
+        
+    Returns:
+        Mapping of alert name to SQL, in display order
+    """
+    risk_levels = list(risk_levels)
+    today = today or utc_today()
+    
+    # Day-aligned literal dates keep the SQL cacheable
+    time_condition = time_window.condition('b.LAST_ACTIVITY_DATE', today=today)
+    claim_time_condition = time_window.condition('LAST_CLAIM_DATE', today=today)
+    alert_year = today.year
+    
+    alert_queries = {}
+
+    # Query 1: Multiple Claims + Defaults Pattern (High Risk)
+    if "High" in risk_levels or not risk_levels:
+        multi_fraud_query = f"""
+        SELECT 
+            'ALT-{alert_year}-001' as alert_id,
+            'Multiple Claims + Defaults' as pattern,
+            'High' as risk_level,
+            COUNT(DISTINCT b.CUSTOMER_ID) as affected_count,
+            2 as org_count,
+            ROUND(AVG(b.CREDIT_SCORE * 0.1 + i.TOTAL_CLAIM_AMOUNT / 10000), 0) as risk_score,
+            2 as hours_ago
+        FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES b
+        JOIN INSURANCE_DB.RISK.CLAIM_RISK_SCORES i
+            ON b.ZIP_CODE = i.ZIP_CODE AND b.AGE = i.AGE
+        WHERE b.DEFAULT_FLAG = 1 
+            AND i.FRAUD_INDICATOR = 1
+            {time_condition}
+        """
+        alert_queries['multi_fraud'] = multi_fraud_query
+
+    # Query 2: High Value Returns + Low Credit Score (High Risk)
+    if "High" in risk_levels or not risk_levels:
+        rapid_pattern_query = f"""
+        SELECT 
+            'ALT-{alert_year}-002' as alert_id,
+            'High Value Returns + Low Credit Score' as pattern,
+            'High' as risk_level,
+            COUNT(DISTINCT r.CUSTOMER_ID) as affected_count,
+            2 as org_count,
+            ROUND(AVG(r.RETURN_RATE * 100 + (850 - b.CREDIT_SCORE) / 10), 0) as risk_score,
+            5 as hours_ago
+        FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES r
+        JOIN BANK_DB.RISK.CUSTOMER_RISK_SCORES b
+            ON r.ZIP_CODE = b.ZIP_CODE AND r.AGE = b.AGE
+        WHERE r.HIGH_VALUE_RETURNS_FLAG = 1 
+            AND b.CREDIT_SCORE < 600
+            {time_condition}
+        """
+        alert_queries['rapid_pattern'] = rapid_pattern_query
+
+    # Query 3: Geographic Anomalies (Medium Risk)
+    if "Medium" in risk_levels or not risk_levels:
+        # Build time filter for UNION queries (RETAIL_DB has no date columns)
+        bank_time = time_condition if time_condition else ""
+        insurance_time = claim_time_condition
+        retail_time = ""  # No date column in RETAIL_DB
+
+        geo_anomaly_query = f"""
+        SELECT 
+            'ALT-{alert_year}-003' as alert_id,
+            'Geographic Anomalies (High-Risk ZIP Codes)' as pattern,
+            'Medium' as risk_level,
+            COUNT(DISTINCT ZIP_CODE) as affected_count,
+            3 as org_count,
+            65 as risk_score,
+            24 as hours_ago
+        FROM (
+            SELECT ZIP_CODE FROM BANK_DB.RISK.CUSTOMER_RISK_SCORES b WHERE DEFAULT_FLAG = 1 {bank_time}
+            UNION ALL
+            SELECT ZIP_CODE FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES WHERE FRAUD_INDICATOR = 1 {insurance_time}
+            UNION ALL
+            SELECT ZIP_CODE FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES WHERE HIGH_VALUE_RETURNS_FLAG = 1 {retail_time}
+        )
+        GROUP BY ZIP_CODE
+        HAVING COUNT(*) >= 5
+        """
+        alert_queries['geo_anomaly'] = geo_anomaly_query
+
+    # Query 4: Return Fraud Pattern (Medium Risk)
+    if "Medium" in risk_levels or not risk_levels:
+        return_fraud_query = f"""
+        SELECT 
+            'ALT-{alert_year}-004' as alert_id,
+            'Suspicious Return Patterns' as pattern,
+            'Medium' as risk_level,
+            COUNT(DISTINCT CUSTOMER_ID) as affected_count,
+            1 as org_count,
+            ROUND(AVG(RETURN_RATE * 100), 0) as risk_score,
+            36 as hours_ago
+        FROM RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
+        WHERE HIGH_VALUE_RETURNS_FLAG = 1
+            AND RETURN_RATE >= 0.3
+        """
+        alert_queries['return_fraud'] = return_fraud_query
+
+    # Query 5: High Frequency Claims (Low Risk)
+    if "Low" in risk_levels or not risk_levels:
+        velocity_query = f"""
+        SELECT 
+            'ALT-{alert_year}-005' as alert_id,
+            'High Frequency Insurance Claims' as pattern,
+            'Low' as risk_level,
+            COUNT(DISTINCT POLICY_HOLDER_ID) as affected_count,
+            1 as org_count,
+            ROUND(AVG(CLAIM_FREQUENCY * 10), 0) as risk_score,
+            48 as hours_ago
+        FROM INSURANCE_DB.RISK.CLAIM_RISK_SCORES
+        WHERE CLAIM_FREQUENCY >= 4
+            AND FRAUD_INDICATOR = 0
+            {claim_time_condition}
+        """
+        alert_queries['velocity'] = velocity_query
+    
+    return alert_queries
+
+def build_default_page_queries(today: Optional[date] = None) -> Dict[str, str]:
+    """
+    Returns every query the Fraud Detection page runs on its first load
+    
+    Uses the same SQL text as the page, so results fetched ahead of time
+    land under the cache keys the page looks up.
+    """
+    return {
+        'alert_tiles': ALERT_SUMMARY_QUERY,
+        **build_alert_queries(DEFAULT_RISK_LEVELS, TIME_WINDOWS[DEFAULT_TIME_PERIOD], today),
+        **build_analysis_queries(today),
+    }
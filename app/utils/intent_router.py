@@ -0,0 +1,268 @@
+"""
+Intent Router Utility
+Answers common natural language questions from query templates without calling Cortex
+"""
+
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from .query_builder import RISK_SOURCES, BoundQuery, QueryBuilder, get_query_builder
+from .semantic_cache import LocalEmbedder, question_terms
+
+# Terms any intent accepts: what is measured and how results are ranked
+_SHARED_TERMS = frozenset({
+    'fraud', 'risk', 'risky', 'riskiest', 'rate', 'case', 'count', 'number', 'percentage',
+    'highest', 'lowest', 'high', 'low', 'combined', 'overall', 'cross', 'analysis', 'analyze',
+    'compare', 'comparison', 'ranked', 'rank',
+}) | frozenset(RISK_SOURCES)
+
+
+@dataclass(frozen=True)
+class Intent:
+    """A question type answered by a QueryBuilder template"""
+    name: str
+    label: str
+    examples: Tuple[str, ...]
+    anchors: FrozenSet[str]       # At least one must appear in the question
+    vocabulary: FrozenSet[str]    # Further terms the template can answer
+    build: Callable[[QueryBuilder, Dict[str, Any]], BoundQuery]
+    takes_top_n: bool = False
+
+
+INTENTS = (
+    Intent(
+        name='age_group_risk',
+        label="Age Group Fraud",
+        examples=(
+            "Which age groups have the highest combined fraud risk?",
+            "fraud rate by age group",
+            "which demographic has the most fraud",
+            "fraud cases by age",
+        ),
+        anchors=frozenset({'age'}),
+        vocabulary=frozenset({'group', 'old', 'young', 'older', 'younger', 'customer', 'summary'}),
+        build=lambda builder, params: builder.build_age_group_risk_query(params['sources'], params['ascending']),
+    ),
+    Intent(
+        name='geographic_hotspots',
+        label="Geographic Hotspots",
+        examples=(
+            "Show me geographic areas with elevated fraud rates",
+            "fraud hotspots by zip code",
+            "which regions have the most fraud",
+            "top zip code prefixes by fraud cases",
+        ),
+        anchors=frozenset({'geographic', 'hotspot'}),
+        vocabulary=frozenset({'code', 'map', 'customer', 'summary'}),
+        build=lambda builder, params: builder.build_zip_prefix_risk_query(
+            params['sources'], params.get('top_n', 20), params['ascending']
+        ),
+        takes_top_n=True,
+    ),
+    Intent(
+        name='organization_summary',
+        label="Organization Summary",
+        examples=(
+            "What is the overall fraud summary by organization?",
+            "compare fraud rates across organizations",
+            "which organization has the highest fraud rate",
+            "how do bank insurance and retail compare on fraud",
+        ),
+        anchors=frozenset({'organization', 'summary'}) | frozenset(RISK_SOURCES),
+        vocabulary=frozenset({'total', 'record', 'participating', 'partner'}),
+        build=lambda builder, params: builder.build_organization_summary_query(params['sources'], params['ascending']),
+    ),
+)
+
+
+class IntentMatch(NamedTuple):
+    """A question classified into a known intent"""
+    intent: Intent
+    score: float
+    params: Dict[str, Any]
+    query: BoundQuery
+    elapsed: float
+
+
+class IntentRouter:
+    """
+    Classifies questions into template-backed intents before Cortex is asked
+
+    Each intent is described by example questions. A question is scored
+    against every example with the local embedding used by the semantic
+    cache, and belongs to the intent of its nearest example when:
+
+    - the similarity reaches ``threshold``,
+    - the question names one of the intent's anchor terms (age, region,
+      organization...), and
+    - every content term of the question is known to that intent, so
+      "average credit score by age group" is not mistaken for the age
+      group fraud template; such questions go to Cortex.
+
+    Parameters (organizations named, lowest vs highest, top N) are read
+    from the question and passed to the template.
+    """
+
+    def __init__(
+        self,
+        builder: Optional[QueryBuilder] = None,
+        threshold: float = 0.5,
+        llm_latency_estimate: float = 5.0
+    ):
+        """
+        Args:
+            builder: QueryBuilder providing the templates
+            threshold: Minimum similarity to the nearest example
+            llm_latency_estimate: Seconds a Cortex translation is assumed to take
+                until one has been measured
+        """
+        self.builder = builder or get_query_builder()
+        self.threshold = threshold
+        self.llm_latency_estimate = llm_latency_estimate
+        self.embedder = LocalEmbedder()
+
+        self._examples = [
+            (intent, self.embedder.embed(example))
+            for intent in INTENTS
+            for example in intent.examples
+        ]
+        self._vocabulary = {
+            intent.name: intent.anchors | intent.vocabulary | _SHARED_TERMS
+            | {term for example in intent.examples for term in question_terms(example)}
+            for intent in INTENTS
+        }
+
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.routed = 0
+        self.route_time = 0.0
+        self.llm_calls = 0
+        self.llm_time = 0.0
+        self.by_intent: Dict[str, int] = {}
+
+    def classify(self, question: str) -> Tuple[Optional[Intent], float]:
+        """
+        Finds the intent of a question's nearest example
+
+        Returns:
+            (intent, similarity); intent is None for an empty question
+        """
+        vector = self.embedder.embed(question)
+        if vector is None:
+            return None, 0.0
+        best, best_score = None, -1.0
+        for intent, example in self._examples:
+            score = float(example @ vector)
+            if score > best_score:
+                best, best_score = intent, score
+        return best, best_score
+
+    def route(self, question: str) -> Optional[IntentMatch]:
+        """
+        Answers a question from a template if it belongs to a known intent
+
+        Args:
+            question: User's question in plain English
+
+        Returns:
+            IntentMatch with the query to run, or None for questions that
+            should go to Cortex
+        """
+        start = time.perf_counter()
+        intent, score = self.classify(question)
+        match = None
+        if intent is not None and score >= self.threshold:
+            terms = question_terms(question)
+            anchored = not intent.anchors.isdisjoint(terms)
+            params = self._extract_params(question, terms, intent)
+            known = self._vocabulary[intent.name]
+            unknown = [
+                term for term in terms
+                if term not in known and not (term.isdigit() and params.get('top_n') == int(term))
+            ]
+            if anchored and not unknown:
+                match = IntentMatch(intent, score, params, intent.build(self.builder, params), 0.0)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.lookups += 1
+            self.route_time += elapsed
+            if match is not None:
+                self.routed += 1
+                self.by_intent[intent.name] = self.by_intent.get(intent.name, 0) + 1
+        return match._replace(elapsed=elapsed) if match else None
+
+    def fallback(self, question: str) -> IntentMatch:
+        """
+        Picks the closest template however low the confidence
+
+        Used when Cortex could not produce usable SQL; questions that match
+        nothing get the organization summary.
+        """
+        start = time.perf_counter()
+        intent, score = self.classify(question)
+        if intent is None or score <= 0:
+            intent = INTENTS[-1]
+        params = self._extract_params(question, question_terms(question), intent)
+        return IntentMatch(intent, score, params, intent.build(self.builder, params), time.perf_counter() - start)
+
+    def record_llm_call(self, seconds: float):
+        """Records how long a Cortex translation took, to estimate the latency routing saves"""
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_time += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns routing counters for this process
+
+        Returns:
+            Dictionary with lookups, routed, hit_rate, mean routing time,
+            mean Cortex translation time (measured, or the estimate until one
+            was measured) and the resulting latency_saved in seconds
+        """
+        with self._lock:
+            llm_latency = self.llm_time / self.llm_calls if self.llm_calls else self.llm_latency_estimate
+            mean_route = self.route_time / self.lookups if self.lookups else 0.0
+            return {
+                'lookups': self.lookups,
+                'routed': self.routed,
+                'hit_rate': self.routed / self.lookups if self.lookups else 0.0,
+                'by_intent': dict(self.by_intent),
+                'mean_route_ms': mean_route * 1000,
+                'llm_latency': llm_latency,
+                'llm_latency_measured': self.llm_calls > 0,
+                'latency_saved': self.routed * max(llm_latency - mean_route, 0.0),
+            }
+
+    def _extract_params(self, question: str, terms: List[str], intent: Intent) -> Dict[str, Any]:
+        params: Dict[str, Any] = {
+            'sources': [source for source in RISK_SOURCES if source in terms] or None,
+            'ascending': 'lowest' in terms and 'highest' not in terms,
+        }
+        if intent.takes_top_n:
+            numbers = [int(n) for n in re.findall(r'\b\d+\b', question) if 0 < int(n) <= 100]
+            if numbers:
+                params['top_n'] = numbers[0]
+        return params
+
+
+# Singleton instance
+_router = None
+_router_lock = threading.Lock()
+
+def get_intent_router() -> IntentRouter:
+    """Returns the process-wide IntentRouter, configured from the environment"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = IntentRouter(
+                    threshold=float(os.getenv('INTENT_ROUTER_THRESHOLD', '0.5')),
+                    llm_latency_estimate=float(os.getenv('CORTEX_LATENCY_ESTIMATE', '5')),
+                )
+    return _router
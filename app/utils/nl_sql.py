@@ -0,0 +1,134 @@
+"""
+NL-to-SQL Utility
+Prompt and response handling for turning natural language questions into SQL with Cortex
+"""
+
+import hashlib
+
+from .sql_repair import repair_sql
+
+# Model asked to write SQL for natural language questions
+NL_SQL_MODEL = 'mistral-large'
+
+# Prompt sent with every question; {question} is filled in by build_translation_query()
+NL_SQL_PROMPT = """You are a SQL expert for Snowflake data warehouses. Generate a privacy-safe SQL query for the following question.
+
+CRITICAL DATA TYPE RULES:
+- ALL flag columns (default_flag, fraud_indicator, high_value_returns_flag) are INTEGER (0 or 1), NOT strings
+- Use: WHERE default_flag = 1 (NOT WHERE default_flag = 'Y')
+- zip_code is INTEGER - use CAST(zip_code AS VARCHAR) before SUBSTR operations
+- All numeric columns should be aggregated with SUM(), AVG(), COUNT()
+
+PRIVACY RULES:
+1. Always use UNION ALL to combine data from multiple tables into a CTE first, then aggregate
+2. Use HAVING COUNT(*) >= 50 ONLY when you have GROUP BY in the same SELECT
+3. NEVER put HAVING after the final UNION ALL - put it in the final aggregating SELECT if needed
+4. Never return individual records - only aggregated results
+5. Round decimal values to 1 or 2 decimal places
+
+CORRECT PATTERN:
+WITH combined AS (SELECT ... FROM table1 UNION ALL SELECT ... FROM table2)
+SELECT col, COUNT(*), SUM(flag) FROM combined GROUP BY col HAVING COUNT(*) >= 50;
+
+WRONG PATTERN (DO NOT USE):
+SELECT ... FROM cte1 UNION ALL SELECT ... FROM cte2 HAVING COUNT(*) >= 50;
+
+Available tables and schemas:
+- BANK_DB.RISK.CUSTOMER_RISK_SCORES
+  Columns: customer_id (INT), age (INT), zip_code (INT), credit_score (INT), default_flag (INT 0/1), 
+  transaction_count (INT), avg_transaction_amount (DECIMAL), account_open_date (DATE), last_activity_date (DATE)
+  FRAUD FLAG: default_flag (use this column for fraud detection in BANK database)
+
+- INSURANCE_DB.RISK.CLAIM_RISK_SCORES
+  Columns: policy_holder_id (INT), age (INT), zip_code (INT), claim_frequency (INT), total_claim_amount (DECIMAL),
+  fraud_indicator (INT 0/1), policy_start_date (DATE), last_claim_date (DATE)
+  FRAUD FLAG: fraud_indicator (use this column for fraud detection in INSURANCE database)
+
+- RETAIL_DB.RISK.CUSTOMER_RISK_SCORES
+  Columns: customer_id (INT), age (INT), zip_code (INT), return_rate (DECIMAL), total_purchase_amount (DECIMAL),
+  high_value_returns_flag (INT 0/1), first_purchase_date (DATE), last_purchase_date (DATE)
+  FRAUD FLAG: high_value_returns_flag (use this column for fraud detection in RETAIL database)
+
+IMPORTANT: Each table has a DIFFERENT fraud flag column name. When combining tables, you must:
+- Select default_flag from BANK_DB (NOT fraud_indicator)
+- Select fraud_indicator from INSURANCE_DB
+- Select high_value_returns_flag from RETAIL_DB (NOT fraud_indicator)
+- Use column aliases to standardize names in UNION ALL queries
+
+User question: {question}
+
+Generate ONLY the SQL query, no explanations. The query should return results that answer the question."""
+
+# Changes whenever the model, the prompt wording or the schema it describes
+# changes, so SQL generated for an older prompt is never reused
+NL_PROMPT_VERSION = hashlib.sha256(f"{NL_SQL_MODEL}\n{NL_SQL_PROMPT}".encode('utf-8')).hexdigest()[:12]
+
+
+def build_translation_query(question: str) -> str:
+    """
+    Builds the CORTEX.COMPLETE statement that translates a question into SQL
+
+    Args:
+        question: User's question in plain English
+
+    Returns:
+        SQL string returning one GENERATED_SQL column
+    """
+    prompt = NL_SQL_PROMPT.format(question=question)
+    return f"""
+    SELECT SNOWFLAKE.CORTEX.COMPLETE(
+        '{NL_SQL_MODEL}',
+        '{prompt.replace("'", "''")}'
+    ) as generated_sql
+    """
+
+def extract_sql(response: str) -> str:
+    """
+    Pulls the SQL statement out of a model response
+
+    Models often wrap the query in a markdown code block or prefix it with
+    the word "SQL"; both are removed.
+
+    Args:
+        response: Raw text returned by CORTEX.COMPLETE
+
+    Returns:
+        SQL string
+    """
+    generated_sql = response
+
+    # Extract SQL from markdown code blocks if present
+    if '```sql' in generated_sql.lower():
+        # Find the sql code block (case insensitive)
+        parts = generated_sql.split('```')
+        for part in parts:
+            if part.lower().startswith('sql'):
+                generated_sql = part[3:].strip()  # Remove 'sql' and whitespace
+                break
+    elif '```' in generated_sql:
+        generated_sql = generated_sql.split('```')[1].split('```')[0].strip()
+
+    # Remove any leading "SQL" word that might remain (case insensitive)
+    if generated_sql.upper().startswith('SQL'):
+        generated_sql = generated_sql[3:].strip()
+
+    return generated_sql.strip()
+
+def prepare_generated_sql(response: str) -> str:
+    """
+    Turns a model response into SQL ready to run
+
+    The SQL is parsed and repaired by utils/sql_repair.py, which also
+    rejects responses that are not a query or break the privacy rules, so
+    they never reach the warehouse.
+
+    Args:
+        response: Raw text returned by CORTEX.COMPLETE
+
+    Returns:
+        Extracted and repaired SQL
+
+    Raises:
+        ValueError: If the SQL cannot be used or breaks the privacy rules
+    """
+    return repair_sql(extract_sql(response))
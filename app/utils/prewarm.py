@@ -0,0 +1,194 @@
+"""
+Prewarm Utility
+Hides warehouse resume, authentication and first-query latency behind the landing page
+"""
+
+import importlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .fraud_queries import build_default_page_queries
+from .query_metrics import infer_caller
+from .snowflake_connector import SnowflakeConnection, get_connection
+
+# Heavy modules pages import lazily; loading them here keeps that cost off page renders
+PREWARM_MODULES = ('snowflake.connector', 'pyarrow', 'plotly.express')
+
+
+class Prewarmer:
+    """
+    Gets the app ready while the user is still reading the Home page
+
+    A warm-up runs on a background thread in four steps:
+
+    - modules: imports the driver and charting libraries pages load lazily
+    - resume: resumes the warehouse if auto-suspend stopped it
+    - sessions: authenticates pooled sessions in parallel
+    - prefetch: runs the Fraud Detection page's default queries into the
+      result cache, so "View Fraud Alerts" renders from cache
+
+    Every Home page load calls start(), but a warm-up only runs when the
+    previous one finished more than ``rewarm_after`` seconds ago, which
+    should stay below the warehouse's auto-suspend time.
+    """
+
+    def __init__(
+        self,
+        conn: SnowflakeConnection,
+        sessions: int = 4,
+        rewarm_after: float = 300.0,
+        enabled: bool = True
+    ):
+        """
+        Args:
+            conn: Shared connection whose pool and cache are warmed
+            sessions: Pooled sessions to open ahead of time
+            rewarm_after: Seconds after which a finished warm-up is repeated
+            enabled: False turns start() into a no-op
+        """
+        self.conn = conn
+        self.sessions = sessions
+        self.rewarm_after = rewarm_after
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._state = 'idle'          # idle, warming, warm, failed
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._steps: Dict[str, float] = {}
+        self._details: Dict[str, Any] = {}
+        self._error: Optional[str] = None
+        self._runs = 0
+
+    def start(self, caller: Optional[str] = None) -> bool:
+        """
+        Starts a warm-up unless one is running or finished recently
+
+        Args:
+            caller: Code location the prefetch queries are attributed to
+                (defaults to the page calling start())
+
+        Returns:
+            True if a new warm-up was started
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._state == 'warming':
+                return False
+            if self._state == 'warm' and time.time() - self._finished_at < self.rewarm_after:
+                return False
+            self._state = 'warming'
+            self._started_at = time.time()
+            self._steps = {}
+            self._details = {}
+            self._error = None
+            self._runs += 1
+            self._done.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(caller or infer_caller(),),
+                name='prewarm',
+                daemon=True,
+            )
+            self._thread.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the current warm-up finishes; returns False on timeout"""
+        return self._done.wait(timeout)
+
+    @property
+    def is_warm(self) -> bool:
+        with self._lock:
+            return self._state == 'warm'
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Returns the warm-up state and its timings
+
+        Returns:
+            Dictionary with state, time_to_warm and per-step seconds
+            (modules, resume, sessions, prefetch), when the last warm-up finished,
+            sessions opened and queries prefetched
+        """
+        with self._lock:
+            finished = self._finished_at if self._state in ('warm', 'failed') else None
+            return {
+                'enabled': self.enabled,
+                'state': self._state,
+                'time_to_warm': finished - self._started_at if finished else None,
+                'steps': dict(self._steps),
+                'warmed_ago': time.time() - finished if finished else None,
+                'error': self._error,
+                'runs': self._runs,
+                **self._details,
+            }
+
+    def _run(self, caller: str):
+        try:
+            self._step('modules', self._import_modules)
+            self._step('resume', lambda: {'warehouse_resumed': self.conn.resume_warehouse()})
+            self._step('sessions', lambda: {'sessions_opened': self.conn.open_sessions(self.sessions)})
+            self._step('prefetch', lambda: self._prefetch(caller))
+            state, error = 'warm', None
+        except Exception as e:
+            state, error = 'failed', str(e)
+            print(f"Prewarm failed: {error}")
+        with self._lock:
+            self._state = state
+            self._error = error
+            self._finished_at = time.time()
+        self._done.set()
+
+    def _step(self, name: str, action: Callable[[], Dict[str, Any]]):
+        """Runs one warm-up step, recording its duration and the details it returns"""
+        start = time.perf_counter()
+        details = {}
+        try:
+            details = action()
+        finally:
+            with self._lock:
+                self._steps[name] = time.perf_counter() - start
+                self._details.update(details)
+
+    def _import_modules(self, modules: Tuple[str, ...] = PREWARM_MODULES) -> Dict[str, Any]:
+        missing = []
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                # Optional for this backend, e.g. no Snowflake driver offline
+                missing.append(name)
+        return {'modules_missing': missing}
+
+    def _prefetch(self, caller: str) -> Dict[str, Any]:
+        # Same SQL text as the page, so results land under the keys it looks up
+        results = self.conn.execute_many(
+            build_default_page_queries(), cache=True, caller=caller, session='prewarm'
+        )
+        failed = [name for name, result in results.items() if not result.ok]
+        return {'prefetched': len(results) - len(failed), 'prefetch_failed': failed}
+
+
+# Shared instance - one warm-up per process, however many sessions land on Home
+_prewarmer = None
+_prewarmer_lock = threading.Lock()
+
+def get_prewarmer() -> Prewarmer:
+    """Returns the process-wide Prewarmer configured from the environment"""
+    global _prewarmer
+    if _prewarmer is None:
+        with _prewarmer_lock:
+            if _prewarmer is None:
+                _prewarmer = Prewarmer(
+                    get_connection(),
+                    sessions=int(os.getenv('PREWARM_SESSIONS', '4')),
+                    rewarm_after=float(os.getenv('PREWARM_INTERVAL', '300')),
+                    enabled=os.getenv('PREWARM', '1') != '0',
+                )
+    return _prewarmer
@@ -3,9 +3,147 @@ Query Builder Utility
 Constructs safe, privacy-compliant SQL queries
 """
 
-from typing import Dict, List, Optional, Any
+import calendar
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Any, Tuple, Union
 import streamlit as st
 
+# Column names cannot be bound, so caller-supplied identifiers must be plain names
+IDENTIFIER_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+class RiskSource(NamedTuple):
+    """One organization's risk table, as combined by the natural language templates"""
+    label: str
+    table: str
+    fraud_flag: str
+    credit_score: Optional[str]  # None where the organization has no credit score
+    summary_score: str           # Expression averaged as the organization's risk measure
+
+# Organizations whose risk tables the natural language templates combine
+RISK_SOURCES: Dict[str, RiskSource] = {
+    'bank': RiskSource('Bank', 'BANK_DB.RISK.CUSTOMER_RISK_SCORES', 'default_flag', 'credit_score', 'CREDIT_SCORE'),
+    'insurance': RiskSource('Insurance', 'INSURANCE_DB.RISK.CLAIM_RISK_SCORES', 'fraud_indicator', None, 'CLAIM_FREQUENCY * 100'),
+    'retail': RiskSource('Retail', 'RETAIL_DB.RISK.CUSTOMER_RISK_SCORES', 'high_value_returns_flag', None, 'RETURN_RATE * 1000'),
+}
+
+# Column name fragments no query may read, with the error reported for each
+FORBIDDEN_COLUMN_PATTERNS = (
+    ('SSN', 'Query cannot access SSN'),
+    ('EMAIL', 'Query cannot access email addresses'),
+    ('PHONE', 'Query cannot access phone numbers'),
+    ('CREDIT_CARD', 'Query cannot access credit card numbers'),
+    ('ACCOUNT_NUMBER', 'Query cannot access account numbers'),
+    ('FULL_NAME', 'Query cannot access full names'),
+)
+
+AGE_GROUP_CASE = """CASE 
+                    WHEN age BETWEEN 18 AND 24 THEN '18-24'
+                    WHEN age BETWEEN 25 AND 34 THEN '25-34'
+                    WHEN age BETWEEN 35 AND 44 THEN '35-44'
+                    WHEN age BETWEEN 45 AND 54 THEN '45-54'
+                    WHEN age BETWEEN 55 AND 64 THEN '55-64'
+                    ELSE '65+'
+                END"""
+
+class BoundQuery(NamedTuple):
+    """
+    SQL text with ``?`` placeholders plus the values bound to them
+    
+    The text depends only on the query's shape, never on filter values,
+    so every execution of a template shares one Snowflake compilation and
+    one result-cache key per distinct set of values. Unpacks as
+    ``conn.execute_query(*bound)`` and is accepted by execute_many.
+    """
+    sql: str
+    params: Tuple[Any, ...] = ()
+
+def check_identifier(name: str) -> str:
+    """
+    Validates a column name that has to be written into the SQL text
+    
+    Raises:
+        ValueError: If the name is not a plain SQL identifier
+    """
+    if not IDENTIFIER_PATTERN.match(name or ''):
+        raise ValueError(f"Invalid column name: {name!r}")
+    return name
+
+def utc_today() -> date:
+    """Returns the current date in UTC, the reference day for time windows"""
+    return datetime.now(timezone.utc).date()
+
+def months_before(day: date, months: int) -> date:
+    """Returns the same day of the month ``months`` earlier, clamped to the month's length"""
+    year, month = divmod(day.year * 12 + day.month - 1 - months, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+@dataclass(frozen=True)
+class TimeWindow:
+    """
+    A relative time window resolved client-side to a day-aligned start date
+    
+    Snowflake only reuses a query's result when the SQL text is identical
+    and free of execution-time functions such as CURRENT_TIMESTAMP(). Writing
+    the window's start as a literal date that only changes at midnight (UTC)
+    keeps the text stable, so repeated dashboard loads during a day are
+    answered from the 24h result cache. Windows are widened to whole days:
+    "last 24 hours" covers everything since the start of yesterday.
+    """
+    days: Optional[int] = None
+    months: Optional[int] = None
+    
+    @property
+    def is_unbounded(self) -> bool:
+        return self.days is None and self.months is None
+    
+    def start_date(self, today: Optional[date] = None) -> Optional[date]:
+        """
+        Resolves the first day inside the window
+        
+        Args:
+            today: Reference day (defaults to the current UTC date)
+            
+        Returns:
+            Start date, or None for an unbounded window
+        """
+        if self.is_unbounded:
+            return None
+        start = today or utc_today()
+        if self.months:
+            start = months_before(start, self.months)
+        if self.days:
+            start -= timedelta(days=self.days)
+        return start
+    
+    def condition(self, column: str, keyword: str = "AND", today: Optional[date] = None) -> str:
+        """
+        Builds the SQL predicate restricting a date column to the window
+        
+        Args:
+            column: Date or timestamp column, e.g. 'b.LAST_ACTIVITY_DATE'
+            keyword: Leading keyword, 'AND' or 'WHERE'
+            today: Reference day (defaults to the current UTC date)
+            
+        Returns:
+            Predicate such as "AND b.LAST_ACTIVITY_DATE >= DATE '2024-01-31'",
+            or an empty string for an unbounded window
+        """
+        start = self.start_date(today)
+        if start is None:
+            return ""
+        return f"{keyword} {column} >= DATE '{start.isoformat()}'"
+
+# Time period choices offered by the dashboards
+TIME_WINDOWS = {
+    "Last 24 Hours": TimeWindow(days=1),
+    "Last 7 Days": TimeWindow(days=7),
+    "Last 30 Days": TimeWindow(days=30),
+    "All Time": TimeWindow(),
+}
+
 class QueryBuilder:
     """Builds privacy-safe SQL queries for cross-company analytics"""
     
@@ -17,17 +155,20 @@ class QueryBuilder:
         self,
         group_by_column: str = "age_group",
         filters: Optional[Dict[str, Any]] = None
-    ) -> str:
+    ) -> BoundQuery:
         """
         Builds a query to analyze fraud risk by demographic groups
         
         Args:
             group_by_column: Column to group by (age_group, zip_code, etc.)
-            filters: Optional filters to apply
+            filters: Optional column/value equality filters (values are bound)
             
         Returns:
-            SQL query string
+            BoundQuery with the SQL and its parameters
         """
+        group_by_column = check_identifier(group_by_column)
+        params: List[Any] = []
+        
         query = f"""
         SELECT 
             {group_by_column},
@@ -44,10 +185,8 @@ class QueryBuilder:
         # Add filters if provided
         if filters:
             for key, value in filters.items():
-                if isinstance(value, str):
-                    query += f"\n  AND {key} = '{value}'"
-                else:
-                    query += f"\n  AND {key} = {value}"
+                query += f"\n  AND {check_identifier(key)} = ?"
+                params.append(value)
         
         query += f"""
         GROUP BY {group_by_column}
@@ -55,13 +194,13 @@ class QueryBuilder:
         ORDER BY avg_risk_score DESC
         """
         
-        return query
+        return BoundQuery(query, tuple(params))
     
     def build_geographic_analysis_query(
         self,
         top_n: int = 20,
         min_risk_score: Optional[float] = None
-    ) -> str:
+    ) -> BoundQuery:
         """
         Builds a query for geographic risk analysis
         
@@ -70,8 +209,10 @@ class QueryBuilder:
             min_risk_score: Minimum risk score threshold
             
         Returns:
-            SQL query string
+            BoundQuery with the SQL and its parameters
         """
+        params: List[Any] = []
+        
         query = f"""
         SELECT 
             zip_code_prefix,
@@ -84,22 +225,24 @@ class QueryBuilder:
         """
         
         if min_risk_score:
-            query += f"\n  AND risk_score >= {min_risk_score}"
+            query += "\n  AND risk_score >= ?"
+            params.append(min_risk_score)
         
+        # LIMIT takes a constant; the few distinct page sizes are cheap to compile
         query += f"""
         GROUP BY zip_code_prefix
         HAVING COUNT(DISTINCT customer_id_hash) >= {self.min_agg_size}
         ORDER BY avg_risk_score DESC
-        LIMIT {top_n}
+        LIMIT {int(top_n)}
         """
         
-        return query
+        return BoundQuery(query, tuple(params))
     
     def build_cross_org_pattern_query(
         self,
         status: str = "ACTIVE",
         min_risk_level: int = 60
-    ) -> str:
+    ) -> BoundQuery:
         """
         Builds a query to find cross-organization fraud patterns
         
@@ -108,7 +251,7 @@ class QueryBuilder:
             min_risk_level: Minimum risk level (0-100)
             
         Returns:
-            SQL query string
+            BoundQuery with the SQL and its parameters
         """
         query = f"""
         SELECT 
@@ -123,20 +266,20 @@ class QueryBuilder:
             last_updated,
             status
         FROM {self.cleanroom_db}.FRAUD_DETECTION.DETECTED_PATTERNS
-        WHERE status = '{status}'
-          AND risk_level >= {min_risk_level}
+        WHERE status = ?
+          AND risk_level >= ?
           AND affected_segment_count >= {self.min_agg_size}
         ORDER BY risk_level DESC, last_updated DESC
         """
         
-        return query
+        return BoundQuery(query, (status, min_risk_level))
     
     def build_time_series_query(
         self,
         metric: str = "fraud_cases",
         group_by: str = "month",
         lookback_months: int = 12
-    ) -> str:
+    ) -> BoundQuery:
         """
         Builds a time-series query for trend analysis
         
@@ -146,7 +289,7 @@ class QueryBuilder:
             lookback_months: Number of months to look back
             
         Returns:
-            SQL query string
+            BoundQuery with the SQL and its parameters
         """
         date_trunc_map = {
             'day': 'DAY',
@@ -156,6 +299,8 @@ class QueryBuilder:
         
         date_part = date_trunc_map.get(group_by, 'MONTH')
         
+        start = TimeWindow(months=lookback_months).start_date()
+        
         query = f"""
         SELECT 
             DATE_TRUNC('{date_part}', event_date) as time_period,
@@ -164,19 +309,19 @@ class QueryBuilder:
             ROUND(AVG(risk_score), 2) as avg_risk_score,
             COUNT(DISTINCT organization_id) as participating_orgs
         FROM {self.cleanroom_db}.AGGREGATED_VIEWS.TIME_SERIES_RISK
-        WHERE event_date >= DATEADD(MONTH, -{lookback_months}, CURRENT_DATE())
+        WHERE event_date >= ?
         GROUP BY DATE_TRUNC('{date_part}', event_date)
         HAVING COUNT(*) >= {self.min_agg_size}
         ORDER BY time_period DESC
         """
         
-        return query
+        return BoundQuery(query, (start,))
     
     def build_segment_comparison_query(
         self,
         segment_column: str,
         segments_to_compare: List[str]
-    ) -> str:
+    ) -> BoundQuery:
         """
         Builds a query to compare different customer segments
         
@@ -185,9 +330,11 @@ class QueryBuilder:
             segments_to_compare: List of segment values to compare
             
         Returns:
-            SQL query string
+            BoundQuery with the SQL and its parameters
         """
-        segments_str = "', '".join(segments_to_compare)
+        segment_column = check_identifier(segment_column)
+        # One placeholder per value: the text only varies with the list length
+        placeholders = ", ".join("?" for _ in segments_to_compare) or "NULL"
         
         query = f"""
         SELECT 
@@ -199,37 +346,154 @@ class QueryBuilder:
             SUM(CASE WHEN high_risk_flag = 1 THEN 1 ELSE 0 END) as high_risk_count,
             ROUND(SUM(CASE WHEN high_risk_flag = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) as high_risk_pct
         FROM {self.cleanroom_db}.AGGREGATED_VIEWS.SEGMENT_ANALYSIS
-        WHERE {segment_column} IN ('{segments_str}')
+        WHERE {segment_column} IN ({placeholders})
         GROUP BY {segment_column}
         HAVING COUNT(*) >= {self.min_agg_size}
         ORDER BY avg_risk_score DESC
         """
         
-        return query
+        return BoundQuery(query, tuple(segments_to_compare))
+    
+    def _risk_sources(self, sources: Optional[List[str]]) -> List[RiskSource]:
+        """Resolves organization keys (bank, insurance, retail) to their risk tables"""
+        keys = sources or list(RISK_SOURCES)
+        unknown = [key for key in keys if key not in RISK_SOURCES]
+        if unknown:
+            raise ValueError(f"Unknown risk source: {unknown[0]!r}")
+        return [RISK_SOURCES[key] for key in keys]
+    
+    def build_age_group_risk_query(
+        self,
+        sources: Optional[List[str]] = None,
+        ascending: bool = False
+    ) -> BoundQuery:
+        """
+        Builds a query comparing fraud and risk across age groups
+        
+        Args:
+            sources: Organizations to combine (defaults to all of RISK_SOURCES)
+            ascending: List the age groups with the lowest fraud rate first
+            
+        Returns:
+            BoundQuery with the SQL and its parameters
+        """
+        branches = "\n            UNION ALL\n".join(f"""
+            SELECT 
+                {AGE_GROUP_CASE} AS AGE_GROUP,
+                {source.credit_score or 'NULL'} as credit_score,
+                {source.fraud_flag} as default_flag,
+                '{source.label.upper()}' as SOURCE
+            FROM {source.table}
+            """ for source in self._risk_sources(sources))
+        
+        query = f"""
+        WITH combined_data AS ({branches})
+        SELECT 
+            AGE_GROUP,
+            COUNT(*) as RECORD_COUNT,
+            ROUND(AVG(COALESCE(credit_score, 50)), 1) as AVG_RISK_SCORE,
+            SUM(default_flag) as FRAUD_CASES,
+            ROUND(SUM(default_flag) * 100.0 / COUNT(*), 1) as FRAUD_RATE_PCT
+        FROM combined_data
+        GROUP BY AGE_GROUP
+        HAVING COUNT(*) >= {self.min_agg_size}
+        ORDER BY FRAUD_RATE_PCT {'ASC' if ascending else 'DESC'}
+        """
+        
+        return BoundQuery(query)
+    
+    def build_zip_prefix_risk_query(
+        self,
+        sources: Optional[List[str]] = None,
+        top_n: int = 20,
+        ascending: bool = False
+    ) -> BoundQuery:
+        """
+        Builds a query ranking 3-digit ZIP code prefixes by fraud cases
+        
+        Args:
+            sources: Organizations to combine (defaults to all of RISK_SOURCES)
+            top_n: Number of areas to return
+            ascending: List the areas with the fewest fraud cases first
+            
+        Returns:
+            BoundQuery with the SQL and its parameters
+        """
+        branches = "\n            UNION ALL\n".join(f"""
+            SELECT 
+                SUBSTR(CAST(ZIP_CODE AS VARCHAR), 1, 3) AS ZIP_PREFIX,
+                {source.credit_score or 'NULL'} as credit_score,
+                {source.fraud_flag} as default_flag
+            FROM {source.table}
+            """ for source in self._risk_sources(sources))
+        
+        query = f"""
+        WITH combined_data AS ({branches})
+        SELECT 
+            ZIP_PREFIX as ZIP_CODE_PREFIX,
+            COUNT(*) as CUSTOMER_COUNT,
+            ROUND(AVG(COALESCE(credit_score, 600)), 1) as AVG_RISK_SCORE,
+            SUM(default_flag) as FRAUD_CASES,
+            ROUND(SUM(default_flag) * 100.0 / COUNT(*), 2) as FRAUD_RATE_PCT
+        FROM combined_data
+        GROUP BY ZIP_PREFIX
+        HAVING COUNT(*) >= {self.min_agg_size}
+        ORDER BY FRAUD_CASES {'ASC' if ascending else 'DESC'}
+        LIMIT {int(top_n)}
+        """
+        
+        return BoundQuery(query)
+    
+    def build_organization_summary_query(
+        self,
+        sources: Optional[List[str]] = None,
+        ascending: bool = False
+    ) -> BoundQuery:
+        """
+        Builds a one-row-per-organization fraud summary
+        
+        Each row aggregates a whole organization's table, far above the
+        minimum aggregation size.
+        
+        Args:
+            sources: Organizations to include (defaults to all of RISK_SOURCES)
+            ascending: List the organization with the lowest fraud rate first
+            
+        Returns:
+            BoundQuery with the SQL and its parameters
+        """
+        branches = "\n        UNION ALL\n".join(f"""
+        SELECT 
+            '{source.label}' as ORGANIZATION,
+            COUNT(*) as TOTAL_RECORDS,
+            SUM({source.fraud_flag.upper()}) as FRAUD_CASES,
+            ROUND(AVG({source.summary_score}), 1) as AVG_CREDIT_SCORE,
+            ROUND(SUM({source.fraud_flag.upper()}) * 100.0 / COUNT(*), 2) as FRAUD_RATE_PCT
+        FROM {source.table}
+        """ for source in self._risk_sources(sources))
+        
+        query = f"""{branches}
+        ORDER BY FRAUD_RATE_PCT {'ASC' if ascending else 'DESC'}
+        """
+        
+        return BoundQuery(query)
     
-    def validate_query(self, query: str) -> tuple[bool, str]:
+    def validate_query(self, query: Union[str, BoundQuery]) -> tuple[bool, str]:
         """
         Validates that a query follows privacy rules
         
         Args:
-            query: SQL query to validate
+            query: SQL query (or BoundQuery) to validate
             
         Returns:
             Tuple of (is_valid, error_message)
         """
+        if isinstance(query, BoundQuery):
+            query = query.sql
         query_upper = query.upper()
         
         # Check for forbidden patterns
-        forbidden_patterns = [
-            ('SSN', 'Query cannot access SSN'),
-            ('EMAIL', 'Query cannot access email addresses'),
-            ('PHONE', 'Query cannot access phone numbers'),
-            ('CREDIT_CARD', 'Query cannot access credit card numbers'),
-            ('ACCOUNT_NUMBER', 'Query cannot access account numbers'),
-            ('FULL_NAME', 'Query cannot access full names'),
-        ]
-        
-        for pattern, error in forbidden_patterns:
+        for pattern, error in FORBIDDEN_COLUMN_PATTERNS:
             if pattern in query_upper:
                 return False, error
         
@@ -238,7 +502,7 @@ class QueryBuilder:
             return False, "Query must include GROUP BY for aggregation"
         
         # Check for minimum size constraint
-        if f'HAVING COUNT(*) >= {self.min_agg_size}' not in query_upper.replace(' ', ''):
+        if f'HAVINGCOUNT(*)>={self.min_agg_size}' not in re.sub(r'\s+', '', query_upper):
             return False, f"Query must include HAVING COUNT(*) >= {self.min_agg_size}"
         
         return True, "Query is valid"
@@ -0,0 +1,184 @@
+"""
+Query Limits Utility
+Statement timeout, row cap and scan-size governor applied to every warehouse query
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Snowflake error code for a statement cancelled by a timeout or SYSTEM$CANCEL_QUERY
+QUERY_CANCELLED_ERRNO = 604
+
+
+@dataclass(frozen=True)
+class QueryLimits:
+    """
+    Bounds for one query; None leaves a limit unset
+
+    Attributes:
+        timeout: Seconds the statement may run before it is cancelled
+        max_rows: Largest result the app will fetch
+        max_bytes: Largest estimated scan (from EXPLAIN) the app will start
+    """
+    timeout: Optional[float] = None
+    max_rows: Optional[int] = None
+    max_bytes: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> 'QueryLimits':
+        """Process-wide defaults: QUERY_TIMEOUT, QUERY_MAX_ROWS and QUERY_MAX_SCAN_BYTES (0 = off)"""
+        def read(name: str, default: str, cast: Callable[[str], Any]) -> Any:
+            value = cast(os.getenv(name, default))
+            return value if value > 0 else None
+
+        return cls(
+            timeout=read('QUERY_TIMEOUT', '300', float),
+            max_rows=read('QUERY_MAX_ROWS', '1000000', int),
+            max_bytes=read('QUERY_MAX_SCAN_BYTES', '0', int),
+        )
+
+    def override(self, other: Optional['QueryLimits']) -> 'QueryLimits':
+        """Returns these limits with every limit set in ``other`` taking precedence"""
+        if other is None:
+            return self
+        return QueryLimits(**{
+            field.name: getattr(other, field.name) if getattr(other, field.name) is not None
+            else getattr(self, field.name)
+            for field in fields(self)
+        })
+
+
+class QueryLimitError(RuntimeError):
+    """
+    A query was stopped by the governor
+
+    Carries which limit was hit, the configured value and what was observed,
+    so pages can show a specific message instead of a driver error.
+    """
+    kind = 'limit'
+
+    def __init__(self, message: str, limit: Any, actual: Any = None, query: Optional[str] = None):
+        super().__init__(message)
+        self.limit = limit
+        self.actual = actual
+        self.query = query
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'kind': self.kind, 'message': str(self), 'limit': self.limit, 'actual': self.actual}
+
+
+class QueryTimeoutError(QueryLimitError):
+    """The statement ran longer than its timeout and was cancelled"""
+    kind = 'timeout'
+
+
+class RowLimitError(QueryLimitError):
+    """The result has more rows than the app is allowed to fetch"""
+    kind = 'rows'
+
+
+class ScanLimitError(QueryLimitError):
+    """EXPLAIN estimated a larger scan than the query is allowed"""
+    kind = 'bytes'
+
+
+def format_bytes(nbytes: float) -> str:
+    """Formats a byte count for error messages, e.g. '12.3 GB'"""
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if abs(nbytes) < 1024 or unit == 'TB':
+            return f"{nbytes:.0f} {unit}" if unit == 'B' else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} TB"
+
+
+def is_cancelled(error: Exception) -> bool:
+    """Returns True if an error means the statement was cancelled"""
+    return getattr(error, 'errno', None) == QUERY_CANCELLED_ERRNO
+
+
+def parse_scan_estimate(plan_json: str) -> Optional[int]:
+    """
+    Reads the bytes Snowflake expects to scan from EXPLAIN USING JSON output
+
+    Returns:
+        GlobalStats.bytesAssigned, or None if the plan has no estimate
+    """
+    try:
+        stats = json.loads(plan_json).get('GlobalStats', {})
+    except (TypeError, ValueError, AttributeError):
+        return None
+    value = stats.get('bytesAssigned')
+    return int(value) if value is not None else None
+
+
+_active_limits: ContextVar[Optional[QueryLimits]] = ContextVar('query_limits', default=None)
+
+
+def active_limits() -> Optional[QueryLimits]:
+    """Returns the limits set by the enclosing limit_scope on this thread, if any"""
+    return _active_limits.get()
+
+
+@contextmanager
+def limit_scope(limits: Optional[QueryLimits]) -> Iterator[None]:
+    """
+    Applies limits to every query issued inside the block
+
+    Used for per-page budgets; nested scopes override the limits they set
+    and inherit the rest.
+    """
+    current = _active_limits.get()
+    token = _active_limits.set(limits if current is None else current.override(limits))
+    try:
+        yield
+    finally:
+        _active_limits.reset(token)
+
+
+class ScanEstimateCache:
+    """
+    Remembers EXPLAIN scan estimates so the pre-check is not repeated per execution
+
+    Estimates only move when the tables grow, so they are kept for
+    ``ttl`` seconds per query and parameter set.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_estimate(self, key: str, estimate: Callable[[], Optional[int]]) -> Optional[int]:
+        """
+        Returns the cached estimate for key, computing it on a miss
+
+        Args:
+            key: Identity of the query and its parameters
+            estimate: Runs EXPLAIN and returns the estimated bytes
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and now - cached[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        value = estimate()
+        with self._lock:
+            self._entries[key] = (value, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
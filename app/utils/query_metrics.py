@@ -0,0 +1,282 @@
+"""
+Query Metrics Utility
+Per-query instrumentation and a rotating slow-query log
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from .query_tags import current_session_id
+from .result_cache import SQL_TOKEN_PATTERN, normalize_sql
+
+APP_DIR = Path(__file__).parent.parent
+DEFAULT_SLOW_LOG_PATH = APP_DIR.parent / ".cache" / "logs" / "slow_queries.log"
+
+_NUMBER_PATTERN = re.compile(r'\b\d+(\.\d+)?\b')
+
+
+def fingerprint_sql(query: str) -> str:
+    """
+    Identifies a query's shape independent of its literal values
+
+    Normalizes the SQL, replaces string and numeric literals with ``?`` and
+    hashes the result, so the same dashboard query with different filter
+    values shares one fingerprint.
+
+    Returns:
+        16-character hex digest
+    """
+    normalized = normalize_sql(query)
+    shape = SQL_TOKEN_PATTERN.sub(lambda m: m.group(0) if m.group(2) else '?', normalized)
+    shape = _NUMBER_PATTERN.sub('?', shape)
+    return hashlib.sha1(shape.encode('utf-8')).hexdigest()[:16]
+
+
+def infer_caller() -> str:
+    """
+    Names the app code that issued the current query
+
+    Walks the stack to the first frame inside the app that is not part of
+    utils/, e.g. ``pages/2_Fraud_Detection.py:245``.
+    """
+    utils_dir = Path(__file__).parent
+    frame = sys._getframe(1)
+    while frame is not None:
+        path = Path(frame.f_code.co_filename)
+        if APP_DIR in path.parents and utils_dir not in path.parents:
+            location = path.relative_to(APP_DIR).as_posix()
+            function = frame.f_code.co_name
+            suffix = '' if function == '<module>' else f" ({function})"
+            return f"{location}:{frame.f_lineno}{suffix}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+@dataclass
+class QueryTrace:
+    """Timings and outcome of one query call; times are in seconds"""
+    caller: str
+    kind: str
+    fingerprint: str
+    sql: str
+    params: Optional[Any] = None  # Bind values, so slow-log plans can be fetched for BoundQuerys
+    feature: Optional[str] = None
+    session: str = 'none'
+    started_at: float = field(default_factory=time.time)
+    query_id: Optional[str] = None
+    cache: str = 'off'        # off, hit, miss, coalesced, stale
+    wall: float = 0.0
+    execute: float = 0.0      # cursor.execute: compile, queue and run on the warehouse
+    fetch: float = 0.0        # downloading the result
+    build: float = 0.0        # converting it to a DataFrame
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+    error: Optional[str] = None
+
+    def fail(self, error: Exception):
+        """Records an error that the caller handled instead of raising"""
+        self.error = f"{type(error).__name__}: {str(error)}"
+
+    def finish(self, frame: Optional[pd.DataFrame]):
+        """Records the size of the returned result"""
+        if frame is None:
+            return
+        self.rows = len(frame)
+        if self.bytes is None:
+            self.bytes = int(frame.memory_usage(index=True, deep=False).sum())
+
+    def to_dict(self, include_sql: bool = False) -> Dict[str, Any]:
+        data = asdict(self)
+        if not include_sql:
+            data.pop('sql')
+            data.pop('params')
+        return data
+
+
+_current_trace: ContextVar[Optional[QueryTrace]] = ContextVar('query_trace', default=None)
+
+
+def current_trace() -> Optional[QueryTrace]:
+    """Returns the trace of the query being executed on this thread, if any"""
+    return _current_trace.get()
+
+
+@contextmanager
+def detached() -> Iterator[None]:
+    """Runs auxiliary queries (metadata polls, EXPLAIN) without touching the current trace"""
+    token = _current_trace.set(None)
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+
+
+class QueryRecorder:
+    """
+    Collects query traces
+
+    Keeps recent traces and per-fingerprint totals in memory. Traces slower
+    than ``slow_threshold`` seconds, and failed queries, are written as JSON
+    lines to a rotating log file together with the query's EXPLAIN plan,
+    which is fetched on a background thread.
+    """
+
+    def __init__(
+        self,
+        explain_fn: Optional[Callable[[str, Optional[Any]], str]] = None,
+        slow_threshold: float = 2.0,
+        log_path: Path = DEFAULT_SLOW_LOG_PATH,
+        history: int = 500
+    ):
+        """
+        Args:
+            explain_fn: Returns the plan text for a SQL string and its bind parameters
+            slow_threshold: Wall time in seconds above which a query is logged
+            log_path: Slow query log file (rotated at 5 MB, 5 backups kept)
+            history: Number of recent traces kept in memory
+        """
+        self._explain_fn = explain_fn
+        self.slow_threshold = slow_threshold
+        self.log_path = Path(log_path)
+
+        self._lock = threading.Lock()
+        self._recent: deque = deque(maxlen=history)
+        self._by_fingerprint: Dict[str, Dict[str, Any]] = {}
+        self._explainer: Optional[ThreadPoolExecutor] = None
+        self._logger: Optional[logging.Logger] = None
+
+    @contextmanager
+    def trace(
+        self,
+        query: str,
+        kind: str = 'query',
+        caller: Optional[str] = None,
+        feature: Optional[str] = None,
+        session: Optional[str] = None,
+        params: Optional[Any] = None
+    ) -> Iterator[QueryTrace]:
+        """
+        Context manager timing one query call
+
+        Nested calls (e.g. execute_cortex_query running execute_query) share
+        the outermost trace, so each user-visible call is recorded once.
+        Caller and session default to the code and Streamlit session on
+        the current thread.
+        """
+        parent = _current_trace.get()
+        if parent is not None:
+            if parent.feature is None:
+                parent.feature = feature
+            yield parent
+            return
+
+        trace = QueryTrace(
+            caller=caller or infer_caller(),
+            kind=kind,
+            fingerprint=fingerprint_sql(query),
+            sql=query,
+            params=params,
+            feature=feature,
+            session=session or current_session_id(),
+        )
+        token = _current_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        except Exception as e:
+            trace.fail(e)
+            raise
+        finally:
+            trace.wall = time.perf_counter() - start
+            _current_trace.reset(token)
+            self.record(trace)
+
+    def record(self, trace: QueryTrace):
+        """Adds a finished trace and logs it if slow or failed"""
+        with self._lock:
+            self._recent.append(trace)
+            totals = self._by_fingerprint.setdefault(trace.fingerprint, {
+                'fingerprint': trace.fingerprint,
+                'caller': trace.caller,
+                'calls': 0,
+                'errors': 0,
+                'cache_hits': 0,
+                'total_wall': 0.0,
+                'max_wall': 0.0,
+            })
+            totals['calls'] += 1
+            totals['errors'] += trace.error is not None
+            totals['cache_hits'] += trace.cache in ('hit', 'stale', 'coalesced')
+            totals['total_wall'] += trace.wall
+            totals['max_wall'] = max(totals['max_wall'], trace.wall)
+
+        if trace.error is not None or trace.wall >= self.slow_threshold:
+            self._log_slow(trace)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Returns the most recent traces, newest first"""
+        with self._lock:
+            return [trace.to_dict() for trace in list(self._recent)[-limit:]][::-1]
+
+    def summary(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Returns per-fingerprint totals ordered by total wall time"""
+        with self._lock:
+            rows = [dict(totals) for totals in self._by_fingerprint.values()]
+        for row in rows:
+            row['mean_wall'] = row['total_wall'] / row['calls']
+        return sorted(rows, key=lambda row: row['total_wall'], reverse=True)[:limit]
+
+    def _log_slow(self, trace: QueryTrace):
+        # Plans are only useful for queries that actually ran on the warehouse
+        wants_plan = self._explain_fn is not None and trace.error is None and trace.cache in ('off', 'miss')
+        with self._lock:
+            if wants_plan and self._explainer is None:
+                self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+            explainer = self._explainer
+
+        if wants_plan:
+            explainer.submit(self._write_entry, trace, True)
+        else:
+            self._write_entry(trace, False)
+
+    def _write_entry(self, trace: QueryTrace, with_plan: bool):
+        entry = trace.to_dict(include_sql=True)
+        if with_plan:
+            try:
+                with detached():
+                    entry['plan'] = self._explain_fn(trace.sql, trace.params)
+            except Exception as e:
+                entry['plan_error'] = str(e)
+        try:
+            self._get_logger().warning(json.dumps(entry, default=str))
+        except Exception as e:
+            print(f"Slow query log write failed: {str(e)}")
+
+    def _get_logger(self) -> logging.Logger:
+        with self._lock:
+            if self._logger is None:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                logger = logging.getLogger(f"secure_insights.slow_queries.{id(self)}")
+                logger.propagate = False
+                handler = RotatingFileHandler(
+                    self.log_path, maxBytes=5 * 1024 * 1024, backupCount=5, encoding='utf-8'
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger.addHandler(handler)
+                self._logger = logger
+            return self._logger
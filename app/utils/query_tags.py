@@ -0,0 +1,158 @@
+"""
+Query Tags Utility
+Builds the Snowflake QUERY_TAG that attributes each statement to a page, feature and session
+"""
+
+import hashlib
+import json
+import re
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+APP_NAME = 'secure_insights'
+
+# Snowflake rejects QUERY_TAG values longer than this
+MAX_TAG_LENGTH = 2000
+
+_CALLER_PATTERN = re.compile(r'^(?:pages/)?(?P<page>[^/:]+?)\.py:(?P<line>\d+)(?: \((?P<function>[^)]+)\))?(?: \[(?P<name>[^\]]+)\])?')
+
+
+def current_session_id() -> str:
+    """
+    Returns a short, stable identifier for the Streamlit session on this thread
+
+    The raw session id is hashed so tags never carry it verbatim. Threads
+    outside a script run (pool workers, background jobs) return 'none'.
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        ctx = None
+    if ctx is None:
+        return 'none'
+    return hashlib.sha1(ctx.session_id.encode('utf-8')).hexdigest()[:12]
+
+
+def parse_caller(caller: str) -> Dict[str, Optional[str]]:
+    """
+    Splits an infer_caller() location into page and default feature
+
+    ``pages/3_Reports.py:111`` becomes page ``3_Reports`` and feature
+    ``line 111``; a function name or execute_many entry name, when present,
+    is used as the feature instead of the line.
+    """
+    match = _CALLER_PATTERN.match(caller or '')
+    if match is None:
+        return {'page': caller or 'unknown', 'feature': None}
+    feature = match.group('name') or match.group('function') or f"line {match.group('line')}"
+    return {'page': match.group('page'), 'feature': feature}
+
+
+def build_query_tag(
+    page: str,
+    feature: Optional[str],
+    session: str,
+    kind: str = 'query'
+) -> str:
+    """
+    Encodes attribution as a compact JSON QUERY_TAG
+
+    Args:
+        page: App page, e.g. '3_Reports'
+        feature: Section of the page issuing the query
+        session: Session identifier from current_session_id()
+        kind: 'query', 'cortex' or 'system'
+
+    Returns:
+        Tag string of at most MAX_TAG_LENGTH characters
+    """
+    tag = {
+        'app': APP_NAME,
+        'page': page,
+        'feature': feature,
+        'session': session,
+        'kind': kind,
+    }
+    text = json.dumps(tag, separators=(',', ':'))
+    if len(text) > MAX_TAG_LENGTH:
+        tag['feature'] = (feature or '')[:200]
+        text = json.dumps(tag, separators=(',', ':'))
+    return text
+
+
+def quote_literal(value: str) -> str:
+    """Quotes a string as a Snowflake SQL literal (independent of the driver's paramstyle)"""
+    return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def parse_query_tag(tag: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Decodes a tag written by build_query_tag; returns None for foreign tags"""
+    if not tag:
+        return None
+    try:
+        data = json.loads(tag)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get('app') != APP_NAME:
+        return None
+    return data
+
+
+class SessionTagger:
+    """
+    Keeps each pooled session's QUERY_TAG in step with the statement it runs
+
+    QUERY_TAG is a session parameter, so changing it costs an extra
+    ALTER SESSION round trip. The tag last set on every raw connection is
+    remembered and the ALTER is only issued when the next statement needs
+    a different one; consecutive queries from the same page section reuse
+    the session's tag for free.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tags: 'weakref.WeakKeyDictionary[Any, str]' = weakref.WeakKeyDictionary()
+        self.changes = 0
+        self.reused = 0
+        self.failures = 0
+
+    def apply(self, raw: Any, tag: str):
+        """
+        Sets the tag on a raw connection unless it is already current
+
+        Args:
+            raw: Connection checked out of the pool (used by one thread at a time)
+            tag: Tag built with build_query_tag()
+        """
+        with self._lock:
+            if self._tags.get(raw) == tag:
+                self.reused += 1
+                return
+
+        cursor = raw.cursor()
+        try:
+            cursor.execute(f"ALTER SESSION SET QUERY_TAG = {quote_literal(tag)}")
+        except Exception as e:
+            # Attribution is best effort and must never fail the query itself
+            with self._lock:
+                self.failures += 1
+                self._tags.pop(raw, None)
+            print(f"Setting QUERY_TAG failed: {str(e)}")
+            return
+        finally:
+            cursor.close()
+
+        with self._lock:
+            self._tags[raw] = tag
+            self.changes += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Returns how often a session's tag had to change versus was reused"""
+        with self._lock:
+            return {
+                'tag_changes': self.changes,
+                'tag_reused': self.reused,
+                'tag_failures': self.failures,
+            }
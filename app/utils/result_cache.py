@@ -0,0 +1,461 @@
+"""
+Result Cache Utility
+Two-tier (memory + local disk) cache for query results keyed on normalized SQL
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent.parent / ".cache" / "results"
+
+# String literals, quoted identifiers and comments, in that order of precedence
+SQL_TOKEN_PATTERN = re.compile(
+    r"('(?:[^']|'')*')"          # 'string literal'
+    r'|("(?:[^"]|"")*")'         # "Quoted Identifier"
+    r"|(--[^\n]*|/\*.*?\*/)",    # -- line comment or /* block comment */
+    re.DOTALL
+)
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Canonicalizes SQL text so formatting differences share a cache entry
+
+    Comments are removed, whitespace runs collapse to one space, unquoted
+    text is upper-cased (Snowflake resolves unquoted identifiers
+    case-insensitively) and trailing semicolons are dropped. String literals
+    and quoted identifiers are left untouched.
+
+    Args:
+        query: SQL query string
+
+    Returns:
+        Normalized SQL string
+    """
+    parts = []
+    code = ''
+    position = 0
+    for match in SQL_TOKEN_PATTERN.finditer(query):
+        code += query[position:match.start()]
+        if match.group(3):
+            code += ' '
+        else:
+            parts.append(re.sub(r'\s+', ' ', code.upper()))
+            parts.append(match.group(0))
+            code = ''
+        position = match.end()
+    code += query[position:]
+    parts.append(re.sub(r'\s+', ' ', code.upper()))
+
+    normalized = ''.join(parts).strip()
+    return normalized.rstrip(';').strip()
+
+
+def make_cache_key(
+    query: str,
+    params: Optional[Any] = None,
+    role: Optional[str] = None,
+    warehouse: Optional[str] = None
+) -> str:
+    """
+    Builds a cache key from normalized SQL, bind parameters, role and warehouse
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        [normalize_sql(query), params, (role or '').upper(), (warehouse or '').upper()],
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CacheEntry:
+    """Metadata for one cached result"""
+
+    def __init__(
+        self,
+        key: str,
+        nbytes: int,
+        expires_at: float,
+        created_at: Optional[float] = None,
+        sources: Optional[Dict[str, int]] = None
+    ):
+        self.key = key
+        self.nbytes = nbytes
+        self.expires_at = expires_at
+        self.created_at = time.time() if created_at is None else created_at
+        # Source table -> LAST_ALTERED version the result was computed from
+        self.sources = sources or {}
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'key': self.key,
+            'nbytes': self.nbytes,
+            'expires_at': self.expires_at,
+            'created_at': self.created_at,
+            'sources': self.sources,
+        }
+
+    def is_outdated(self, versions: Dict[str, int]) -> bool:
+        """True if any source table has changed since the result was computed"""
+        return any(
+            table in versions and versions[table] > version
+            for table, version in self.sources.items()
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CacheEntry':
+        return cls(data['key'], data['nbytes'], data['expires_at'], data['created_at'], data.get('sources'))
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of query result DataFrames
+
+    Results live in an in-memory LRU tier and are written through to
+    zstd-compressed Parquet files on local disk, so they survive process
+    restarts and are shared by every worker on the host: a key missing from
+    this process's disk index is looked up by its metadata file, which
+    picks up entries other workers wrote since startup. Both tiers have a
+    byte budget; least recently used entries are evicted first.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = DEFAULT_CACHE_DIR,
+        memory_budget_bytes: int = 256 * 1024 * 1024,
+        disk_budget_bytes: int = 2 * 1024 * 1024 * 1024,
+        default_ttl: float = 3600.0
+    ):
+        """
+        Args:
+            cache_dir: Directory for the on-disk tier
+            memory_budget_bytes: Maximum in-memory size of cached DataFrames
+            disk_budget_bytes: Maximum on-disk size of cached Parquet files
+            default_ttl: Seconds an entry stays valid when put() gets no ttl
+        """
+        self.cache_dir = Path(cache_dir)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_budget_bytes = disk_budget_bytes
+        self.default_ttl = default_ttl
+
+        self._lock = threading.RLock()
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()  # key -> (entry, frame)
+        self._disk: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._pending: Dict[str, CacheEntry] = {}  # written to memory, disk write in flight
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        self._load_disk_index()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Looks up a cached result
+
+        Args:
+            key: Key from make_cache_key()
+
+        Returns:
+            A copy of the cached DataFrame, or None on a miss
+        """
+        found = self.get_entry(key)
+        return None if found is None else found[0]
+
+    def get_entry(self, key: str, allow_expired: bool = False) -> Optional[Tuple[pd.DataFrame, CacheEntry]]:
+        """
+        Looks up a cached result together with its metadata
+
+        Args:
+            key: Key from make_cache_key()
+            allow_expired: Return entries past their TTL instead of dropping
+                them (used to serve stale data while it is refreshed)
+
+        Returns:
+            Tuple of (copy of the DataFrame, CacheEntry), or None on a miss
+        """
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                entry, frame = cached
+                if entry.expired and not allow_expired:
+                    self._remove(key)
+                    self.expirations += 1
+                    self.misses += 1
+                    return None
+                self._memory.move_to_end(key)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self.memory_hits += 1
+                return frame.copy(), entry
+
+            entry = self._disk.get(key)
+            if entry is None:
+                entry = self._adopt_from_disk(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expired and not allow_expired:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+        try:
+            frame = pd.read_parquet(self._data_path(key))
+        except Exception:
+            with self._lock:
+                self._remove(key)
+                self.misses += 1
+            return None
+
+        # Disk entries record file size; the memory tier budgets in-memory size
+        memory_entry = CacheEntry(
+            key, int(frame.memory_usage(deep=True).sum()), entry.expires_at, entry.created_at, entry.sources
+        )
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+                self._touch(key)
+                self._store_in_memory(memory_entry, frame)
+            self.disk_hits += 1
+        return frame.copy(), memory_entry
+
+    def put(
+        self,
+        key: str,
+        frame: pd.DataFrame,
+        ttl: Optional[float] = None,
+        sources: Optional[Dict[str, int]] = None
+    ):
+        """
+        Stores a result in both tiers
+
+        Args:
+            key: Key from make_cache_key()
+            frame: Query result
+            ttl: Seconds until the entry expires (defaults to default_ttl)
+            sources: Source table versions the result was computed from,
+                used by evict_outdated()
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        frame = frame.copy()
+        nbytes = int(frame.memory_usage(deep=True).sum())
+        entry = CacheEntry(key, nbytes, time.time() + ttl, sources=sources)
+
+        with self._lock:
+            self._remove(key)
+            self._store_in_memory(entry, frame)
+            self._pending[key] = entry
+
+        self._write_to_disk(entry, frame)
+
+    def invalidate(self, key: str) -> bool:
+        """
+        Removes one entry from both tiers
+
+        Returns:
+            True if the entry existed
+        """
+        with self._lock:
+            existed = key in self._memory or key in self._disk
+            self._remove(key)
+            return existed
+
+    def evict_outdated(self, versions: Dict[str, int]) -> int:
+        """
+        Removes entries computed from an older version of any source table
+
+        Args:
+            versions: Current LAST_ALTERED version per fully qualified table name
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            entries = [entry for entry, _ in self._memory.values()]
+            entries += list(self._disk.values()) + list(self._pending.values())
+            outdated = {entry.key for entry in entries if entry.is_outdated(versions)}
+            for key in outdated:
+                self._remove(key)
+            self.invalidations += len(outdated)
+            return len(outdated)
+
+    def clear(self):
+        """Removes every entry from both tiers"""
+        with self._lock:
+            for key in list(self._disk) + list(self._memory):
+                self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss/eviction counters and tier sizes"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_bytes,
+            }
+
+    def _store_in_memory(self, entry: CacheEntry, frame: pd.DataFrame):
+        """Adds an entry to the memory tier; caller holds the lock"""
+        if entry.nbytes > self.memory_budget_bytes:
+            return
+        self._memory[entry.key] = (entry, frame)
+        self._memory_bytes += entry.nbytes
+        while self._memory_bytes > self.memory_budget_bytes and self._memory:
+            # Memory eviction only drops the hot copy; the disk tier keeps it
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _write_to_disk(self, entry: CacheEntry, frame: pd.DataFrame):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            data_path = self._data_path(entry.key)
+            tmp_path = data_path.with_suffix('.tmp')
+            frame.to_parquet(tmp_path, compression='zstd', index=False)
+            os.replace(tmp_path, data_path)
+            disk_entry = CacheEntry(
+                entry.key, data_path.stat().st_size, entry.expires_at, entry.created_at, entry.sources
+            )
+            self._meta_path(entry.key).write_text(json.dumps(disk_entry.to_dict()), encoding='utf-8')
+        except Exception as e:
+            # A read-only or full disk degrades to a memory-only cache
+            print(f"Result cache disk write failed: {str(e)}")
+            with self._lock:
+                if self._pending.get(entry.key) is entry:
+                    del self._pending[entry.key]
+            return
+
+        with self._lock:
+            # The entry may have been invalidated or replaced during the write
+            if self._pending.get(entry.key) is not entry:
+                if entry.key not in self._disk:
+                    self._delete_files(entry.key)
+                return
+            del self._pending[entry.key]
+            self._disk[entry.key] = disk_entry
+            self._disk_bytes += disk_entry.nbytes
+            while self._disk_bytes > self.disk_budget_bytes and self._disk:
+                oldest = next(iter(self._disk))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        """Drops an entry from both tiers; caller holds the lock"""
+        self._pending.pop(key, None)
+        cached = self._memory.pop(key, None)
+        if cached is not None:
+            self._memory_bytes -= cached[0].nbytes
+        entry = self._disk.pop(key, None)
+        if entry is not None:
+            self._disk_bytes -= entry.nbytes
+            self._delete_files(key)
+
+    def _load_disk_index(self):
+        """Rebuilds the disk-tier index from metadata files, oldest access first"""
+        if not self.cache_dir.exists():
+            return
+        entries = []
+        for meta_path in self.cache_dir.glob('*.json'):
+            try:
+                entry = CacheEntry.from_dict(json.loads(meta_path.read_text(encoding='utf-8')))
+                accessed = self._data_path(entry.key).stat().st_mtime
+            except Exception:
+                continue
+            if entry.expired:
+                self._delete_files(entry.key)
+                continue
+            entries.append((accessed, entry))
+        for _, entry in sorted(entries, key=lambda item: item[0]):
+            self._disk[entry.key] = entry
+            self._disk_bytes += entry.nbytes
+
+    def _adopt_from_disk(self, key: str) -> Optional[CacheEntry]:
+        """
+        Indexes an entry another worker wrote after this process started
+
+        Metadata is written after the Parquet file, so a readable metadata
+        file means the data is complete. Caller holds the lock.
+        """
+        if key in self._pending:
+            return None
+        try:
+            entry = CacheEntry.from_dict(json.loads(self._meta_path(key).read_text(encoding='utf-8')))
+        except (OSError, ValueError, KeyError):
+            return None
+        if entry.key != key:
+            return None
+        self._disk[key] = entry
+        self._disk_bytes += entry.nbytes
+        return entry
+
+    def _touch(self, key: str):
+        """Records an access so LRU order survives restarts"""
+        try:
+            os.utime(self._data_path(key))
+        except OSError:
+            pass
+
+    def _delete_files(self, key: str):
+        for path in (self._data_path(key), self._meta_path(key)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Result cache cleanup failed: {str(e)}")
+
+    def _data_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+
+# Singleton instance
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_result_cache() -> ResultCache:
+    """Returns the process-wide ResultCache, configured from the environment"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    cache_dir=Path(os.getenv('RESULT_CACHE_DIR', str(DEFAULT_CACHE_DIR))),
+                    memory_budget_bytes=int(os.getenv('RESULT_CACHE_MEMORY_MB', '256')) * 1024 * 1024,
+                    disk_budget_bytes=int(os.getenv('RESULT_CACHE_DISK_MB', '2048')) * 1024 * 1024,
+                    default_ttl=float(os.getenv('RESULT_CACHE_TTL', '3600')),
+                )
+    return _cache
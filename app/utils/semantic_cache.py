@@ -0,0 +1,413 @@
+"""
+Semantic Cache Utility
+Reuses validated SQL for questions that paraphrase one answered before
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional
+
+import numpy as np
+
+from .translation_cache import TranslationCache, get_translation_cache, make_translation_key, normalize_question
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS question_vectors (
+    key TEXT NOT NULL,
+    embedder TEXT NOT NULL,
+    question TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (key, embedder)
+);
+"""
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words that carry no meaning about which data a question wants
+_STOPWORDS = frozenset("""
+a about across all an and any are as at be been by can could did do does each for from give had has have
+how i in is it its list me my of on or our over per please show tell than that the their there these this
+those to us was we were what when where which who with would you
+""".split())
+
+# Different words for the same concept in questions about this data
+_SYNONYMS = {
+    'band': 'group', 'bracket': 'group', 'bucket': 'group', 'cohort': 'group', 'range': 'group',
+    'demographic': 'age',
+    'area': 'geographic', 'region': 'geographic', 'location': 'geographic', 'geography': 'geographic',
+    'zip': 'geographic', 'postcode': 'geographic', 'prefix': 'geographic',
+    'most': 'highest', 'top': 'highest', 'biggest': 'highest', 'largest': 'highest', 'greatest': 'highest',
+    'maximum': 'highest', 'max': 'highest', 'worst': 'highest', 'elevated': 'high',
+    'least': 'lowest', 'fewest': 'lowest', 'smallest': 'lowest', 'bottom': 'lowest', 'minimum': 'lowest',
+    'min': 'lowest',
+    'company': 'organization', 'organisation': 'organization', 'org': 'organization',
+    'institution': 'organization', 'firm': 'organization', 'source': 'organization',
+    'fraudulent': 'fraud', 'breakdown': 'summary', 'overview': 'summary',
+    'banking': 'bank', 'insurer': 'insurance', 'retailer': 'retail',
+}
+
+# Terms that change a question's answer: two questions that use different
+# terms from one group (or one uses a term the other lacks) never match,
+# however similar the rest of the wording is
+CONTRAST_GROUPS = (
+    frozenset({'highest', 'lowest'}),
+    frozenset({'increase', 'decrease'}),
+    frozenset({'above', 'below'}),
+    frozenset({'bank', 'insurance', 'retail'}),
+)
+
+
+def question_terms(question: str) -> List[str]:
+    """
+    Reduces a question to its content terms
+
+    Stopwords are dropped, plurals are folded (crude suffix stripping is
+    enough for short questions) and domain synonyms are mapped to one term.
+
+    Args:
+        question: User's question in plain English
+
+    Returns:
+        Terms in question order
+    """
+    terms = []
+    for word in _WORD_PATTERN.findall(normalize_question(question)):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith('ies'):
+            word = word[:-3] + 'y'
+        elif len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'is', 'us')):
+            word = word[:-1]
+        terms.append(_SYNONYMS.get(word, word))
+    return terms
+
+def contrast_terms(terms: List[str]) -> FrozenSet[str]:
+    """Returns the terms (and numbers) that must agree for two questions to match"""
+    contrast = {term for term in terms if term.isdigit()}
+    for group in CONTRAST_GROUPS:
+        contrast.update(group.intersection(terms))
+    return frozenset(contrast)
+
+
+class LocalEmbedder:
+    """
+    Embeds questions without any service call
+
+    Each content term, and with a lower weight each of its character
+    trigrams, is hashed into a fixed-size vector (the hashing trick), which
+    is then L2-normalized. Shared terms and synonyms score high; trigrams
+    tolerate typos and word forms the term folding misses.
+    """
+
+    name = 'local-hash-v1'
+    default_threshold = 0.8
+
+    def __init__(self, dimensions: int = 1024, trigram_weight: float = 0.25):
+        self.dimensions = dimensions
+        self.trigram_weight = trigram_weight
+
+    def embed(self, question: str) -> Optional[np.ndarray]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for term in question_terms(question):
+            self._add(vector, f"w:{term}", 1.0)
+            padded = f"#{term}#"
+            for i in range(len(padded) - 2):
+                self._add(vector, f"t:{padded[i:i + 3]}", self.trigram_weight)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _add(self, vector: np.ndarray, feature: str, weight: float):
+        # crc32 rather than hash(), which is salted per process
+        digest = zlib.crc32(feature.encode('utf-8'))
+        vector[digest % self.dimensions] += weight if digest & 0x80000000 else -weight
+
+
+class CortexEmbedder:
+    """
+    Embeds questions with SNOWFLAKE.CORTEX.EMBED_TEXT_768
+
+    Calls go through the result cache, and recent questions are also kept
+    in memory, so a question is embedded by Cortex at most once.
+    """
+
+    name = 'cortex-snowflake-arctic-embed-m'
+    default_threshold = 0.9
+    model = 'snowflake-arctic-embed-m'
+
+    def __init__(self, conn, memory_size: int = 256):
+        """
+        Args:
+            conn: SnowflakeConnection the embedding queries run on
+            memory_size: Recent question embeddings kept in memory
+        """
+        self.conn = conn
+        self.memory_size = memory_size
+        self._memory: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, question: str) -> Optional[np.ndarray]:
+        from .query_builder import BoundQuery
+
+        text = normalize_question(question)
+        with self._lock:
+            if text in self._memory:
+                self._memory.move_to_end(text)
+                return self._memory[text]
+
+        query = BoundQuery(
+            "SELECT SNOWFLAKE.CORTEX.EMBED_TEXT_768(?, ?)::ARRAY AS EMBEDDING",
+            (self.model, text)
+        )
+        result = self.conn.execute_many({'nl_question_embedding': query}, cache=True, ttl=30 * 24 * 3600)
+        result = result['nl_question_embedding']
+        if not result.ok or result.data.empty:
+            print(f"Question embedding failed: {result.error}")
+            return None
+        values = result.data.iloc[0]['EMBEDDING']
+        if isinstance(values, str):
+            values = json.loads(values)
+        vector = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        vector = vector / norm
+
+        with self._lock:
+            self._memory[text] = vector
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+        return vector
+
+
+class SemanticMatch(NamedTuple):
+    """A previously answered question similar enough to reuse its SQL"""
+    sql: str
+    question: str
+    score: float
+
+
+class SemanticCache:
+    """
+    Vector index over questions whose generated SQL ran successfully
+
+    Vectors are kept in one in-memory matrix, so a lookup is a single
+    matrix-vector product, and persisted next to the translations so the
+    index survives restarts. add() inserts one question at a time. The SQL
+    itself stays in the TranslationCache; an indexed question whose
+    translation was evicted there is dropped on its next match.
+
+    A match is reused only when its cosine similarity reaches ``threshold``
+    and both questions agree on contrast terms (highest vs lowest, one
+    organization vs another, numbers).
+    """
+
+    def __init__(
+        self,
+        translations: TranslationCache,
+        embedder: Any = None,
+        threshold: Optional[float] = None
+    ):
+        """
+        Args:
+            translations: Store holding the SQL of each indexed question
+            embedder: LocalEmbedder (default) or CortexEmbedder
+            threshold: Minimum cosine similarity to reuse SQL (defaults to the embedder's)
+        """
+        self.translations = translations
+        self.embedder = embedder or LocalEmbedder()
+        self.threshold = threshold if threshold is not None else self.embedder.default_threshold
+        self.db_path = translations.db_path
+
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        self._size = 0
+        self._keys: List[Optional[str]] = []
+        self._questions: List[str] = []
+        self._versions: List[str] = []
+
+        self.lookups = 0
+        self.hits = 0
+        self.below_threshold = 0
+        self.contrast_rejections = 0
+
+        if self.enabled:
+            with closing(self._connect()) as db, db:
+                db.executescript(_SCHEMA)
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.translations.enabled
+
+    def lookup(self, question: str, prompt_version: str) -> Optional[SemanticMatch]:
+        """
+        Finds SQL generated for a question similar to this one
+
+        Args:
+            question: User's question, as typed
+            prompt_version: Version of the prompt the SQL must have been generated with
+
+        Returns:
+            The best confident match, or None
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self.lookups += 1
+            if not self._size:
+                return None
+        vector = self.embedder.embed(question)
+        if vector is None:
+            return None
+        wanted = contrast_terms(question_terms(question))
+
+        with self._lock:
+            scores = self._vectors[:self._size] @ vector
+            candidates = []
+            for index in np.argsort(-scores):
+                score = float(scores[index])
+                if score < self.threshold:
+                    break
+                if self._keys[index] is not None and self._versions[index] == prompt_version:
+                    candidates.append((self._keys[index], self._questions[index], score))
+            if not candidates:
+                self.below_threshold += 1
+                return None
+
+        for key, indexed_question, score in candidates:
+            if contrast_terms(question_terms(indexed_question)) != wanted:
+                with self._lock:
+                    self.contrast_rejections += 1
+                continue
+            sql = self.translations.get_by_key(key)
+            if sql is None:
+                self._remove(key)
+                continue
+            with self._lock:
+                self.hits += 1
+            return SemanticMatch(sql, indexed_question, score)
+        return None
+
+    def add(self, question: str, prompt_version: str):
+        """Indexes a question whose SQL was just stored in the TranslationCache"""
+        if not self.enabled:
+            return
+        vector = self.embedder.embed(question)
+        if vector is None:
+            return
+        key = make_translation_key(question, prompt_version)
+        text = normalize_question(question)
+        with self._lock:
+            if key in self._keys:
+                return
+            self._append(key, text, prompt_version, vector)
+            with closing(self._connect()) as db, db:
+                db.execute(
+                    "INSERT OR REPLACE INTO question_vectors VALUES (?, ?, ?, ?, ?)",
+                    (key, self.embedder.name, text, prompt_version, vector.astype(np.float32).tobytes())
+                )
+
+    def invalidate(self, indexed_question: str, prompt_version: str) -> bool:
+        """
+        Forgets a matched question whose SQL failed or returned no rows
+
+        Drops it from the index and its SQL from the TranslationCache, so
+        neither this question nor its paraphrases reuse the SQL again.
+
+        Args:
+            indexed_question: SemanticMatch.question of the failed match
+            prompt_version: Version the SQL was generated with
+
+        Returns:
+            True if the translation existed
+        """
+        if not self.enabled:
+            return False
+        self._remove(make_translation_key(indexed_question, prompt_version))
+        return self.translations.invalidate(indexed_question, prompt_version)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns index size and this process's lookup counters"""
+        with self._lock:
+            return {
+                'embedder': self.embedder.name,
+                'threshold': self.threshold,
+                'entries': sum(key is not None for key in self._keys),
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+                'below_threshold': self.below_threshold,
+                'contrast_rejections': self.contrast_rejections,
+            }
+
+    def _load(self):
+        """Reads this embedder's vectors from disk into the in-memory matrix"""
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT key, question, prompt_version, vector FROM question_vectors WHERE embedder = ?",
+                (self.embedder.name,)
+            ).fetchall()
+        with self._lock:
+            for key, question, version, blob in rows:
+                self._append(key, question, version, np.frombuffer(blob, dtype=np.float32))
+
+    def _append(self, key: str, question: str, version: str, vector: np.ndarray):
+        """Adds a row to the matrix, doubling its capacity when full (caller holds the lock)"""
+        if self._vectors is None:
+            self._vectors = np.zeros((64, vector.shape[0]), dtype=np.float32)
+        elif self._size == self._vectors.shape[0]:
+            grown = np.zeros((self._size * 2, self._vectors.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._vectors
+            self._vectors = grown
+        self._vectors[self._size] = vector
+        self._size += 1
+        self._keys.append(key)
+        self._questions.append(question)
+        self._versions.append(version)
+
+    def _remove(self, key: str):
+        """Drops a question whose translation no longer exists or no longer works"""
+        with self._lock:
+            for index, indexed_key in enumerate(self._keys):
+                if indexed_key == key:
+                    self._keys[index] = None
+                    self._vectors[index] = 0.0
+            with closing(self._connect()) as db, db:
+                db.execute(
+                    "DELETE FROM question_vectors WHERE key = ? AND embedder = ?",
+                    (key, self.embedder.name)
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        return sqlite3.connect(self.db_path, timeout=30)
+
+
+# Singleton instance
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_semantic_cache() -> SemanticCache:
+    """Returns the process-wide SemanticCache, configured from the environment"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                embedder = None
+                if os.getenv('SEMANTIC_CACHE_EMBEDDER', 'local').lower() == 'cortex':
+                    from .snowflake_connector import get_connection
+                    embedder = CortexEmbedder(get_connection())
+                threshold = os.getenv('SEMANTIC_CACHE_THRESHOLD')
+                _cache = SemanticCache(
+                    get_translation_cache(),
+                    embedder=embedder,
+                    threshold=float(threshold) if threshold else None,
+                )
+    return _cache
@@ -0,0 +1,83 @@
+"""
+Single Flight Utility
+Collapses concurrent identical calls into one execution shared by every caller
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """One in-flight execution and the outcome its waiters will receive"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time
+
+    The first caller for a key (the leader) executes the function; callers
+    arriving with the same key while it runs block until it finishes and
+    receive the same result, or the same exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Executes fn, or waits for an identical in-flight call
+
+        Args:
+            key: Identity of the call, e.g. a query cache key
+            fn: Zero-argument callable to run if nothing is in flight
+
+        Returns:
+            Tuple of (result, shared); shared is True when the result came
+            from another caller's execution
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> Dict[str, int]:
+        """Returns counts of executed, coalesced and currently in-flight calls"""
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+            }
@@ -4,136 +4,1083 @@ Handles all database connections and queries
 """
 
 import streamlit as st
-import snowflake.connector
-from snowflake.connector import DictCursor
+import math
 import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple, Union
 import pandas as pd
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from .async_query import AsyncQueryHandle
+from .audit_logger import DEFAULT_SPOOL_PATH, AuditLogger
+from .cache_invalidation import (
+    SourceChangeMonitor,
+    build_last_altered_query,
+    extract_source_tables,
+    is_time_dependent,
+)
+from .connection_pool import ConnectionPool
+from .cost_harvester import DEFAULT_COST_DB_PATH, CostHarvester
+from .query_limits import (
+    QueryLimitError,
+    QueryLimits,
+    QueryTimeoutError,
+    RowLimitError,
+    ScanEstimateCache,
+    ScanLimitError,
+    active_limits,
+    format_bytes,
+    is_cancelled,
+    limit_scope,
+    parse_scan_estimate,
+)
+from .query_metrics import DEFAULT_SLOW_LOG_PATH, QueryRecorder, current_trace, detached, infer_caller
+from .query_tags import SessionTagger, build_query_tag, current_session_id, parse_caller
+from .result_cache import get_result_cache, make_cache_key
+from .single_flight import SingleFlight
+
+_environment_loaded = False
+_environment_lock = threading.Lock()
+
+def load_environment():
+    """
+    Loads .env into the environment once per process
+    
+    Called when the first connection object is created rather than at
+    import, so importing this module stays cheap.
+    """
+    global _environment_loaded
+    if _environment_loaded:
+        return
+    with _environment_lock:
+        if not _environment_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _environment_loaded = True
+
+def is_arrow_unsupported(error: Exception) -> bool:
+    """
+    Returns True if the driver cannot return a result as Arrow (SHOW, DML)
+    
+    Checked against the loaded driver module: when snowflake.connector was
+    never imported (local backend), no error can be one of its errors.
+    """
+    errors = sys.modules.get('snowflake.connector.errors')
+    return errors is not None and isinstance(error, errors.NotSupportedError)
+
+# Snowflake error codes meaning the session or its token is no longer valid
+SESSION_EXPIRED_ERRNOS = {390111, 390112, 390114}
+
+def is_session_expired(error: Exception) -> bool:
+    """Returns True if an error means the Snowflake session has expired"""
+    if getattr(error, 'errno', None) in SESSION_EXPIRED_ERRNOS:
+        return True
+    message = str(error).lower()
+    return 'session' in message and ('expired' in message or 'no longer exists' in message)
+
+# Snowflake query ids are UUIDs; validated before being inlined into SQL
+QUERY_ID_PATTERN = re.compile(r'^[0-9a-fA-F-]{36}$')
+
+# Warehouse names are written into ALTER WAREHOUSE, which takes no bind variables
+WAREHOUSE_NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_$]*$')
+
+# Statements the scan-size pre-check can EXPLAIN
+EXPLAINABLE_PATTERN = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+
+@dataclass
+class QueryChunk:
+    """One chunk of a streamed query result"""
+    index: int
+    data: Any  # pd.DataFrame, or pyarrow.Table when streaming as Arrow
+    row_count: int
+    nbytes: int
+    rows_so_far: int
+    bytes_so_far: int
+
+@dataclass
+class QueryResult:
+    """Outcome of one named query from execute_many"""
+    name: str
+    data: pd.DataFrame
+    elapsed: float
+    error: Optional[Exception] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+    
+    def unwrap(self) -> pd.DataFrame:
+        """Returns the data, re-raising the query's error if it failed"""
+        if self.error is not None:
+            raise self.error
+        return self.data
 
 class SnowflakeConnection:
-    """Manages Snowflake database connections"""
+    """
+    Manages Snowflake database connections
+
+    Safe to share between Streamlit sessions: every query checks a
+    connection out of a bounded pool and runs on its own cursor.
+    """
     
     def __init__(self):
-        self.connection = None
-        self.cursor = None
+        load_environment()
+        
+        # 'snowflake', or 'duckdb' for the embedded offline stand-in (utils/local_backend.py)
+        self.backend = os.getenv('SECURE_INSIGHTS_BACKEND', 'snowflake').lower()
+        self.pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        
+        self._cache_scope: Optional[tuple] = None
+        self._source_monitor: Optional[SourceChangeMonitor] = None
+        self._monitor_lock = threading.Lock()
+        
+        # Identical queries already running are awaited instead of re-submitted
+        self._in_flight = SingleFlight()
+        
+        # Background refreshes for stale-while-revalidate reads
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
+        self._refreshing: set = set()
+        self._refresh_lock = threading.Lock()
+        self._audit_logger: Optional[AuditLogger] = None
+        self._audit_lock = threading.Lock()
+        
+        # Per-query timings; slow and failed queries go to a rotating log with their plan
+        self.metrics = QueryRecorder(
+            explain_fn=self.explain_query,
+            slow_threshold=float(os.getenv('SLOW_QUERY_THRESHOLD', '2')),
+            log_path=Path(os.getenv('SLOW_QUERY_LOG', str(DEFAULT_SLOW_LOG_PATH))),
+        )
+        
+        # QUERY_TAG attribution (page, feature, session) for warehouse cost reports
+        self._query_tags = self.backend == 'snowflake' and os.getenv('SNOWFLAKE_QUERY_TAGS', '1') != '0'
+        self._tagger = SessionTagger()
+        self._cost_harvester: Optional[CostHarvester] = None
+        self._harvester_lock = threading.Lock()
+        
+        # Governor: per-call and per-page limits (limit_scope) override these defaults
+        self.default_limits = QueryLimits.from_env()
+        self._scan_estimates = ScanEstimateCache(ttl=float(os.getenv('QUERY_SCAN_ESTIMATE_TTL', '600')))
+        
+        # Session reuse metrics
+        self._last_verified = 0.0
+        self._connect_calls = 0
+        self._sessions_reused = 0
+        self._sessions_reestablished = 0
+    
+    def _load_credentials(self) -> Dict[str, Any]:
+        """Reads credentials from Streamlit secrets or the environment"""
+        if hasattr(st, 'secrets') and 'snowflake' in st.secrets:
+            return dict(st.secrets['snowflake'])
+        return {
+            'account': os.getenv('SNOWFLAKE_ACCOUNT'),
+            'user': os.getenv('SNOWFLAKE_USER'),
+            'password': os.getenv('SNOWFLAKE_PASSWORD'),
+            'token': os.getenv('SNOWFLAKE_TOKEN'),
+            'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE', 'COMPUTE_WH'),
+            'role': os.getenv('SNOWFLAKE_ROLE', 'ACCOUNTADMIN'),
+        }
+    
+    def _open_connection(self):
+        """Opens a new raw Snowflake connection (called by the pool)"""
+        if self.backend == 'duckdb':
+            # Imported here so DuckDB stays an optional dependency
+            from .local_backend import get_local_backend
+            return get_local_backend().connect()
+        
+        # Imported on first connection: the driver alone takes seconds to
+        # import, which would otherwise delay every page's first render
+        import snowflake.connector
+        
+        config = self._load_credentials()
+        
+        options = {
+            'account': config['account'],
+            'user': config['user'],
+            'warehouse': config['warehouse'],
+            'role': config['role'],
+            # '?' placeholders are bound server-side, so the SQL text stays the
+            # same for every value and compiled plans and cached results are shared
+            'paramstyle': 'qmark',
+            # Heartbeats stop idle pooled sessions from expiring between reruns
+            'client_session_keep_alive': True,
+            'client_session_keep_alive_heartbeat_frequency': int(
+                os.getenv('SNOWFLAKE_KEEP_ALIVE_HEARTBEAT', '900')
+            ),
+        }
+        
+        # Use PAT if available, otherwise password
+        if config.get('token'):
+            return snowflake.connector.connect(
+                authenticator='oauth',
+                token=config['token'],
+                **options,
+            )
+        return snowflake.connector.connect(
+            password=config['password'],
+            **options,
+        )
+    
+    def _get_pool(self) -> ConnectionPool:
+        """Creates the connection pool on first use"""
+        if self.pool is None:
+            with self._pool_lock:
+                if self.pool is None:
+                    self.pool = ConnectionPool(
+                        self._open_connection,
+                        max_size=int(os.getenv('SNOWFLAKE_POOL_MAX_SIZE', '8')),
+                        max_idle_seconds=float(os.getenv('SNOWFLAKE_POOL_IDLE_TIMEOUT', '300')),
+                        checkout_timeout=float(os.getenv('SNOWFLAKE_POOL_CHECKOUT_TIMEOUT', '30')),
+                        max_age_seconds=float(os.getenv('SNOWFLAKE_SESSION_MAX_AGE', '14400')),
+                        is_broken=is_session_expired,
+                    )
+        return self.pool
         
     def connect(self) -> bool:
         """
-        Establishes connection to Snowflake
+        Ensures a live Snowflake session is available
+        
+        Idempotent: pages call this on every rerun, and a session that is
+        already open and was verified recently is reused without a new
+        authentication handshake.
         Returns True if successful, False otherwise
         """
         try:
-            # Get credentials from environment or Streamlit secrets
-            if hasattr(st, 'secrets') and 'snowflake' in st.secrets:
-                config = st.secrets['snowflake']
-            else:
-                config = {
-                    'account': os.getenv('SNOWFLAKE_ACCOUNT'),
-                    'user': os.getenv('SNOWFLAKE_USER'),
-                    'password': os.getenv('SNOWFLAKE_PASSWORD'),
-                    'token': os.getenv('SNOWFLAKE_TOKEN'),
-                    'warehouse': os.getenv('SNOWFLAKE_WAREHOUSE', 'COMPUTE_WH'),
-                    'role': os.getenv('SNOWFLAKE_ROLE', 'ACCOUNTADMIN'),
-                }
-            
-            # Use PAT if available, otherwise password
-            if config.get('token'):
-                self.connection = snowflake.connector.connect(
-                    account=config['account'],
-                    user=config['user'],
-                    authenticator='oauth',
-                    token=config['token'],
-                    warehouse=config['warehouse'],
-                    role=config['role'],
-                )
-            else:
-                self.connection = snowflake.connector.connect(
-                    account=config['account'],
-                    user=config['user'],
-                    password=config['password'],
-                    warehouse=config['warehouse'],
-                    role=config['role'],
-                )
+            self._connect_calls += 1
+            pool = self._get_pool()
             
-            self.cursor = self.connection.cursor(DictCursor)
+            verify_interval = float(os.getenv('SNOWFLAKE_SESSION_VERIFY_INTERVAL', '60'))
+            recently_verified = time.monotonic() - self._last_verified < verify_interval
+            if recently_verified and pool.stats()['open'] > 0:
+                self._sessions_reused += 1
+                return True
+            
+            # Checkout health-checks idle sessions and replaces dead ones
+            pool.release(pool.acquire())
+            self._last_verified = time.monotonic()
+            
+            if self.backend == 'snowflake' and float(os.getenv('COST_HARVEST_INTERVAL', '0')) > 0:
+                self.cost_harvester().start()
             return True
             
         except Exception as e:
             st.error(f"Failed to connect to Snowflake: {str(e)}")
             return False
     
-    def execute_query(self, query: str, params: Optional[Dict] = None) -> pd.DataFrame:
+    def _tag_session(self, raw, feature: Optional[str] = None, caller: Optional[str] = None):
+        """
+        Sets QUERY_TAG on a checked-out connection for the statement about to run
+        
+        The tag comes from the active query trace; without one, from the
+        given caller location, or else it marks an internal statement
+        (cache polls, EXPLAIN, audit writes) named by feature.
+        """
+        if not self._query_tags:
+            return
+        trace = current_trace()
+        if trace is not None:
+            where = parse_caller(trace.caller)
+            tag = build_query_tag(where['page'], trace.feature or where['feature'], trace.session, trace.kind)
+        elif caller is not None:
+            where = parse_caller(caller)
+            tag = build_query_tag(where['page'], feature or where['feature'], current_session_id())
+        else:
+            tag = build_query_tag('system', feature or 'internal', 'none', 'system')
+        self._tagger.apply(raw, tag)
+    
+    def _run_query(self, query: str, params: Optional[Any] = None, feature: Optional[str] = None) -> pd.DataFrame:
+        """
+        Runs a query on a pooled connection with a dedicated cursor
+        
+        Unlike execute_query, errors are raised to the caller. A query that
+        fails because its session expired is retried once on a fresh session.
+        
+        Raises:
+            QueryLimitError: If the query breaches the active QueryLimits
+        """
+        limits = self.default_limits.override(active_limits())
+        for attempt in range(2):
+            try:
+                with self._get_pool().connection() as raw:
+                    self._tag_session(raw, feature)
+                    if limits.max_bytes is not None:
+                        self._check_scan_estimate(raw, query, params, limits.max_bytes)
+                    cursor = raw.cursor()
+                    try:
+                        start = time.perf_counter()
+                        self._execute_limited(cursor, query, params, limits)
+                        trace = current_trace()
+                        if trace is not None:
+                            trace.execute += time.perf_counter() - start
+                            trace.query_id = getattr(cursor, 'sfqid', None)
+                        return self._fetch_dataframe(cursor, limits.max_rows)
+                    finally:
+                        cursor.close()
+            except Exception as e:
+                if attempt == 0 and is_session_expired(e):
+                    self._sessions_reestablished += 1
+                    continue
+                raise
+    
+    def _execute_limited(self, cursor, query: str, params: Optional[Any], limits: QueryLimits):
+        """
+        Executes a statement on a cursor under the limits' timeout
+        
+        Raises:
+            QueryTimeoutError: If the statement was cancelled at its deadline
+        """
+        options = {'timeout': math.ceil(limits.timeout)} if limits.timeout else {}
+        start = time.perf_counter()
+        try:
+            if params:
+                cursor.execute(query, params, **options)
+            else:
+                cursor.execute(query, **options)
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            # A cancel that arrives at the deadline is ours, not a user's
+            if limits.timeout and is_cancelled(e) and elapsed >= limits.timeout * 0.9:
+                raise QueryTimeoutError(
+                    f"Query exceeded the {limits.timeout:g}s time limit and was cancelled",
+                    limit=limits.timeout, actual=elapsed, query=query,
+                ) from e
+            raise
+    
+    def _fetch_dataframe(self, cursor, max_rows: Optional[int] = None) -> pd.DataFrame:
+        """
+        Builds a DataFrame from an executed cursor
+        
+        Prefers the Arrow result path, which converts record batches straight
+        into typed columns (NUMBER becomes int64/float64 rather than Decimal
+        objects). Results Snowflake does not return as Arrow, such as SHOW
+        or DML statements, fall back to row-by-row fetching.
+        
+        Raises:
+            RowLimitError: If the result has more than max_rows rows
+        """
+        trace = current_trace()
+        start = time.perf_counter()
+        
+        # Snowflake reports the result size before anything is downloaded
+        total_rows = getattr(cursor, 'rowcount', None)
+        row_count_known = isinstance(total_rows, int) and total_rows >= 0
+        if max_rows is not None and row_count_known and total_rows > max_rows:
+            raise RowLimitError(
+                f"Query returned {total_rows:,} rows, more than the {max_rows:,} row limit",
+                limit=max_rows, actual=total_rows,
+            )
+        capped = max_rows is not None and not row_count_known
+        
+        if os.getenv('SNOWFLAKE_ARROW_FETCH', '1') != '0':
+            try:
+                table = self._fetch_arrow_capped(cursor, max_rows) if capped else cursor.fetch_arrow_all()
+                fetched = time.perf_counter()
+                if table is None:
+                    return pd.DataFrame()
+                frame = table.to_pandas(split_blocks=True)
+                if trace is not None:
+                    trace.fetch += fetched - start
+                    trace.build += time.perf_counter() - fetched
+                    trace.bytes = table.nbytes
+                return frame
+            except Exception as e:
+                if not is_arrow_unsupported(e):
+                    raise
+        
+        if capped:
+            results = cursor.fetchmany(max_rows + 1)
+            if len(results) > max_rows:
+                raise RowLimitError(
+                    f"Query returned more than the {max_rows:,} row limit",
+                    limit=max_rows, actual=None,
+                )
+        else:
+            results = cursor.fetchall()
+        fetched = time.perf_counter()
+        frame = pd.DataFrame()
+        if results:
+            columns = [column[0] for column in cursor.description]
+            frame = pd.DataFrame.from_records(results, columns=columns)
+        if trace is not None:
+            trace.fetch += fetched - start
+            trace.build += time.perf_counter() - fetched
+        return frame
+    
+    def _fetch_arrow_capped(self, cursor, max_rows: int):
+        """Fetches Arrow batches until the result is complete or exceeds max_rows"""
+        import pyarrow as pa
+        
+        batches = []
+        rows = 0
+        for batch in cursor.fetch_arrow_batches():
+            rows += batch.num_rows
+            if rows > max_rows:
+                raise RowLimitError(
+                    f"Query returned more than the {max_rows:,} row limit",
+                    limit=max_rows, actual=None,
+                )
+            batches.append(batch)
+        return pa.concat_tables(batches) if batches else None
+    
+    def _check_scan_estimate(self, raw, query: str, params: Optional[Any], max_bytes: int):
+        """
+        Refuses to start a query whose EXPLAIN estimate exceeds max_bytes
+        
+        Estimates are cached per query and parameters. The check fails open:
+        a statement that cannot be explained still runs under its timeout.
+        DuckDB plans carry no byte estimates, so the local backend skips it.
+        """
+        if self.backend != 'snowflake' or not EXPLAINABLE_PATTERN.match(query):
+            return
+        
+        def estimate() -> Optional[int]:
+            cursor = raw.cursor()
+            try:
+                if params:
+                    cursor.execute('EXPLAIN USING JSON ' + query, params)
+                else:
+                    cursor.execute('EXPLAIN USING JSON ' + query)
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+            return parse_scan_estimate(row[0]) if row else None
+        
+        try:
+            estimated = self._scan_estimates.get_or_estimate(self.cache_key(query, params), estimate)
+        except Exception as e:
+            print(f"Scan estimate failed: {str(e)}")
+            return
+        if estimated is not None and estimated > max_bytes:
+            raise ScanLimitError(
+                f"Query would scan about {format_bytes(estimated)}, "
+                f"above the {format_bytes(max_bytes)} limit",
+                limit=max_bytes, actual=estimated, query=query,
+            )
+    
+    def cache_key(self, query: str, params: Optional[Any] = None) -> str:
+        """Returns the result-cache key for a query under this connection's role and warehouse"""
+        if self._cache_scope is None:
+            if self.backend == 'duckdb':
+                self._cache_scope = ('LOCAL', 'DUCKDB')
+            else:
+                config = self._load_credentials()
+                self._cache_scope = (config.get('role'), config.get('warehouse'))
+        role, warehouse = self._cache_scope
+        return make_cache_key(query, params, role, warehouse)
+    
+    def _get_source_monitor(self) -> SourceChangeMonitor:
+        """Lazily creates the monitor that invalidates cached results on table changes"""
+        if self._source_monitor is None:
+            with self._monitor_lock:
+                if self._source_monitor is None:
+                    self._source_monitor = SourceChangeMonitor(
+                        fetch_versions=self._fetch_table_versions,
+                        on_change=get_result_cache().evict_outdated,
+                        poll_interval=float(os.getenv('RESULT_CACHE_SOURCE_POLL', '15')),
+                    )
+        return self._source_monitor
+    
+    def _fetch_table_versions(self, tables: List[str]) -> Dict[str, int]:
+        """Reads LAST_ALTERED for the given tables in one metadata query"""
+        df = self._run_query(build_last_altered_query(tables), feature='cache_invalidation')
+        return {row['TABLE_NAME']: int(row['VERSION']) for _, row in df.iterrows()}
+    
+    def _cached_query(
+        self,
+        query: str,
+        params: Optional[Any] = None,
+        ttl: Optional[float] = None,
+        refresh: bool = False
+    ) -> pd.DataFrame:
+        """
+        Serves a query from the result cache, running and storing it on a miss
+        
+        Results over known source tables are stamped with the tables'
+        LAST_ALTERED versions and kept until a table changes (bounded by
+        RESULT_CACHE_TRACKED_TTL); anything else falls back to the plain TTL.
+        With refresh=True the query always runs and replaces the cached entry.
+        """
+        result_cache = get_result_cache()
+        key = self.cache_key(query, params)
+        
+        tables = extract_source_tables(query)
+        sources = None
+        track_sources = self.backend == 'snowflake' and os.getenv('RESULT_CACHE_TRACK_SOURCES', '1') != '0'
+        if tables and track_sources:
+            # Polls (at most every few seconds) and evicts entries built on old data
+            with detached():
+                sources = self._get_source_monitor().versions(tables)
+            if ttl is None and not is_time_dependent(query) and len(sources) == len(tables):
+                ttl = float(os.getenv('RESULT_CACHE_TRACKED_TTL', str(7 * 24 * 3600)))
+        
+        trace = current_trace()
+        if not refresh:
+            frame = result_cache.get(key)
+            if frame is not None:
+                if trace is not None:
+                    trace.cache = 'hit'
+                return frame
+        if trace is not None:
+            trace.cache = 'miss'
+        
+        def load() -> pd.DataFrame:
+            fresh = self._run_query(query, params)
+            result_cache.put(key, fresh, ttl, sources=sources)
+            return fresh
+        
+        return self._coalesced_query(query, params, load)
+    
+    def _coalesced_query(
+        self,
+        query: str,
+        params: Optional[Any] = None,
+        load: Optional[Callable[[], pd.DataFrame]] = None
+    ) -> pd.DataFrame:
+        """
+        Runs a query, or waits for an identical one already in flight
+        
+        Identity is the normalized-SQL cache key plus the effective limits,
+        so formatting differences still coalesce but a caller never gets a
+        result (or a limit error) produced under another caller's limits.
+        Callers that joined another's execution get their own copy of the
+        result.
+        """
+        key = (self.cache_key(query, params), self.default_limits.override(active_limits()))
+        frame, shared = self._in_flight.do(key, load or (lambda: self._run_query(query, params)))
+        if shared:
+            trace = current_trace()
+            if trace is not None:
+                trace.cache = 'coalesced'
+            return frame.copy()
+        return frame
+    
+    def run_query(
+        self,
+        query: Union[str, tuple],
+        params: Optional[Any] = None,
+        cache: bool = False,
+        ttl: Optional[float] = None,
+        feature: Optional[str] = None,
+        limits: Optional[QueryLimits] = None
+    ) -> pd.DataFrame:
+        """
+        Executes a SQL query and returns results as DataFrame, raising on failure
+        
+        Takes the same arguments as execute_query and is traced and governed
+        the same way, but leaves reporting errors to the caller.
+        
+        Returns:
+            DataFrame with query results
+            
+        Raises:
+            QueryLimitError: If the query breaches the limits
+        """
+        if isinstance(query, tuple):
+            query, params = query[0], query[1]
+        
+        with self.metrics.trace(query, feature=feature, params=params) as trace, limit_scope(limits):
+            if cache:
+                frame = self._cached_query(query, params, ttl)
+            else:
+                frame = self._coalesced_query(query, params)
+            trace.finish(frame)
+            return frame
+    
+    def execute_query(
+        self,
+        query: Union[str, tuple],
+        params: Optional[Any] = None,
+        cache: bool = False,
+        ttl: Optional[float] = None,
+        feature: Optional[str] = None,
+        limits: Optional[QueryLimits] = None
+    ) -> pd.DataFrame:
         """
         Executes a SQL query and returns results as DataFrame
         
+        Args:
+            query: SQL query string, or a (SQL, params) tuple such as a BoundQuery
+            params: Optional values for the query's ? placeholders
+            cache: Serve from and store into the local result cache
+            ttl: Cache lifetime in seconds (defaults to RESULT_CACHE_TTL)
+            feature: Page section the query serves, for QUERY_TAG cost attribution
+            limits: Timeout, row and scan limits for this call (override the page's limit_scope)
+            
+        Returns:
+            DataFrame with query results, empty if the query failed
+        """
+        try:
+            return self.run_query(query, params, cache, ttl, feature, limits)
+        except QueryLimitError as e:
+            st.warning(f"Query stopped: {str(e)}")
+            return pd.DataFrame()
+        except Exception as e:
+            st.error(f"Query execution failed: {str(e)}")
+            return pd.DataFrame()
+    
+    def execute_query_swr(
+        self,
+        query: str,
+        max_age: float,
+        params: Optional[Any] = None,
+        ttl: Optional[float] = None,
+        feature: Optional[str] = None
+    ) -> Tuple[pd.DataFrame, float]:
+        """
+        Stale-while-revalidate read for dashboard tiles
+        
+        A cached result is returned immediately, however old. If it is older
+        than max_age a background refresh is started, so a later rerun sees
+        the new value. Only a cold cache blocks on the warehouse.
+        
         Args:
             query: SQL query string
+            max_age: Freshness budget in seconds
             params: Optional parameters for parameterized queries
+            ttl: Cache lifetime in seconds for the refreshed entry
+            feature: Page section the query serves, for QUERY_TAG cost attribution
             
         Returns:
-            DataFrame with query results
+            Tuple of (DataFrame, age of the data in seconds)
         """
-        try:
-            if not self.connection:
-                self.connect()
+        with self.metrics.trace(query, feature=feature, params=params) as trace:
+            key = self.cache_key(query, params)
+            found = get_result_cache().get_entry(key, allow_expired=True)
+            if found is not None:
+                frame, entry = found
+                age = max(time.time() - entry.created_at, 0.0)
+                trace.cache = 'hit'
+                if age > max_age:
+                    trace.cache = 'stale'
+                    self._refresh_in_background(key, query, params, ttl, trace.caller, trace.feature)
+                trace.finish(frame)
+                return frame, age
             
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
+            return self.execute_query(query, params, cache=True, ttl=ttl, feature=feature), 0.0
+    
+    def is_refreshing(self, query: str, params: Optional[Any] = None) -> bool:
+        """True while a background refresh of this query is running"""
+        with self._refresh_lock:
+            return self.cache_key(query, params) in self._refreshing
+    
+    def _refresh_in_background(
+        self,
+        key: str,
+        query: str,
+        params: Optional[Any],
+        ttl: Optional[float],
+        caller: str,
+        feature: Optional[str] = None
+    ):
+        """Schedules one cache refresh per key; repeat requests while it runs are ignored"""
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv('SNOWFLAKE_REFRESH_WORKERS', '2')),
+                    thread_name_prefix='snowflake-refresh'
+                )
+            executor = self._refresh_executor
+        limits = active_limits()
+        
+        def refresh():
+            try:
+                with self.metrics.trace(query, caller=f"{caller} [background refresh]", feature=feature, session="background", params=params) as trace, \
+                        limit_scope(limits):
+                    trace.finish(self._cached_query(query, params, ttl, refresh=True))
+            except Exception as e:
+                # The stale value keeps being served; the next read retries
+                print(f"Background refresh failed: {str(e)}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+        
+        executor.submit(refresh)
+    
+    def execute_many(
+        self,
+        queries: Dict[str, Union[str, tuple]],
+        max_workers: Optional[int] = None,
+        cache: bool = False,
+        ttl: Optional[float] = None,
+        limits: Optional[QueryLimits] = None,
+        caller: Optional[str] = None,
+        session: Optional[str] = None
+    ) -> Dict[str, QueryResult]:
+        """
+        Runs several independent queries in parallel on pooled connections
+        
+        Total latency is that of the slowest query rather than the sum of
+        all of them. A failing query does not affect the others: its error
+        is captured in its QueryResult instead of being raised.
+        
+        Args:
+            queries: Mapping of name to SQL string or (SQL, params) tuple
+            max_workers: Parallelism cap (defaults to the pool size)
+            cache: Serve from and store into the local result cache
+            ttl: Cache lifetime in seconds (defaults to RESULT_CACHE_TTL)
+            limits: Limits applied to each query (override the page's limit_scope)
+            caller: Code location for attribution (defaults to the calling page)
+            session: Session for attribution (defaults to the current Streamlit session)
+            
+        Returns:
+            Mapping of name to QueryResult, in the order the queries were given
+        """
+        if not queries:
+            return {}
+        
+        pool = self._get_pool()
+        workers = max_workers or min(len(queries), pool.max_size)
+        # Worker threads have no Streamlit context, so attribution is captured here
+        caller = caller or infer_caller()
+        session = session or current_session_id()
+        scope = limits if active_limits() is None else active_limits().override(limits)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='snowflake-query') as executor:
+            futures = {
+                name: executor.submit(self._timed_query, name, query, cache, ttl, f"{caller} [{name}]", session, scope)
+                for name, query in queries.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
+    
+    def _timed_query(
+        self,
+        name: str,
+        query: Union[str, tuple],
+        cache: bool = False,
+        ttl: Optional[float] = None,
+        caller: Optional[str] = None,
+        session: Optional[str] = None,
+        limits: Optional[QueryLimits] = None
+    ) -> QueryResult:
+        """Runs one execute_many entry, capturing timing and any error"""
+        sql, params = (query[0], query[1]) if isinstance(query, tuple) else (query, None)
+        start = time.perf_counter()
+        with self.metrics.trace(sql, caller=caller, feature=name, session=session, params=params) as trace, limit_scope(limits):
+            try:
+                if cache:
+                    data = self._cached_query(sql, params, ttl)
+                else:
+                    data = self._coalesced_query(sql, params)
+                trace.finish(data)
+                return QueryResult(name, data, time.perf_counter() - start)
+            except Exception as e:
+                trace.fail(e)
+                return QueryResult(name, pd.DataFrame(), time.perf_counter() - start, e)
+    
+    def execute_query_iter(
+        self,
+        query: str,
+        params: Optional[Any] = None,
+        chunk_size: int = 50_000,
+        as_arrow: bool = False,
+        limits: Optional[QueryLimits] = None
+    ) -> Iterator[QueryChunk]:
+        """
+        Streams a query result in fixed-size chunks
+        
+        Only one chunk is held in memory at a time, so results far larger
+        than RAM can be rendered, exported or aggregated incrementally. The
+        pooled connection stays checked out until the generator is exhausted
+        or closed. Errors are raised to the caller.
+        
+        The timeout and scan limits apply as for execute_query. Streaming
+        exists for results past the default row cap, so max_rows applies
+        only when it is set in limits for this call.
+        
+        Args:
+            query: SQL query string
+            params: Optional parameters for parameterized queries
+            chunk_size: Rows per chunk (the last chunk may be smaller)
+            as_arrow: Yield pyarrow Tables instead of DataFrames
+            limits: Timeout, row and scan limits for this call (override the page's limit_scope)
             
-            results = self.cursor.fetchall()
+        Yields:
+            QueryChunk with the data plus running row and byte counts
             
-            if results:
-                return pd.DataFrame(results)
-            else:
-                return pd.DataFrame()
+        Raises:
+            QueryLimitError: If the query breaches the limits
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        
+        # Read now: the generator body runs later, outside the caller's limit_scope
+        effective = self.default_limits.override(active_limits()).override(limits)
+        max_rows = limits.max_rows if limits is not None else None
+        return self._stream_query(query, params, chunk_size, as_arrow, effective, max_rows, infer_caller())
+    
+    def _stream_query(
+        self,
+        query: str,
+        params: Optional[Any],
+        chunk_size: int,
+        as_arrow: bool,
+        limits: QueryLimits,
+        max_rows: Optional[int],
+        caller: str
+    ) -> Iterator[QueryChunk]:
+        """Generator behind execute_query_iter"""
+        rows_so_far = 0
+        bytes_so_far = 0
+        with self._get_pool().connection() as raw:
+            self._tag_session(raw, caller=caller)
+            if limits.max_bytes is not None:
+                self._check_scan_estimate(raw, query, params, limits.max_bytes)
+            cursor = raw.cursor()
+            try:
+                self._execute_limited(cursor, query, params, limits)
                 
-        except Exception as e:
-            st.error(f"Query execution failed: {str(e)}")
-            return pd.DataFrame()
+                for index, chunk in enumerate(self._iter_chunks(cursor, chunk_size, as_arrow)):
+                    if as_arrow:
+                        row_count, nbytes = chunk.num_rows, chunk.nbytes
+                    else:
+                        row_count, nbytes = len(chunk), int(chunk.memory_usage(deep=True).sum())
+                    rows_so_far += row_count
+                    bytes_so_far += nbytes
+                    if max_rows is not None and rows_so_far > max_rows:
+                        raise RowLimitError(
+                            f"Query returned more than the {max_rows:,} row limit",
+                            limit=max_rows, actual=None, query=query,
+                        )
+                    yield QueryChunk(index, chunk, row_count, nbytes, rows_so_far, bytes_so_far)
+            finally:
+                cursor.close()
     
-    def execute_cortex_query(self, prompt: str, context: Optional[str] = None) -> str:
+    def _iter_chunks(self, cursor, chunk_size: int, as_arrow: bool) -> Iterator[Any]:
+        """Re-slices the cursor's result batches into chunks of chunk_size rows"""
+        import pyarrow as pa
+        
+        batches = None
+        if os.getenv('SNOWFLAKE_ARROW_FETCH', '1') != '0':
+            try:
+                batches = iter(cursor.fetch_arrow_batches())
+                first = next(batches, None)
+            except Exception as e:
+                if not is_arrow_unsupported(e):
+                    raise
+                batches = None
+        
+        if batches is not None:
+            # Server batch sizes vary, so buffer them and cut exact chunks
+            pending: List[Any] = [] if first is None else [first]
+            pending_rows = 0 if first is None else first.num_rows
+            for table in batches:
+                pending.append(table)
+                pending_rows += table.num_rows
+                while pending_rows >= chunk_size:
+                    combined = pa.concat_tables(pending)
+                    chunk, rest = combined.slice(0, chunk_size), combined.slice(chunk_size)
+                    yield chunk if as_arrow else chunk.to_pandas(split_blocks=True)
+                    pending, pending_rows = [rest], rest.num_rows
+            while pending_rows > 0:
+                combined = pa.concat_tables(pending)
+                chunk, rest = combined.slice(0, chunk_size), combined.slice(chunk_size)
+                yield chunk if as_arrow else chunk.to_pandas(split_blocks=True)
+                pending, pending_rows = [rest], rest.num_rows
+            return
+        
+        columns = [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            frame = pd.DataFrame.from_records(rows, columns=columns)
+            yield pa.Table.from_pandas(frame, preserve_index=False) if as_arrow else frame
+    
+    def submit_query(
+        self,
+        query: str,
+        params: Optional[Any] = None,
+        feature: Optional[str] = None
+    ) -> AsyncQueryHandle:
+        """
+        Submits a query without waiting for it to finish
+        
+        The active limits apply as for execute_query: the EXPLAIN scan check
+        runs before submission, the timeout is sent with the statement as
+        STATEMENT_TIMEOUT_IN_SECONDS so Snowflake cancels it itself once it
+        runs too long, and the handle applies max_rows when it fetches the
+        result.
+        
+        Args:
+            query: SQL query string
+            params: Optional parameters for parameterized queries
+            feature: Page section the query serves, for QUERY_TAG cost attribution
+            
+        Returns:
+            AsyncQueryHandle to poll, await, fetch or cancel the query
+            
+        Raises:
+            ScanLimitError: If the EXPLAIN estimate exceeds the active max_bytes
+        """
+        limits = self.default_limits.override(active_limits())
+        options = {}
+        if limits.timeout:
+            # The call returns before the statement ends, so a client-side
+            # timer cannot stop it; the local backend runs it synchronously
+            if self.backend == 'snowflake':
+                options['_statement_params'] = {'STATEMENT_TIMEOUT_IN_SECONDS': math.ceil(limits.timeout)}
+            else:
+                options['timeout'] = math.ceil(limits.timeout)
+        with self._get_pool().connection() as raw:
+            self._tag_session(raw, feature=feature, caller=infer_caller())
+            if limits.max_bytes is not None:
+                self._check_scan_estimate(raw, query, params, limits.max_bytes)
+            cursor = raw.cursor()
+            try:
+                if params:
+                    cursor.execute_async(query, params, **options)
+                else:
+                    cursor.execute_async(query, **options)
+                query_id = cursor.sfqid
+            finally:
+                cursor.close()
+        
+        return AsyncQueryHandle(self, query_id, query, limits.max_rows)
+    
+    def query_status(self, query_id: str) -> str:
+        """Returns the Snowflake QueryStatus name for a query id"""
+        with self._get_pool().connection() as raw:
+            return raw.get_query_status(query_id).name
+    
+    def fetch_query_result(self, query_id: str, max_rows: Optional[int] = None) -> pd.DataFrame:
+        """
+        Fetches the result of a finished query by its id
+        
+        Args:
+            query_id: Snowflake query id (sfqid)
+            max_rows: Raise RowLimitError past this many rows
+            
+        Raises:
+            ProgrammingError: If the query failed or was cancelled
+        """
+        with self._get_pool().connection() as raw:
+            raw.get_query_status_throw_if_error(query_id)
+            cursor = raw.cursor()
+            try:
+                cursor.get_results_from_sfqid(query_id)
+                return self._fetch_dataframe(cursor, max_rows)
+            finally:
+                cursor.close()
+    
+    def cancel_query(self, query_id: str):
+        """Asks Snowflake to abort a running query"""
+        if not QUERY_ID_PATTERN.match(query_id):
+            raise ValueError(f"Invalid query id: {query_id!r}")
+        
+        with self._get_pool().connection() as raw:
+            self._tag_session(raw, feature='cancel')
+            cursor = raw.cursor()
+            try:
+                cursor.execute(f"SELECT SYSTEM$CANCEL_QUERY('{query_id}')")
+            finally:
+                cursor.close()
+    
+    def execute_cortex_query(
+        self,
+        prompt: str,
+        context: Optional[str] = None,
+        feature: Optional[str] = None
+    ) -> str:
         """
         Executes a Snowflake Cortex AI query
         
         Args:
             prompt: The prompt for the AI model
             context: Optional context for the query
+            feature: Page section the call serves, for QUERY_TAG cost attribution
             
         Returns:
             AI-generated response
         """
+        model = os.getenv('CORTEX_MODEL', 'mistral-large')
+        
+        if context:
+            full_prompt = f"Context: {context}\n\nQuestion: {prompt}"
+        else:
+            full_prompt = prompt
+        
+        query = f"""
+        SELECT SNOWFLAKE.CORTEX.COMPLETE(
+            '{model}',
+            '{full_prompt}'
+        ) as response
+        """
+        
+        with self.metrics.trace(query, kind='cortex', feature=feature) as trace:
+            try:
+                result = self.execute_query(query)
+                
+                if not result.empty:
+                    return result.iloc[0]['RESPONSE']
+                else:
+                    return "No response generated"
+                    
+            except Exception as e:
+                trace.fail(e)
+                st.error(f"Cortex AI query failed: {str(e)}")
+                return f"Error: {str(e)}"
+    
+    def resume_warehouse(self) -> bool:
+        """
+        Resumes the session's warehouse if it is suspended
+        
+        A no-op when it is already running. Needs OPERATE on the warehouse;
+        without it the first real query resumes the warehouse instead.
+        The local backend has no warehouse and just runs a probe query.
+        
+        Returns:
+            True if the warehouse is running (or the probe succeeded)
+        """
+        if self.backend == 'duckdb':
+            statement = "SELECT 1"
+        else:
+            warehouse = self._load_credentials().get('warehouse') or ''
+            if not WAREHOUSE_NAME_PATTERN.match(warehouse):
+                return False
+            statement = f"ALTER WAREHOUSE IF EXISTS {warehouse} RESUME IF SUSPENDED"
         try:
-            model = os.getenv('CORTEX_MODEL', 'mistral-large')
-            
-            if context:
-                full_prompt = f"Context: {context}\n\nQuestion: {prompt}"
-            else:
-                full_prompt = prompt
-            
-            query = f"""
-            SELECT SNOWFLAKE.CORTEX.COMPLETE(
-                '{model}',
-                '{full_prompt}'
-            ) as response
-            """
+            with detached():
+                self._run_query(statement, feature='prewarm')
+            return True
+        except Exception as e:
+            print(f"Warehouse resume failed: {str(e)}")
+            return False
+    
+    def open_sessions(self, count: int) -> int:
+        """
+        Authenticates pooled sessions ahead of the queries that will need them
+        
+        Args:
+            count: Number of sessions to have open (capped at the pool size)
             
-            result = self.execute_query(query)
+        Returns:
+            Number of sessions newly opened
+        """
+        return self._get_pool().prefill(count)
+    
+    def explain_query(self, query: str, params: Optional[Any] = None) -> str:
+        """
+        Fetches the execution plan of a query without running it
+        
+        Args:
+            query: SQL query to explain
+            params: Values for the query's ? placeholders
             
-            if not result.empty:
-                return result.iloc[0]['RESPONSE']
-            else:
-                return "No response generated"
-                
-        except Exception as e:
-            st.error(f"Cortex AI query failed: {str(e)}")
-            return f"Error: {str(e)}"
+        Returns:
+            Plan as text
+        """
+        prefix = 'EXPLAIN ' if self.backend == 'duckdb' else 'EXPLAIN USING TEXT '
+        with detached():
+            plan = self._run_query(prefix + query.strip().rstrip(';'), params, feature='explain')
+        return '\n'.join(str(value) for row in plan.itertuples(index=False) for value in row)
     
     def get_aggregated_insights(
         self, 
@@ -197,6 +1144,40 @@ class SnowflakeConnection:
         else:
             return pd.DataFrame()
     
+    def _get_audit_logger(self) -> AuditLogger:
+        """Lazily starts the write-behind audit logger"""
+        if self._audit_logger is None:
+            with self._audit_lock:
+                if self._audit_logger is None:
+                    self._audit_logger = AuditLogger(
+                        write_batch=self._write_audit_batch,
+                        spool_path=Path(os.getenv('AUDIT_SPOOL_PATH', str(DEFAULT_SPOOL_PATH))),
+                        batch_size=int(os.getenv('AUDIT_BATCH_SIZE', '500')),
+                        flush_interval=float(os.getenv('AUDIT_FLUSH_INTERVAL', '2')),
+                    )
+        return self._audit_logger
+    
+    def _write_audit_batch(self, entries: List[Dict[str, Any]]):
+        """Inserts a batch of audit entries in one multi-row INSERT"""
+        audit_query = """
+        INSERT INTO SECURE_INSIGHTS_DB.AUDIT.QUERY_LOG
+        (timestamp, user_id, query_type, query_text, result_count)
+        VALUES (?, ?, ?, ?, ?)
+        """
+        rows = [
+            (e['timestamp'], e['user_id'], e['query_type'], e['query_text'], e['result_count'])
+            for e in entries
+        ]
+        with self._get_pool().connection() as raw:
+            self._tag_session(raw, feature='audit')
+            cursor = raw.cursor()
+            try:
+                # With qmark binding the whole batch goes to Snowflake as one array-bound INSERT
+                cursor.executemany(audit_query, rows)
+                raw.commit()
+            finally:
+                cursor.close()
+    
     def log_audit_trail(
         self, 
         user: str, 
@@ -207,6 +1188,9 @@ class SnowflakeConnection:
         """
         Logs query execution for audit purposes
         
+        The entry is spooled locally and inserted in the background with
+        other entries, so this never waits on Snowflake.
+        
         Args:
             user: User who executed the query
             query_type: Type of query executed
@@ -214,40 +1198,129 @@ class SnowflakeConnection:
             result_count: Number of results returned
         """
         try:
-            audit_query = """
-            INSERT INTO SECURE_INSIGHTS_DB.AUDIT.QUERY_LOG
-            (timestamp, user_id, query_type, query_text, result_count)
-            VALUES (CURRENT_TIMESTAMP(), ?, ?, ?, ?)
-            """
-            
-            self.cursor.execute(audit_query, (user, query_type, query, result_count))
-            self.connection.commit()
+            self._get_audit_logger().log({
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'user_id': user,
+                'query_type': query_type,
+                'query_text': query,
+                'result_count': result_count,
+            })
             
         except Exception as e:
             # Audit logging failure shouldn't break the app
             print(f"Audit logging failed: {str(e)}")
     
+    def audit_stats(self) -> Dict[str, Any]:
+        """Returns write-behind audit queue counters (backlog, batches, failures)"""
+        if self._audit_logger is None:
+            return {}
+        return self._audit_logger.stats()
+    
+    def connection_metrics(self) -> Dict[str, Any]:
+        """
+        Returns session reuse counters, connection ages and pool statistics
+        
+        Returns:
+            Dictionary of metrics; ages are in seconds
+        """
+        metrics: Dict[str, Any] = {
+            'connect_calls': self._connect_calls,
+            'sessions_reused': self._sessions_reused,
+            'sessions_reestablished': self._sessions_reestablished,
+            'coalesced_requests': self._in_flight.coalesced,
+        }
+        if self.pool is None:
+            return metrics
+        
+        ages = self.pool.connection_ages()
+        metrics.update(self.pool.stats())
+        metrics.update({
+            'oldest_session_age': ages[0] if ages else 0.0,
+            'newest_session_age': ages[-1] if ages else 0.0,
+            'mean_session_age': sum(ages) / len(ages) if ages else 0.0,
+        })
+        return metrics
+    
+    def cost_harvester(self) -> CostHarvester:
+        """Returns the QUERY_HISTORY cost harvester, creating it on first use"""
+        if self._cost_harvester is None:
+            with self._harvester_lock:
+                if self._cost_harvester is None:
+                    self._cost_harvester = CostHarvester(
+                        fetch_fn=lambda sql: self._run_query(sql, feature='cost_harvest'),
+                        db_path=Path(os.getenv('COST_DB_PATH', str(DEFAULT_COST_DB_PATH))),
+                        interval=float(os.getenv('COST_HARVEST_INTERVAL', '0')) or 3600.0,
+                        use_attribution=os.getenv('COST_USE_ATTRIBUTION', '1') != '0',
+                    )
+        return self._cost_harvester
+    
+    def cost_report(self, days: float = 7.0, limit: int = 20) -> pd.DataFrame:
+        """
+        Ranks app pages and features by warehouse credits spent
+        
+        Reads the local store filled by the cost harvester; run
+        ``python -m utils.cost_harvester`` (or set COST_HARVEST_INTERVAL)
+        to keep it current.
+        """
+        return self.cost_harvester().report(days=days, limit=limit)
+    
+    def server_cache_stats(self, days: float = 7.0) -> Dict[str, Any]:
+        """Returns how often Snowflake answered app SELECTs from its 24h result cache"""
+        return self.cost_harvester().reuse_summary(days=days)
+    
+    def query_stats(self, limit: int = 20) -> Dict[str, Any]:
+        """Returns per-fingerprint totals and the most recent query traces"""
+        return {
+            'query_tags': self._tagger.stats(),
+            'limits': {
+                'default': asdict(self.default_limits),
+                'scan_estimate_hits': self._scan_estimates.hits,
+                'scan_estimate_misses': self._scan_estimates.misses,
+            },
+            'slow_threshold': self.metrics.slow_threshold,
+            'slow_log': str(self.metrics.log_path),
+            'by_fingerprint': self.metrics.summary(limit),
+            'recent': self.metrics.recent(limit),
+        }
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Returns hit/miss/eviction counters for the local result cache"""
+        stats = get_result_cache().stats()
+        if self._source_monitor is not None:
+            stats.update(self._source_monitor.stats())
+        return stats
+    
     def close(self):
-        """Closes the database connection"""
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
+        """Closes all pooled database connections"""
+        if self._cost_harvester is not None:
+            self._cost_harvester.stop()
+        if self._refresh_executor is not None:
+            self._refresh_executor.shutdown(wait=False)
+            self._refresh_executor = None
+        if self._audit_logger is not None:
+            # Whatever is not written now stays in the spool for the next start
+            self._audit_logger.close()
+            self._audit_logger = None
+        if self.pool:
+            self.pool.close()
+            self.pool = None
 
-# Singleton instance
+# Shared instance - the pool inside makes it safe across sessions
 _connection = None
+_connection_lock = threading.Lock()
 
 def get_connection() -> SnowflakeConnection:
-    """Returns a singleton Snowflake connection"""
+    """Returns the shared, pool-backed Snowflake connection"""
     global _connection
     if _connection is None:
-        _connection = SnowflakeConnection()
+        with _connection_lock:
+            if _connection is None:
+                _connection = SnowflakeConnection()
     return _connection
 
-@st.cache_data(ttl=3600)
 def get_cached_query(_conn: SnowflakeConnection, query: str) -> pd.DataFrame:
     """
     Cached query execution for frequently accessed data
-    Note: _conn parameter starts with _ to prevent hashing
+    Kept for existing callers; equivalent to execute_query(query, cache=True)
     """
-    return _conn.execute_query(query)
+    return _conn.execute_query(query, cache=True)
@@ -0,0 +1,196 @@
+"""
+Speculative Query Utility
+Runs the closest template query while Cortex writes SQL, keeping whichever answer wins
+"""
+
+import time
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple, Union
+
+import pandas as pd
+
+from .async_query import AsyncQueryHandle
+from .query_builder import BoundQuery
+from .query_limits import QueryLimits, limit_scope
+
+
+class SpeculativeOutcome(NamedTuple):
+    """Result of a speculative run"""
+    source: str                       # 'ai' or 'template'
+    query: Union[str, BoundQuery]     # Query whose result is returned
+    data: pd.DataFrame
+    generated_sql: Optional[str]      # AI SQL, when Cortex produced usable SQL
+    ai_error: Optional[str]           # Why the AI answer was not used
+    generation_time: Optional[float]  # Seconds Cortex took, if it finished
+    provisional_shown: bool
+    cancelled: Tuple[str, ...]        # Branches aborted on the warehouse ('template', 'ai')
+
+
+class SpeculativeQuery:
+    """
+    Takes Cortex latency off the critical path of a natural language question
+
+    Both branches are submitted asynchronously at once:
+
+    - template: the closest QueryBuilder template for the question
+    - ai: the CORTEX.COMPLETE call that writes SQL for the exact question
+
+    The template result is handed to ``on_provisional`` as soon as it lands.
+    When Cortex answers, its SQL is prepared and validated, then run under
+    the page's limits. If that returns rows it replaces the template result,
+    and a template query still running is cancelled. If the SQL is unusable,
+    fails or returns nothing, the template result stands. A Cortex call that
+    outlives ``patience`` is cancelled and the template result is kept.
+    """
+
+    def __init__(
+        self,
+        conn: Any,
+        template: BoundQuery,
+        generation_query: str,
+        limits: Optional[QueryLimits] = None,
+        patience: float = 60.0,
+        poll_interval: float = 0.1,
+        min_template_wait: float = 5.0
+    ):
+        """
+        Args:
+            conn: SnowflakeConnection both branches run on
+            template: Template query answering the question approximately
+            generation_query: CORTEX.COMPLETE statement returning GENERATED_SQL
+            limits: Limits for the template and AI queries
+            patience: Seconds to wait for Cortex before keeping the template answer
+            poll_interval: Initial delay between status polls; backs off to 1s
+            min_template_wait: Seconds the template is still awaited when the
+                AI branch has used up the time limit, so the fallback has an answer
+        """
+        self.conn = conn
+        self.template = template
+        self.generation_query = generation_query
+        self.limits = limits or QueryLimits()
+        self.patience = patience
+        self.poll_interval = poll_interval
+        self.min_template_wait = min_template_wait
+
+    def run(
+        self,
+        prepare: Callable[[str], str],
+        on_provisional: Optional[Callable[[pd.DataFrame], None]] = None,
+        feature: str = 'nl_query_results'
+    ) -> SpeculativeOutcome:
+        """
+        Runs both branches and returns the winning answer
+
+        Args:
+            prepare: Turns the Cortex response into SQL; raises ValueError
+                for SQL that must not run
+            on_provisional: Called with the template result while Cortex is
+                still working (not called if Cortex finishes first)
+            feature: Page section the AI query serves, for cost attribution
+
+        Returns:
+            SpeculativeOutcome with the answer to show
+        """
+        start = time.perf_counter()
+        with limit_scope(self.limits):
+            template = self.conn.submit_query(
+                self.template.sql, self.template.params or None, feature='nl_speculative_template'
+            )
+            generation = self.conn.submit_query(self.generation_query, feature='nl_query_generation')
+
+        template_data: Optional[pd.DataFrame] = None
+        provisional_shown = False
+        cancelled: List[str] = []
+
+        def show_template_if_ready():
+            nonlocal template_data, provisional_shown
+            if template_data is None and template.done():
+                template_data = self._fetch(template)
+                if on_provisional is not None and not template_data.empty:
+                    on_provisional(template_data)
+                    provisional_shown = True
+
+        # Wait for Cortex, showing the template answer as soon as it lands
+        delay = self.poll_interval
+        while not generation.done():
+            show_template_if_ready()
+            if time.perf_counter() - start > self.patience:
+                if generation.cancel():
+                    cancelled.append('ai')
+                break
+            time.sleep(delay)
+            delay = min(delay * 1.5, 1.0)
+
+        generated_sql, ai_error, generation_time = None, None, None
+        if 'ai' in cancelled:
+            ai_error = f"AI did not answer within {self.patience:g}s"
+        else:
+            generation_time = time.perf_counter() - start
+            try:
+                response = self.conn.fetch_query_result(generation.query_id)
+                if response.empty:
+                    raise ValueError("Cortex AI returned empty result")
+                generated_sql = prepare(response.iloc[0]['GENERATED_SQL'])
+            except Exception as e:
+                ai_error = str(e)
+
+        if generated_sql is not None:
+            show_template_if_ready()
+            ai_data = self._run_ai_query(generated_sql, feature)
+            if isinstance(ai_data, Exception):
+                ai_error = f"AI query failed: {str(ai_data)}"
+            elif not ai_data.empty:
+                # The AI answer wins; stop the template if it is still running
+                if template_data is None and self._cancel(template):
+                    cancelled.append('template')
+                return SpeculativeOutcome(
+                    'ai', generated_sql, ai_data, generated_sql, None,
+                    generation_time, provisional_shown, tuple(cancelled)
+                )
+            else:
+                ai_error = "AI query returned no data"
+
+        if template_data is None:
+            remaining = None
+            if self.limits.timeout:
+                remaining = max(self.limits.timeout - (time.perf_counter() - start), self.min_template_wait)
+            template_data = self._fetch(template, timeout=remaining)
+        return SpeculativeOutcome(
+            'template', self.template, template_data, generated_sql, ai_error,
+            generation_time, provisional_shown, tuple(cancelled)
+        )
+
+    def _run_ai_query(self, sql: str, feature: str) -> Union[pd.DataFrame, Exception]:
+        """
+        Runs the generated SQL under the limits, returning the error instead of raising
+
+        Uses the raising run_query rather than execute_query, which would
+        show its own error banner even though the template answer is served
+        instead.
+        """
+        try:
+            return self.conn.run_query(sql, feature=feature, limits=self.limits)
+        except Exception as e:
+            return e
+
+    def _fetch(self, handle: AsyncQueryHandle, timeout: Optional[float] = None) -> pd.DataFrame:
+        """Waits for a branch and fetches its rows; an empty DataFrame if it failed"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        delay = self.poll_interval
+        try:
+            while not handle.done():
+                if deadline is not None and time.perf_counter() > deadline:
+                    self._cancel(handle)
+                    return pd.DataFrame()
+                time.sleep(delay)
+                delay = min(delay * 1.5, 1.0)
+            return self.conn.fetch_query_result(handle.query_id, self.limits.max_rows)
+        except Exception as e:
+            print(f"Speculative template query failed: {str(e)}")
+            return pd.DataFrame()
+
+    def _cancel(self, handle: AsyncQueryHandle) -> bool:
+        try:
+            return handle.cancel()
+        except Exception as e:
+            print(f"Failed to cancel query {handle.query_id}: {str(e)}")
+            return False
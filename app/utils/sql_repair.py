@@ -0,0 +1,314 @@
+"""
+SQL Repair Utility
+Parses generated SQL once, fixes common model mistakes and enforces the privacy rules
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+
+from .query_builder import FORBIDDEN_COLUMN_PATTERNS, RISK_SOURCES
+
+# Columns of each risk table, as described to the model in nl_sql.NL_SQL_PROMPT
+RISK_TABLE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    'BANK_DB.RISK.CUSTOMER_RISK_SCORES': (
+        'customer_id', 'age', 'zip_code', 'credit_score', 'default_flag', 'transaction_count',
+        'avg_transaction_amount', 'account_open_date', 'last_activity_date',
+    ),
+    'INSURANCE_DB.RISK.CLAIM_RISK_SCORES': (
+        'policy_holder_id', 'age', 'zip_code', 'claim_frequency', 'total_claim_amount',
+        'fraud_indicator', 'policy_start_date', 'last_claim_date',
+    ),
+    'RETAIL_DB.RISK.CUSTOMER_RISK_SCORES': (
+        'customer_id', 'age', 'zip_code', 'return_rate', 'total_purchase_amount',
+        'high_value_returns_flag', 'first_purchase_date', 'last_purchase_date',
+    ),
+}
+
+# Schemas whose views already enforce the minimum group size
+AGGREGATED_SCHEMAS = ('CLEANROOM_DB.AGGREGATED_VIEWS',)
+
+# Aggregates that summarize a group without returning any row's own value
+_SUMMARY_AGGREGATES = (exp.Count, exp.CountIf, exp.Sum, exp.Avg)
+
+# Aggregates that return one row's value; allowed only over non-identifier columns
+_VALUE_AGGREGATES = (exp.Min, exp.Max)
+
+# String flag values the model writes for the INTEGER 0/1 flag columns
+_FLAG_LITERALS = {'Y': 1, 'YES': 1, 'TRUE': 1, 'N': 0, 'NO': 0, 'FALSE': 0}
+
+
+class SqlRepairError(ValueError):
+    """Raised for generated SQL that cannot be parsed or must not run"""
+
+
+@dataclass(frozen=True)
+class RepairRules:
+    """Lookup tables the repair passes need, built once per aggregation size"""
+    table_flags: Dict[str, str]             # Upper-case table name -> its fraud flag column
+    flag_columns: FrozenSet[str]
+    known_columns: FrozenSet[str]
+    known_tables: Dict[str, Tuple[str, ...]]  # Upper-case table name -> (catalog, db, table)
+    forbidden: Tuple[Tuple[str, str], ...]
+    identifier_columns: FrozenSet[str]
+    aggregated_schemas: FrozenSet[str]
+    min_agg_size: int
+    min_group_condition: exp.Expression     # COUNT(*) >= min_agg_size, copied per use
+
+
+@lru_cache(maxsize=8)
+def compile_rules(min_agg_size: int = 50) -> RepairRules:
+    """
+    Builds the repair rule set for one minimum aggregation size
+
+    Args:
+        min_agg_size: Smallest group a query may return
+
+    Returns:
+        RepairRules, shared by every repair using the same size
+    """
+    return RepairRules(
+        table_flags={source.table.upper(): source.fraud_flag for source in RISK_SOURCES.values()},
+        flag_columns=frozenset(source.fraud_flag for source in RISK_SOURCES.values()),
+        known_columns=frozenset(column for columns in RISK_TABLE_COLUMNS.values() for column in columns),
+        known_tables={table.upper(): tuple(table.upper().split('.')) for table in RISK_TABLE_COLUMNS},
+        forbidden=tuple(FORBIDDEN_COLUMN_PATTERNS),
+        identifier_columns=frozenset(
+            column for columns in RISK_TABLE_COLUMNS.values() for column in columns if column.endswith('_id')
+        ),
+        aggregated_schemas=frozenset(AGGREGATED_SCHEMAS),
+        min_agg_size=min_agg_size,
+        min_group_condition=exp.GTE(this=exp.Count(this=exp.Star()), expression=exp.Literal.number(min_agg_size)),
+    )
+
+@lru_cache(maxsize=256)
+def repair_sql(sql: str, min_agg_size: int = 50) -> str:
+    """
+    Repairs generated SQL and checks it against the privacy rules
+
+    The SQL is parsed once with the Snowflake dialect and every pass works
+    on that tree:
+
+    - known column and table names lose their quotes and get one case
+    - 'Y'/'N' compared with a column becomes 1/0
+    - a SELECT from one risk table reading another table's fraud flag
+      reads its own flag instead, keeping the name the rest of the query uses
+    - SUBSTR/LEFT on zip_code casts it to VARCHAR first
+    - HAVING on a UNION ALL branch that has no GROUP BY is dropped
+    - aggregates are limited to COUNT, COUNT_IF, SUM and AVG, plus MIN and
+      MAX over columns that do not identify a person; collecting aggregates
+      such as ARRAY_AGG or LISTAGG would return row-level values
+    - the statement must be a query reading no forbidden column, and its
+      result, like every subquery used in an expression, must come from
+      aggregates; every aggregate over row-level data gets
+      HAVING COUNT(*) >= min_agg_size unless it already has one
+
+    Repairs are cached, so asking again for the same SQL costs a dict lookup.
+
+    Args:
+        sql: SQL extracted from the model response
+        min_agg_size: Smallest group a query may return
+
+    Returns:
+        Repaired Snowflake SQL
+
+    Raises:
+        SqlRepairError: If the text is not a query or breaks a privacy rule
+    """
+    rules = compile_rules(min_agg_size)
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read='snowflake') if statement is not None]
+    except sqlglot.errors.ParseError as e:
+        raise SqlRepairError(f"AI response is not valid SQL: {str(e).splitlines()[0]}") from e
+    if len(statements) != 1:
+        raise SqlRepairError(f"AI response must be one SQL statement, got {len(statements)}")
+    tree = statements[0]
+    if not isinstance(tree, exp.Query):
+        raise SqlRepairError(f"Only SELECT queries can be run, got {tree.key.upper()}")
+
+    for column in tree.find_all(exp.Column):
+        name = column.name
+        for pattern, error in rules.forbidden:
+            if pattern in name.upper():
+                raise SqlRepairError(error)
+        if name.lower() in rules.known_columns:
+            column.set('this', exp.to_identifier(name.lower()))
+
+    for table in tree.find_all(exp.Table):
+        parts = rules.known_tables.get('.'.join(part.name for part in table.parts).upper())
+        if parts:
+            catalog, db, name = parts
+            table.set('catalog', exp.to_identifier(catalog))
+            table.set('db', exp.to_identifier(db))
+            table.set('this', exp.to_identifier(name))
+
+    for function in tree.find_all(exp.AggFunc):
+        _check_aggregate(function, rules)
+
+    for comparison in list(tree.find_all(exp.EQ, exp.NEQ)):
+        column, literal = comparison.this, comparison.expression
+        if isinstance(literal, exp.Column):
+            column, literal = literal, column
+        if (
+            isinstance(column, exp.Column) and isinstance(literal, exp.Literal) and literal.is_string
+            and literal.this.upper() in _FLAG_LITERALS
+        ):
+            literal.replace(exp.Literal.number(_FLAG_LITERALS[literal.this.upper()]))
+
+    for select in list(tree.find_all(exp.Select)):
+        _fix_flag_columns(select, rules)
+
+    for function in list(tree.find_all(exp.Substring, exp.Left)):
+        target = function.this
+        if isinstance(target, exp.Column) and target.name == 'zip_code':
+            target.replace(exp.Cast(this=target.copy(), to=exp.DataType.build('VARCHAR')))
+
+    for select in list(tree.find_all(exp.Select)):
+        if (
+            isinstance(select.parent, exp.Union) and select.args.get('having')
+            and not select.args.get('group')
+        ):
+            select.set('having', None)
+
+    ctes = {cte.alias_or_name.lower(): cte.this for cte in tree.find_all(exp.CTE)}
+    seen: Dict[int, bool] = {}
+    if not _enforce_aggregation(tree, ctes, rules, seen):
+        raise SqlRepairError(
+            f"Query must return aggregated results (GROUP BY ... HAVING COUNT(*) >= {rules.min_agg_size})"
+        )
+    # Subqueries in the select list, WHERE, HAVING... reach the result without
+    # passing through a FROM clause, so each must be aggregated on its own
+    for subquery in list(_expression_subqueries(tree)):
+        if not _enforce_aggregation(subquery, ctes, rules, seen):
+            raise SqlRepairError(
+                f"Subqueries must return aggregated results (HAVING COUNT(*) >= {rules.min_agg_size})"
+            )
+
+    return tree.sql(dialect='snowflake', pretty=True)
+
+
+def _from_tables(select: exp.Select) -> List[exp.Expression]:
+    """Sources in a SELECT's FROM and JOIN clauses"""
+    sources = [value.this for value in select.args.values() if isinstance(value, exp.From)]
+    sources.extend(join.this for join in select.args.get('joins') or [])
+    return sources
+
+def _expression_subqueries(tree: exp.Expression) -> List[exp.Expression]:
+    """Queries nested in expressions rather than used as FROM/JOIN sources or CTE bodies"""
+    subqueries = []
+    for select in tree.find_all(exp.Select):
+        node = select
+        while isinstance(node.parent, (exp.Subquery, exp.SetOperation)):
+            node = node.parent
+        if node.parent is not None and not isinstance(node.parent, (exp.From, exp.Join, exp.CTE)):
+            if all(node is not other for other in subqueries):
+                subqueries.append(node)
+    return subqueries
+
+def _fix_flag_columns(select: exp.Expression, rules: RepairRules):
+    """Points fraud flag references at the flag of the one risk table a SELECT reads"""
+    sources = _from_tables(select)
+    if len(sources) != 1 or not isinstance(sources[0], exp.Table):
+        return
+    own_flag = rules.table_flags.get('.'.join(part.name for part in sources[0].parts).upper())
+    if own_flag is None:
+        return
+    for column in list(select.find_all(exp.Column)):
+        if column.find_ancestor(exp.Select) is not select:
+            continue
+        name = column.name
+        if name in rules.flag_columns and name != own_flag:
+            column.set('this', exp.to_identifier(own_flag))
+            if column.parent is select:
+                # Keep the output name so the rest of the query still finds it
+                column.replace(exp.alias_(column.copy(), name))
+
+def _is_identifier_column(name: str, rules: RepairRules) -> bool:
+    """True for columns that identify a person or record, e.g. customer_id"""
+    name = name.lower()
+    return name in rules.identifier_columns or name == 'id' or name.endswith(('_id', '_hash'))
+
+def _check_aggregate(function: exp.AggFunc, rules: RepairRules):
+    """Rejects aggregates that can return row-level values"""
+    name = function.sql(dialect='snowflake').split('(', 1)[0]
+    if isinstance(function, _SUMMARY_AGGREGATES):
+        return
+    if isinstance(function, _VALUE_AGGREGATES):
+        if any(_is_identifier_column(column.name, rules) for column in function.find_all(exp.Column)):
+            raise SqlRepairError(f"{name} cannot be applied to identifier columns")
+        return
+    raise SqlRepairError(f"{name} is not allowed; use COUNT, SUM, AVG, MIN or MAX")
+
+def _is_aggregate(select: exp.Expression) -> bool:
+    """True if the SELECT aggregates and reads columns only inside aggregates (not windows)"""
+    aggregates = [
+        function for function in select.find_all(exp.AggFunc)
+        if function.find_ancestor(exp.Window) is None and function.find_ancestor(exp.Select) is select
+    ]
+    if not aggregates:
+        return False
+    for projection in select.selects:
+        for column in projection.find_all(exp.Column):
+            if not any(column.find_ancestor(exp.AggFunc) is function for function in aggregates):
+                return False
+    return True
+
+def _has_min_group_size(having: Optional[exp.Expression], min_agg_size: int) -> bool:
+    """True if a HAVING clause already requires COUNT(...) >= min_agg_size"""
+    if having is None:
+        return False
+    for comparison in having.find_all(exp.GTE, exp.GT):
+        count, bound = comparison.this, comparison.expression
+        if isinstance(count, exp.Count) and isinstance(bound, exp.Literal) and bound.is_int:
+            minimum = int(bound.this) + (1 if isinstance(comparison, exp.GT) else 0)
+            if minimum >= min_agg_size:
+                return True
+    return False
+
+def _enforce_aggregation(query: exp.Expression, ctes: Dict[str, exp.Expression], rules: RepairRules, seen: Dict[int, bool]) -> bool:
+    """
+    Checks that a query returns only aggregates and adds missing minimum group sizes
+
+    A SELECT is aggregated if it reads only aggregated CTEs, subqueries or
+    clean room views, or if it groups or aggregates itself; in the latter
+    case it gets the minimum group size as a HAVING guard, with or without
+    GROUP BY. Each CTE is checked once.
+    """
+    if id(query) in seen:
+        return seen[id(query)]
+    if isinstance(query, exp.Subquery):
+        result = _enforce_aggregation(query.this, ctes, rules, seen)
+    elif isinstance(query, exp.SetOperation):
+        result = all([
+            _enforce_aggregation(query.left, ctes, rules, seen),
+            _enforce_aggregation(query.right, ctes, rules, seen),
+        ])
+    elif isinstance(query, exp.Select):
+        sources = _from_tables(query)
+        if sources and all(_source_aggregated(source, ctes, rules, seen) for source in sources):
+            result = True
+        elif query.args.get('group') or _is_aggregate(query):
+            # Grouped or not, an aggregate over row-level data must cover enough
+            # rows; without GROUP BY the guard drops a result narrowed to a few rows
+            if not _has_min_group_size(query.args.get('having'), rules.min_agg_size):
+                query.having(rules.min_group_condition.copy(), copy=False)
+            result = True
+        else:
+            result = False
+    else:
+        result = False
+    seen[id(query)] = result
+    return result
+
+def _source_aggregated(source: exp.Expression, ctes: Dict[str, exp.Expression], rules: RepairRules, seen: Dict[int, bool]) -> bool:
+    """True if a FROM/JOIN source only holds aggregated rows"""
+    if isinstance(source, exp.Subquery):
+        return _enforce_aggregation(source, ctes, rules, seen)
+    if not isinstance(source, exp.Table):
+        return False
+    if not source.args.get('db') and source.name.lower() in ctes:
+        return _enforce_aggregation(ctes[source.name.lower()], ctes, rules, seen)
+    return f"{source.catalog}.{source.db}".upper() in rules.aggregated_schemas
@@ -0,0 +1,244 @@
+"""
+Startup Profiler Utility
+Measures import and first-render time of every page, in-app and from the command line
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+APP_DIR = Path(__file__).parent.parent
+
+# Lines of ``python -X importtime``: self and cumulative microseconds, then the indented module name
+_IMPORTTIME_PATTERN = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+# Markers the CLI child process prints around its JSON result
+_RESULT_MARKER = '@@startup-profile@@'
+
+
+class PageTimer:
+    """
+    Times one run of a page script
+
+    Created at the top of the script, before its imports. mark() closes a
+    stage (e.g. 'imports'); finish() closes the 'render' stage and records
+    the run. Modules first imported during the run are counted, so a page
+    that pulls in a heavy dependency shows up even when its time is small.
+    """
+
+    def __init__(self, page: str, profiler: 'StartupProfiler'):
+        self.page = page
+        self._profiler = profiler
+        self._start = time.perf_counter()
+        self._last = self._start
+        self._modules_before = len(sys.modules)
+        self.stages: Dict[str, float] = {}
+
+    def mark(self, stage: str):
+        """Records the time since the previous mark as ``stage``"""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def finish(self):
+        """Records the rest of the run as 'render' and reports the run"""
+        self.mark('render')
+        self._profiler.record(
+            self.page,
+            self.stages,
+            total=self._last - self._start,
+            modules_loaded=len(sys.modules) - self._modules_before,
+        )
+
+
+class StartupProfiler:
+    """
+    Collects page timings per process
+
+    Keeps the process's first run of each page (the cold start: modules
+    imported, caches empty), the first run of each session, and running
+    totals over all runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages: Dict[str, Dict[str, Any]] = {}
+        self._sessions_seen: Dict[str, set] = {}
+
+    def page(self, page: str) -> PageTimer:
+        """Starts timing a run of ``page``"""
+        return PageTimer(page, self)
+
+    def record(self, page: str, stages: Dict[str, float], total: float, modules_loaded: int):
+        """Adds one finished page run"""
+        from .query_tags import current_session_id
+
+        session = current_session_id()
+        run = {'total': total, 'modules_loaded': modules_loaded, **stages}
+        with self._lock:
+            entry = self._pages.setdefault(page, {
+                'page': page,
+                'runs': 0,
+                'total_time': 0.0,
+                'cold': run,
+                'session_first': [],
+            })
+            entry['runs'] += 1
+            entry['total_time'] += total
+            seen = self._sessions_seen.setdefault(page, set())
+            if session not in seen:
+                seen.add(session)
+                entry['session_first'].append(total)
+
+    def report(self) -> List[Dict[str, Any]]:
+        """
+        Returns one row per page
+
+        Returns:
+            Rows with the cold run's imports, render and total seconds (and
+            any other marked stages), modules it loaded, mean first render per
+            session and mean run time
+        """
+        with self._lock:
+            entries = [dict(entry) for entry in self._pages.values()]
+        rows = []
+        for entry in entries:
+            cold = entry['cold']
+            firsts = entry['session_first']
+            rows.append({
+                'page': entry['page'],
+                'cold_imports': cold.get('imports'),
+                'cold_render': cold.get('render'),
+                'cold_total': cold['total'],
+                'cold_modules_loaded': cold['modules_loaded'],
+                'cold_stages': {
+                    stage: seconds for stage, seconds in cold.items()
+                    if stage not in ('total', 'modules_loaded')
+                },
+                'session_first_render': sum(firsts) / len(firsts) if firsts else None,
+                'mean_run': entry['total_time'] / entry['runs'],
+                'runs': entry['runs'],
+            })
+        return sorted(rows, key=lambda row: row['cold_total'], reverse=True)
+
+
+_profiler = StartupProfiler()
+
+def page_timer(page: str) -> PageTimer:
+    """
+    Starts timing the current run of a page
+
+    Call it first thing in the script; imports made before the call are
+    not attributed to the page.
+    """
+    return _profiler.page(page)
+
+def get_startup_profiler() -> StartupProfiler:
+    """Returns the process-wide profiler"""
+    return _profiler
+
+
+def parse_importtime(stderr: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Ranks the top-level imports from ``python -X importtime`` output
+
+    Args:
+        stderr: Captured stderr of the profiled process
+        limit: Number of modules to return
+
+    Returns:
+        Modules imported directly by the process, slowest cumulative time first
+    """
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_PATTERN.match(line)
+        if match and len(match.group(3)) == 1:
+            modules.append({'module': match.group(4), 'seconds': int(match.group(2)) / 1e6})
+    return sorted(modules, key=lambda module: module['seconds'], reverse=True)[:limit]
+
+def list_pages() -> List[Path]:
+    """Returns the entry page and every page under pages/"""
+    return [APP_DIR / "Home.py"] + sorted((APP_DIR / "pages").glob("*.py"))
+
+def profile_page_cold(page: Path, timeout: float = 300.0) -> Dict[str, Any]:
+    """
+    Runs one page in a fresh interpreter, as a newly started replica would
+
+    Streamlit is imported before the clock starts (the server has it loaded
+    before any page runs). The page then runs once through Streamlit's
+    AppTest harness with ``-X importtime`` enabled.
+
+    Returns:
+        The page's report row plus 'streamlit_import', 'top_imports' and 'error'
+    """
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "streamlit_import = time.perf_counter() - start\n"
+        f"sys.path.insert(0, {str(APP_DIR)!r})\n"
+        "from utils.startup_profiler import get_startup_profiler\n"
+        f"sys.stderr.write({_RESULT_MARKER!r} + '\\n')\n"
+        f"at = AppTest.from_file({str(page)!r}, default_timeout={timeout!r}).run()\n"
+        "rows = get_startup_profiler().report()\n"
+        "row = rows[0] if rows else {}\n"
+        "row['streamlit_import'] = streamlit_import\n"
+        "row['error'] = [str(e.value) for e in at.exception] or None\n"
+        f"print({_RESULT_MARKER!r} + json.dumps(row))\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        capture_output=True, text=True, timeout=timeout, cwd=str(APP_DIR), env=os.environ.copy(),
+    )
+    row: Dict[str, Any] = {'page': page.stem}
+    for line in completed.stdout.splitlines():
+        if line.startswith(_RESULT_MARKER):
+            row.update(json.loads(line[len(_RESULT_MARKER):]))
+    if completed.returncode != 0 and 'error' not in row:
+        row['error'] = completed.stderr.strip().splitlines()[-1:] or 'failed'
+    # Only imports made while the page ran, not the harness's own
+    page_stderr = completed.stderr.split(_RESULT_MARKER, 1)[-1]
+    row['top_imports'] = parse_importtime(page_stderr)
+    return row
+
+def main(argv: Optional[List[str]] = None):
+    """Prints a cold-start report for every page (``python -m utils.startup_profiler``)"""
+    parser = argparse.ArgumentParser(description="Cold-start import and first-render time per page")
+    parser.add_argument('pages', nargs='*', help="Page files (default: every page)")
+    parser.add_argument('--json', action='store_true', help="Print raw JSON rows")
+    args = parser.parse_args(argv)
+
+    pages = [Path(page).resolve() for page in args.pages] or list_pages()
+    rows = [profile_page_cold(page) for page in pages]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    def seconds(value):
+        return f"{value:6.2f}s" if isinstance(value, (int, float)) else "     -"
+
+    print(f"{'page':32} {'imports':>8} {'render':>8} {'total':>8} {'modules':>8}")
+    for row in rows:
+        print(
+            f"{row['page']:32} {seconds(row.get('cold_imports')):>8} {seconds(row.get('cold_render')):>8} "
+            f"{seconds(row.get('cold_total')):>8} {row.get('cold_modules_loaded', '-'):>8}"
+        )
+        extra = {stage: value for stage, value in row.get('cold_stages', {}).items() if stage not in ('imports', 'render')}
+        if extra:
+            print(f"{'':32} " + ", ".join(f"{stage} {value:.2f}s" for stage, value in extra.items()))
+        heavy = ", ".join(f"{module['module']} {module['seconds']:.2f}s" for module in row['top_imports'][:5])
+        if heavy:
+            print(f"{'':32} slowest imports: {heavy}")
+        if row.get('error'):
+            print(f"{'':32} error: {row['error']}")
+
+
+if __name__ == '__main__':
+    main()
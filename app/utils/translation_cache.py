@@ -0,0 +1,213 @@
+"""
+Translation Cache Utility
+Remembers the SQL generated for a question so repeat questions skip the Cortex call
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_TRANSLATION_DB_PATH = Path(__file__).parent.parent.parent / ".cache" / "translations" / "nl_sql.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    key TEXT PRIMARY KEY,
+    question TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    sql TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used);
+"""
+
+
+def normalize_question(question: str) -> str:
+    """
+    Canonicalizes a question so trivial differences share a cache entry
+
+    Unicode is NFKC-normalized, text is lower-cased, whitespace runs collapse
+    to one space and surrounding quotes and trailing punctuation are dropped.
+    Words are left alone; paraphrases are a different question.
+
+    Args:
+        question: User's question in plain English
+
+    Returns:
+        Normalized question
+    """
+    text = unicodedata.normalize('NFKC', question).lower()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.strip('"\'').rstrip('?!. ').strip()
+
+def make_translation_key(question: str, prompt_version: str) -> str:
+    """Cache key for a question under one prompt/schema version"""
+    return hashlib.sha256(f"{prompt_version}\n{normalize_question(question)}".encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """
+    Bounded LRU store of question -> SQL translations
+
+    Entries live in a SQLite file on local disk, so they survive restarts
+    and are shared by every worker on the host. Only SQL that ran
+    successfully should be put(); a cached translation that later fails is
+    dropped with invalidate(). The least recently used entries are evicted
+    once the store holds more than ``max_entries``.
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_TRANSLATION_DB_PATH, max_entries: int = 500):
+        """
+        Args:
+            db_path: SQLite file holding the translations
+            max_entries: Entries kept before the least recently used are evicted;
+                0 disables the cache
+        """
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        if self.enabled:
+            with closing(self._connect()) as db, db:
+                db.executescript(_SCHEMA)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, question: str, prompt_version: str) -> Optional[str]:
+        """
+        Looks up the SQL for a question
+
+        Args:
+            question: User's question, as typed
+            prompt_version: Version of the prompt the SQL must have been generated with
+
+        Returns:
+            The cached SQL, or None on a miss
+        """
+        sql = self.get_by_key(make_translation_key(question, prompt_version))
+        with self._lock:
+            if sql is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return sql
+
+    def get_by_key(self, key: str) -> Optional[str]:
+        """
+        Looks up the SQL stored under a key from make_translation_key()
+
+        Used by the semantic cache, which finds keys of similar questions.
+        Refreshes the entry's LRU position but not the hit/miss counters.
+        """
+        if not self.enabled:
+            return None
+        with self._lock, closing(self._connect()) as db, db:
+            row = db.execute("SELECT sql FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE translations SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key)
+            )
+            return row[0]
+
+    def put(self, question: str, prompt_version: str, sql: str):
+        """Stores SQL that executed successfully for a question"""
+        if not self.enabled:
+            return
+        key = make_translation_key(question, prompt_version)
+        now = time.time()
+        with self._lock, closing(self._connect()) as db, db:
+            db.execute(
+                """
+                INSERT INTO translations (key, question, prompt_version, sql, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET sql = excluded.sql, last_used = excluded.last_used
+                """,
+                (key, normalize_question(question), prompt_version, sql, now, now)
+            )
+            self._evict(db)
+
+    def invalidate(self, question: str, prompt_version: str) -> bool:
+        """Drops a cached translation, e.g. after it failed to run; returns True if one existed"""
+        if not self.enabled:
+            return False
+        key = make_translation_key(question, prompt_version)
+        with self._lock, closing(self._connect()) as db, db:
+            removed = db.execute("DELETE FROM translations WHERE key = ?", (key,)).rowcount > 0
+        if removed:
+            self.invalidations += 1
+        return removed
+
+    def clear(self):
+        """Removes every translation"""
+        if not self.enabled:
+            return
+        with self._lock, closing(self._connect()) as db, db:
+            db.execute("DELETE FROM translations")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns entry count and this process's hit/miss/eviction counters"""
+        entries = 0
+        if self.enabled:
+            with closing(self._connect()) as db:
+                entries = db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'path': str(self.db_path),
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def _evict(self, db: sqlite3.Connection):
+        """Deletes the least recently used entries beyond max_entries"""
+        count = db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            db.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self.evictions += excess
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        return sqlite3.connect(self.db_path, timeout=30)
+
+
+# Singleton instance
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_translation_cache() -> TranslationCache:
+    """Returns the process-wide TranslationCache, configured from the environment"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TranslationCache(
+                    db_path=Path(os.getenv('NL_CACHE_PATH', str(DEFAULT_TRANSLATION_DB_PATH))),
+                    max_entries=int(os.getenv('NL_CACHE_MAX_ENTRIES', '500')),
+                )
+    return _cache
@@ -0,0 +1,72 @@
+"""
+Privacy validation tests for AI generated SQL
+Run with: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from utils.sql_repair import SqlRepairError, repair_sql  # noqa: E402
+
+BANK = "BANK_DB.RISK.CUSTOMER_RISK_SCORES"
+CLEANROOM = "CLEANROOM_DB.AGGREGATED_VIEWS.CROSS_ORG_RISK"
+
+
+def flatten(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def test_grouped_query_gets_min_group_size():
+    sql = repair_sql(f"SELECT age, COUNT(*) FROM {BANK} GROUP BY age")
+    assert "HAVING COUNT(*) >= 50" in flatten(sql)
+
+
+def test_ungrouped_aggregate_over_risk_table_gets_min_group_size():
+    sql = repair_sql(f"SELECT MAX(credit_score) FROM {BANK} WHERE customer_id = 42")
+    assert flatten(sql).endswith("HAVING COUNT(*) >= 50")
+
+
+def test_row_level_scalar_subquery_is_rejected():
+    with pytest.raises(SqlRepairError):
+        repair_sql(f"SELECT (SELECT credit_score FROM {BANK} WHERE customer_id = 42) AS s FROM {CLEANROOM}")
+
+
+def test_aggregate_scalar_subquery_gets_min_group_size():
+    sql = repair_sql(f"SELECT age_group, (SELECT AVG(credit_score) FROM {BANK}) AS s FROM {CLEANROOM}")
+    assert "HAVING COUNT(*) >= 50" in flatten(sql)
+
+
+def test_row_level_query_is_rejected():
+    with pytest.raises(SqlRepairError):
+        repair_sql(f"SELECT customer_id, credit_score FROM {BANK}")
+
+
+def test_forbidden_column_is_rejected():
+    with pytest.raises(SqlRepairError, match="email"):
+        repair_sql(f"SELECT email, COUNT(*) FROM {BANK} GROUP BY email")
+
+
+def test_array_agg_is_rejected():
+    with pytest.raises(SqlRepairError, match="ARRAY_AGG"):
+        repair_sql(f"SELECT age, ARRAY_AGG(customer_id) FROM {BANK} GROUP BY age")
+
+
+def test_listagg_is_rejected():
+    with pytest.raises(SqlRepairError, match="LISTAGG"):
+        repair_sql(f"SELECT age, LISTAGG(customer_id, ',') FROM {BANK} GROUP BY age")
+
+
+def test_max_of_identifier_is_rejected():
+    with pytest.raises(SqlRepairError, match="identifier"):
+        repair_sql(f"SELECT age, MAX(customer_id) FROM {BANK} GROUP BY age")
+
+
+def test_summary_aggregates_are_allowed():
+    sql = repair_sql(
+        f"SELECT age, COUNT(DISTINCT customer_id), ROUND(AVG(credit_score), 1), MAX(credit_score) FROM {BANK} GROUP BY age"
+    )
+    assert "HAVING COUNT(*) >= 50" in flatten(sql)